@@ -10,7 +10,7 @@ r"""
 import numpy as np
 from typing import Tuple
 import hivision.creator.utils as U
-from .context import Context, ContextHandler, Params, Result
+from .context import Context, ContextHandler, HandlerConfig, Params, Result
 from .human_matting import extract_human
 from .face_detector import detect_face_mtcnn
 from hivision.plugin.beauty.handler import beauty_face
@@ -22,9 +22,12 @@ import time
 class IDCreator:
     """
     证件照创建类，包含完整的证件照流程
+
+    每次调用都会创建独立的 Context，实例本身不保存请求状态；
+    只要不再修改处理者和回调，同一个实例可以被多个线程并发调用
     """
 
-    def __init__(self):
+    def __init__(self, handlers: HandlerConfig = None):
         # 回调时机
         self.before_all: ContextHandler = None
         """
@@ -46,8 +49,10 @@ class IDCreator:
         self.matting_handler: ContextHandler = extract_human
         self.detection_handler: ContextHandler = detect_face_mtcnn
         self.beauty_handler: ContextHandler = beauty_face
-        # 上下文
-        self.ctx = None
+        if handlers is not None:
+            self.matting_handler = handlers.matting_handler
+            self.detection_handler = handlers.detection_handler
+            self.beauty_handler = handlers.beauty_handler
 
     def __call__(
         self,
@@ -105,8 +110,8 @@ class IDCreator:
         # 总的开始时间
         total_start_time = time.time()
         
-        self.ctx = Context(params)
-        ctx = self.ctx
+        # 上下文只在本次调用内有效，避免并发请求互相覆盖
+        ctx = Context(params)
         ctx.processing_image = image
         ctx.processing_image = U.resize_image_esp(
             ctx.processing_image, 2000
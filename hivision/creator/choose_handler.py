@@ -1,5 +1,8 @@
+from functools import lru_cache
 from hivision.creator.human_matting import *
 from hivision.creator.face_detector import *
+from hivision.creator.context import HandlerConfig
+from hivision.plugin.beauty.handler import beauty_face
 
 
 HUMAN_MATTING_MODELS = [
@@ -12,24 +15,54 @@ HUMAN_MATTING_MODELS = [
 FACE_DETECT_MODELS = ["face++ (联网Online API)", "mtcnn", "retinaface-resnet50"]
 
 
+# 模型选项 -> 处理者，未知的选项使用默认处理者（hivision_modnet / mtcnn）
+MATTING_HANDLERS = {
+    "modnet_photographic_portrait_matting": extract_human_modnet_photographic_portrait_matting,
+    "mnn_hivision_modnet": extract_human_mnn_modnet,
+    "rmbg-1.4": extract_human_rmbg,
+    "birefnet-v1-lite": extract_human_birefnet_lite,
+}
+
+DETECTION_HANDLERS = {
+    "face_plusplus": detect_face_face_plusplus,
+    "face++ (联网Online API)": detect_face_face_plusplus,
+    "retinaface-resnet50": detect_face_retinaface,
+}
+
+
+def resolve_handlers(matting_model_option=None, face_detect_option=None) -> HandlerConfig:
+    """
+    根据模型选项解析处理者组合，未知的选项回退到默认模型，
+    因此不同选项解析出的组合数量有限，可以作为缓存的键
+    :param matting_model_option: 抠图模型名称
+    :param face_detect_option: 人脸检测模型名称
+    :return: 不可变的处理者组合
+    """
+    return HandlerConfig(
+        matting_handler=MATTING_HANDLERS.get(matting_model_option, extract_human),
+        detection_handler=DETECTION_HANDLERS.get(face_detect_option, detect_face_mtcnn),
+        beauty_handler=beauty_face,
+    )
+
+
+@lru_cache(maxsize=None)
+def _creator_for(handlers: HandlerConfig):
+    from hivision.creator import IDCreator
+
+    return IDCreator(handlers)
+
+
+def get_creator(matting_model_option=None, face_detect_option=None):
+    """
+    获取对应模型组合的 IDCreator，同一组合共享同一个实例。
+    返回的实例可被并发调用，调用方不应再修改它的处理者或回调
+    :param matting_model_option: 抠图模型名称
+    :param face_detect_option: 人脸检测模型名称
+    """
+    return _creator_for(resolve_handlers(matting_model_option, face_detect_option))
+
+
 def choose_handler(creator, matting_model_option=None, face_detect_option=None):
-    if matting_model_option == "modnet_photographic_portrait_matting":
-        creator.matting_handler = extract_human_modnet_photographic_portrait_matting
-    elif matting_model_option == "mnn_hivision_modnet":
-        creator.matting_handler = extract_human_mnn_modnet
-    elif matting_model_option == "rmbg-1.4":
-        creator.matting_handler = extract_human_rmbg
-    elif matting_model_option == "birefnet-v1-lite":
-        creator.matting_handler = extract_human_birefnet_lite
-    else:
-        creator.matting_handler = extract_human
-
-    if (
-        face_detect_option == "face_plusplus"
-        or face_detect_option == "face++ (联网Online API)"
-    ):
-        creator.detection_handler = detect_face_face_plusplus
-    elif face_detect_option == "retinaface-resnet50":
-        creator.detection_handler = detect_face_retinaface
-    else:
-        creator.detection_handler = detect_face_mtcnn
+    handlers = resolve_handlers(matting_model_option, face_detect_option)
+    creator.matting_handler = handlers.matting_handler
+    creator.detection_handler = handlers.detection_handler
@@ -7,7 +7,7 @@ r"""
 @Description:
     证件照创建上下文类，用于同步信息
 """
-from typing import Optional, Callable, Tuple
+from typing import Optional, Callable, Tuple, NamedTuple
 import numpy as np
 
 
@@ -166,3 +166,13 @@ class Context:
 
 
 ContextHandler = Optional[Callable[[Context], None]]
+
+
+class HandlerConfig(NamedTuple):
+    """
+    证件照流程使用的处理者组合，不可变，可在多个请求（线程）之间安全共享
+    """
+
+    matting_handler: ContextHandler
+    detection_handler: ContextHandler
+    beauty_handler: ContextHandler
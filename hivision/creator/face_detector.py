@@ -17,15 +17,41 @@ from .context import Context
 from hivision.error import FaceError, APIError
 from hivision.utils import resize_image_to_kb_base64
 from hivision.creator.retinaface import retinaface_detect_faces
+from .model_manager import model_manager, ONNX_DEVICE
+import mtcnnruntime
 import requests
 import cv2
 import os
 import numpy as np
 
 
-mtcnn = None
 base_dir = os.path.dirname(os.path.abspath(__file__))
-RETINAFCE_SESS = None
+RETINAFACE_WEIGHTS = os.path.join(base_dir, "retinaface/weights/retinaface-resnet50.onnx")
+# RetinaFace 检测分辨率的最大边长，0 表示使用原图检测
+RETINAFACE_MAX_SIDE = int(os.getenv("RETINAFACE_MAX_SIDE", "640"))
+
+
+def _mtcnn_size_bytes() -> int:
+    weights_dir = os.path.join(os.path.dirname(mtcnnruntime.__file__), "weights")
+    try:
+        return sum(
+            os.path.getsize(os.path.join(weights_dir, f)) for f in os.listdir(weights_dir)
+        )
+    except OSError:
+        return 0
+
+
+# 人脸检测模型与抠图模型一样由 model_manager 统一管理加载、预热与卸载
+# mtcnn-runtime 自带权重，由 MTCNN() 内部创建三个 ONNX 会话
+model_manager.register(
+    "mtcnn",
+    os.path.dirname(mtcnnruntime.__file__),
+    loader=lambda spec: MTCNN(),
+    size_bytes=_mtcnn_size_bytes(),
+)
+model_manager.register(
+    "retinaface-resnet50", RETINAFACE_WEIGHTS, prefer_gpu=ONNX_DEVICE == "GPU"
+)
 
 
 def detect_face_mtcnn(ctx: Context, scale: int = 2):
@@ -35,9 +61,7 @@ def detect_face_mtcnn(ctx: Context, scale: int = 2):
     :param scale: 最大边长缩放比例，原图:缩放图 = 1:scale
     :raise FaceError: 人脸检测错误，多个人脸或者没有人脸
     """
-    global mtcnn
-    if mtcnn is None:
-        mtcnn = MTCNN()
+    mtcnn = model_manager.get("mtcnn")
     image = cv2.resize(
         ctx.origin_image,
         (ctx.origin_image.shape[1] // scale, ctx.origin_image.shape[0] // scale),
@@ -162,31 +186,26 @@ def detect_face_face_plusplus(ctx: Context):
         )
 
 
-def detect_face_retinaface(ctx: Context):
+def detect_face_retinaface(ctx: Context, max_side: int = None):
     """
     基于RetinaFace模型的人脸检测处理器，只进行人脸数量的检测
     :param ctx: 上下文，此时已获取到原始图和抠图结果，但是我们只需要原始图
+    :param max_side: 检测分辨率的最大边长，为空时使用 RETINAFACE_MAX_SIDE，0 表示使用原图
     :raise FaceError: 人脸检测错误，多个人脸或者没有人脸
     """
-    from time import time
+    if max_side is None:
+        max_side = RETINAFACE_MAX_SIDE
+    model_path = RETINAFACE_WEIGHTS
+    sess = model_manager.get("retinaface-resnet50")
 
-    global RETINAFCE_SESS
+    faces_dets, _ = retinaface_detect_faces(
+        ctx.origin_image, model_path, sess=sess, max_side=max_side
+    )
 
-    if RETINAFCE_SESS is None:
-        # 计算用时
-        tic = time()
-        faces_dets, sess = retinaface_detect_faces(
-            ctx.origin_image,
-            os.path.join(base_dir, "retinaface/weights/retinaface-resnet50.onnx"),
-            sess=None,
-        )
-        RETINAFCE_SESS = sess
-    else:
-        tic = time()
+    if len(faces_dets) != 1 and 0 < max_side < max(ctx.origin_image.shape[:2]):
+        # 保险措施，缩小后检测到多个人脸或者没有人脸，用原图再检测一次
         faces_dets, _ = retinaface_detect_faces(
-            ctx.origin_image,
-            os.path.join(base_dir, "retinaface/weights/retinaface-resnet50.onnx"),
-            sess=RETINAFCE_SESS,
+            ctx.origin_image, model_path, sess=sess, max_side=0
         )
 
     faces_num = len(faces_dets)
@@ -212,8 +231,4 @@ def detect_face_retinaface(ctx: Context):
     dy = right_eye[1] - left_eye[1]
     dx = right_eye[0] - left_eye[0]
     roll_angle = np.degrees(np.arctan2(dy, dx))
-    ctx.face["roll_angle"] = roll_angle
-
-    # 如果RUN_MODE不是野兽模式，则释放模型
-    if os.getenv("RUN_MODE") == "beast":
-        RETINAFCE_SESS = None
\ No newline at end of file
+    ctx.face["roll_angle"] = roll_angle
\ No newline at end of file
@@ -9,9 +9,10 @@ r"""
 """
 import numpy as np
 from PIL import Image
-import onnxruntime
 from .tensor2numpy import NNormalize, NTo_Tensor, NUnsqueeze
 from .context import Context
+from .model_manager import model_manager, create_onnx_session, ONNX_DEVICE
+from .matting_batcher import get_batcher
 import cv2
 import os
 from time import time
@@ -37,43 +38,32 @@ WEIGHTS = {
     ),
 }
 
-ONNX_DEVICE = onnxruntime.get_device()
-ONNX_PROVIDER = (
-    "CUDAExecutionProvider" if ONNX_DEVICE == "GPU" else "CPUExecutionProvider"
-)
 
-HIVISION_MODNET_SESS = None
-MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS = None
-RMBG_SESS = None
-BIREFNET_V1_LITE_SESS = None
+def _load_mnn_modnet(spec):
+    import MNN.nn as nn
 
-
-def load_onnx_model(checkpoint_path, set_cpu=False):
-    providers = (
-        ["CUDAExecutionProvider", "CPUExecutionProvider"]
-        if ONNX_PROVIDER == "CUDAExecutionProvider"
-        else ["CPUExecutionProvider"]
+    config = {}
+    config["precision"] = "low"  # 当硬件支持（armv8.2）时使用fp16推理
+    config["backend"] = 0  # CPU
+    config["numThread"] = spec.intra_op_threads or 4  # 线程数
+    rt = nn.create_runtime_manager((config,))
+    return nn.load_module_from_file(
+        spec.path, ["input1"], ["output1"], runtime_manager=rt
     )
 
-    if set_cpu:
-        sess = onnxruntime.InferenceSession(
-            checkpoint_path, providers=["CPUExecutionProvider"]
-        )
+
+for _name, _path in WEIGHTS.items():
+    if _name.startswith("mnn_"):
+        model_manager.register(_name, _path, loader=_load_mnn_modnet)
     else:
-        try:
-            sess = onnxruntime.InferenceSession(checkpoint_path, providers=providers)
-        except Exception as e:
-            if ONNX_DEVICE == "CUDAExecutionProvider":
-                print(f"Failed to load model with CUDAExecutionProvider: {e}")
-                print("Falling back to CPUExecutionProvider")
-                # 尝试使用CPU加载模型
-                sess = onnxruntime.InferenceSession(
-                    checkpoint_path, providers=["CPUExecutionProvider"]
-                )
-            else:
-                raise e  # 如果是CPU执行失败，重新抛出异常
+        # birefnet 在 GPU 可用时使用 CUDA，其余抠图模型固定使用 CPU
+        model_manager.register(
+            _name, _path, prefer_gpu=_name == "birefnet-v1-lite" and ONNX_DEVICE == "GPU"
+        )
+
 
-    return sess
+def load_onnx_model(checkpoint_path, set_cpu=False):
+    return create_onnx_session(checkpoint_path, prefer_gpu=not set_cpu)
 
 
 def extract_human(ctx: Context):
@@ -194,77 +184,38 @@ def read_modnet_image(input_image, ref_size=512):
     return im, width, length
 
 
-def get_modnet_matting(input_image, checkpoint_path, ref_size=512):
-    global HIVISION_MODNET_SESS
-
+def _modnet_matting(name, input_image, checkpoint_path, ref_size=512):
     if not os.path.exists(checkpoint_path):
         print(f"Checkpoint file not found: {checkpoint_path}")
         return None
 
-    # 如果RUN_MODE不是野兽模式，则不加载模型
-    if HIVISION_MODNET_SESS is None:
-        HIVISION_MODNET_SESS = load_onnx_model(checkpoint_path, set_cpu=True)
-
-    input_name = HIVISION_MODNET_SESS.get_inputs()[0].name
-    output_name = HIVISION_MODNET_SESS.get_outputs()[0].name
-
     im, width, length = read_modnet_image(input_image=input_image, ref_size=ref_size)
 
-    matte = HIVISION_MODNET_SESS.run([output_name], {input_name: im})
-    matte = (matte[0] * 255).astype("uint8")
+    # MODNet 输入尺寸固定，并发请求在 batcher 中合并为一次推理
+    matte = get_batcher(name, checkpoint_path).run(im)
+    matte = (matte * 255).astype("uint8")
     matte = np.squeeze(matte)
     mask = cv2.resize(matte, (width, length), interpolation=cv2.INTER_AREA)
     b, g, r = cv2.split(np.uint8(input_image))
 
     output_image = cv2.merge((b, g, r, mask))
-    
-    # 如果RUN_MODE不是野兽模式，则释放模型
-    if os.getenv("RUN_MODE") != "beast":
-        HIVISION_MODNET_SESS = None
 
     return output_image
 
 
+def get_modnet_matting(input_image, checkpoint_path, ref_size=512):
+    return _modnet_matting("hivision_modnet", input_image, checkpoint_path, ref_size)
+
+
 def get_modnet_matting_photographic_portrait_matting(
     input_image, checkpoint_path, ref_size=512
 ):
-    global MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS
-
-    if not os.path.exists(checkpoint_path):
-        print(f"Checkpoint file not found: {checkpoint_path}")
-        return None
-
-    # 如果RUN_MODE不是野兽模式，则不加载模型
-    if MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS is None:
-        MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS = load_onnx_model(
-            checkpoint_path, set_cpu=True
-        )
-
-    input_name = MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS.get_inputs()[0].name
-    output_name = MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS.get_outputs()[0].name
-
-    im, width, length = read_modnet_image(input_image=input_image, ref_size=ref_size)
-
-    matte = MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS.run(
-        [output_name], {input_name: im}
+    return _modnet_matting(
+        "modnet_photographic_portrait_matting", input_image, checkpoint_path, ref_size
     )
-    matte = (matte[0] * 255).astype("uint8")
-    matte = np.squeeze(matte)
-    mask = cv2.resize(matte, (width, length), interpolation=cv2.INTER_AREA)
-    b, g, r = cv2.split(np.uint8(input_image))
-
-    output_image = cv2.merge((b, g, r, mask))
-    
-    # 如果RUN_MODE不是野兽模式，则释放模型
-    if os.getenv("RUN_MODE") != "beast":
-        MODNET_PHOTOGRAPHIC_PORTRAIT_MATTING_SESS = None
-
-    return output_image
 
 
 def get_rmbg_matting(input_image: np.ndarray, checkpoint_path, ref_size=1024):
-    global RMBG_SESS
-
     if not os.path.exists(checkpoint_path):
         print(f"Checkpoint file not found: {checkpoint_path}")
         return None
@@ -275,8 +226,7 @@ def get_rmbg_matting(input_image: np.ndarray, checkpoint_path, ref_size=1024):
         image = image.resize(model_input_size, Image.BILINEAR)
         return image
 
-    if RMBG_SESS is None:
-        RMBG_SESS = load_onnx_model(checkpoint_path, set_cpu=True)
+    sess = model_manager.get("rmbg-1.4", checkpoint_path)
 
     orig_image = Image.fromarray(input_image)
     image = resize_rmbg_image(orig_image)
@@ -287,7 +237,7 @@ def get_rmbg_matting(input_image: np.ndarray, checkpoint_path, ref_size=1024):
     im_np = (im_np - 0.5) / 0.5  # Normalize to [-1, 1]
 
     # Inference
-    result = RMBG_SESS.run(None, {RMBG_SESS.get_inputs()[0].name: im_np})[0]
+    result = sess.run(None, {sess.get_inputs()[0].name: im_np})[0]
 
     # Post process
     result = np.squeeze(result)
@@ -307,10 +257,6 @@ def get_rmbg_matting(input_image: np.ndarray, checkpoint_path, ref_size=1024):
     # Paste the mask on the original image
     new_im = Image.new("RGBA", orig_image.size, (0, 0, 0, 0))
     new_im.paste(orig_image, mask=pil_im)
-    
-    # 如果RUN_MODE不是野兽模式，则释放模型
-    if os.getenv("RUN_MODE") != "beast":
-        RMBG_SESS = None
 
     return np.array(new_im)
 
@@ -321,21 +267,16 @@ def get_mnn_modnet_matting(input_image, checkpoint_path, ref_size=512):
         return None
 
     try:
+        # MNN.nn 在 _load_mnn_modnet 中导入，这里只需要 expr
         import MNN.expr as expr
-        import MNN.nn as nn
     except ImportError as e:
         raise ImportError(
             "The MNN module is not installed or there was an import error. Please ensure that the MNN library is installed by using the command 'pip install mnn'."
         ) from e
 
-    config = {}
-    config["precision"] = "low"  # 当硬件支持（armv8.2）时使用fp16推理
-    config["backend"] = 0  # CPU
-    config["numThread"] = 4  # 线程数
     im, width, length = read_modnet_image(input_image, ref_size=512)
-    rt = nn.create_runtime_manager((config,))
-    net = nn.load_module_from_file(
-        checkpoint_path, ["input1"], ["output1"], runtime_manager=rt
+    net = model_manager.get(
+        "mnn_hivision_modnet", checkpoint_path, loader=_load_mnn_modnet
     )
     input_var = expr.convert(im, expr.NCHW)
     output_var = net.forward(input_var)
@@ -352,8 +293,6 @@ def get_mnn_modnet_matting(input_image, checkpoint_path, ref_size=512):
 
 
 def get_birefnet_portrait_matting(input_image, checkpoint_path, ref_size=512):
-    global BIREFNET_V1_LITE_SESS
-
     if not os.path.exists(checkpoint_path):
         print(f"Checkpoint file not found: {checkpoint_path}")
         return None
@@ -376,20 +315,17 @@ def get_birefnet_portrait_matting(input_image, checkpoint_path, ref_size=512):
     # 记录加载onnx模型的开始时间
     load_start_time = time()
 
-    # 如果RUN_MODE不是野兽模式，则不加载模型
-    if BIREFNET_V1_LITE_SESS is None:
-        # print("首次加载birefnet-v1-lite模型...")
-        if ONNX_DEVICE == "GPU":
-            print("onnxruntime-gpu已安装，尝试使用CUDA加载模型")
-            try:
-                import torch
-            except ImportError:
-                print(
-                    "torch未安装，尝试直接使用onnxruntime-gpu加载模型，这需要配置好CUDA和cuDNN"
-                )
-            BIREFNET_V1_LITE_SESS = load_onnx_model(checkpoint_path)
-        else:
-            BIREFNET_V1_LITE_SESS = load_onnx_model(checkpoint_path, set_cpu=True)
+    if ONNX_DEVICE == "GPU" and not model_manager.is_loaded("birefnet-v1-lite"):
+        print("onnxruntime-gpu已安装，尝试使用CUDA加载模型")
+        try:
+            import torch
+        except ImportError:
+            print(
+                "torch未安装，尝试直接使用onnxruntime-gpu加载模型，这需要配置好CUDA和cuDNN"
+            )
+    sess = model_manager.get(
+        "birefnet-v1-lite", checkpoint_path, prefer_gpu=ONNX_DEVICE == "GPU"
+    )
 
     # 记录加载onnx模型的结束时间
     load_end_time = time()
@@ -397,11 +333,11 @@ def get_birefnet_portrait_matting(input_image, checkpoint_path, ref_size=512):
     # 打印加载onnx模型所花的时间
     print(f"Loading ONNX model took {load_end_time - load_start_time:.4f} seconds")
 
-    input_name = BIREFNET_V1_LITE_SESS.get_inputs()[0].name
-    print(onnxruntime.get_device(), BIREFNET_V1_LITE_SESS.get_providers())
+    input_name = sess.get_inputs()[0].name
+    print(ONNX_DEVICE, sess.get_providers())
 
     time_st = time()
-    pred_onnx = BIREFNET_V1_LITE_SESS.run(None, {input_name: input_images})[
+    pred_onnx = sess.run(None, {input_name: input_images})[
         -1
     ]  # Use float32 input
     pred_onnx = np.squeeze(pred_onnx)  # Use numpy to squeeze
@@ -420,9 +356,5 @@ def get_birefnet_portrait_matting(input_image, checkpoint_path, ref_size=512):
     # Paste the mask on the original image
     new_im = Image.new("RGBA", orig_image.size, (0, 0, 0, 0))
     new_im.paste(orig_image, mask=pil_im)
-    
-    # 如果RUN_MODE不是野兽模式，则释放模型
-    if os.getenv("RUN_MODE") != "beast":
-        BIREFNET_V1_LITE_SESS = None
 
     return np.array(new_im)
@@ -8,10 +8,19 @@ r"""
     布局计算器
 """
 
-import cv2.detail
+from functools import lru_cache
+import cv2
 import numpy as np
 
+# 排版相纸尺寸（300 DPI 下的像素宽高）与每张相纸最多排列的行数、列数
+LAYOUT_SHEETS = {
+    "6inch": {"width": 1795, "height": 1205, "max_rows": 3, "max_cols": 8},
+    "5inch": {"width": 1500, "height": 1050, "max_rows": 3, "max_cols": 8},
+    "a4": {"width": 2480, "height": 3508, "max_rows": 12, "max_cols": 8},
+}
 
+
+@lru_cache(maxsize=256)
 def judge_layout(
     input_width,
     input_height,
@@ -19,6 +28,8 @@ def judge_layout(
     PHOTO_INTERVAL_H,
     LIMIT_BLOCK_W,
     LIMIT_BLOCK_H,
+    max_rows=3,
+    max_cols=8,
 ):
     centerBlockHeight_1, centerBlockWidth_1 = (
         input_height,
@@ -32,14 +43,14 @@ def judge_layout(
     # 1.不转置排列的情况下：
     layout_col_no_transpose = 0  # 行
     layout_row_no_transpose = 0  # 列
-    for i in range(1, 4):
+    for i in range(1, max_rows + 1):
         centerBlockHeight_temp = input_height * i + PHOTO_INTERVAL_H * (i - 1)
         if centerBlockHeight_temp < LIMIT_BLOCK_H:
             centerBlockHeight_1 = centerBlockHeight_temp
             layout_row_no_transpose = i
         else:
             break
-    for j in range(1, 9):
+    for j in range(1, max_cols + 1):
         centerBlockWidth_temp = input_width * j + PHOTO_INTERVAL_W * (j - 1)
         if centerBlockWidth_temp < LIMIT_BLOCK_W:
             centerBlockWidth_1 = centerBlockWidth_temp
@@ -51,14 +62,14 @@ def judge_layout(
     # 2.转置排列的情况下：
     layout_col_transpose = 0  # 行
     layout_row_transpose = 0  # 列
-    for i in range(1, 4):
+    for i in range(1, max_rows + 1):
         centerBlockHeight_temp = input_width * i + PHOTO_INTERVAL_H * (i - 1)
         if centerBlockHeight_temp < LIMIT_BLOCK_H:
             centerBlockHeight_2 = centerBlockHeight_temp
             layout_row_transpose = i
         else:
             break
-    for j in range(1, 9):
+    for j in range(1, max_cols + 1):
         centerBlockWidth_temp = input_height * j + PHOTO_INTERVAL_W * (j - 1)
         if centerBlockWidth_temp < LIMIT_BLOCK_W:
             centerBlockWidth_2 = centerBlockWidth_temp
@@ -75,7 +86,21 @@ def judge_layout(
         return layout_mode, centerBlockWidth_1, centerBlockHeight_1
 
 
-def generate_layout_array(input_height, input_width, LAYOUT_WIDTH=1795, LAYOUT_HEIGHT=1205):
+def generate_layout_array(
+    input_height, input_width, LAYOUT_WIDTH=1795, LAYOUT_HEIGHT=1205, max_rows=3, max_cols=8
+):
+    """
+    计算证件照在相纸上的排列位置，相同照片尺寸与相纸尺寸的结果会被缓存复用
+    :return: (每张照片左上角坐标 [[x, y], ...], 是否旋转排列)
+    """
+    typography_arr, typography_rotate = _layout_plan(
+        input_height, input_width, LAYOUT_WIDTH, LAYOUT_HEIGHT, max_rows, max_cols
+    )
+    return [list(arr) for arr in typography_arr], typography_rotate
+
+
+@lru_cache(maxsize=256)
+def _layout_plan(input_height, input_width, LAYOUT_WIDTH, LAYOUT_HEIGHT, max_rows, max_cols):
     # 1.基础参数表
     PHOTO_INTERVAL_H = 30  # 证件照与证件照之间的垂直距离
     PHOTO_INTERVAL_W = 30  # 证件照与证件照之间的水平距离
@@ -84,11 +109,7 @@ def generate_layout_array(input_height, input_width, LAYOUT_WIDTH=1795, LAYOUT_H
     LIMIT_BLOCK_W = LAYOUT_WIDTH - 2 * SIDES_INTERVAL_W
     LIMIT_BLOCK_H = LAYOUT_HEIGHT - 2 * SIDES_INTERVAL_H
 
-    # 2.创建一个 1180x1746 的空白画布
-    white_background = np.zeros([LAYOUT_HEIGHT, LAYOUT_WIDTH, 3], np.uint8)
-    white_background.fill(255)
-
-    # 3.计算照片的 layout（列、行、横竖朝向）,证件照组成的中心区块的分辨率
+    # 2.计算照片的 layout（列、行、横竖朝向）,证件照组成的中心区块的分辨率
     layout_mode, centerBlockWidth, centerBlockHeight = judge_layout(
         input_width,
         input_height,
@@ -96,8 +117,10 @@ def generate_layout_array(input_height, input_width, LAYOUT_WIDTH=1795, LAYOUT_H
         PHOTO_INTERVAL_H,
         LIMIT_BLOCK_W,
         LIMIT_BLOCK_H,
+        max_rows,
+        max_cols,
     )
-    # 4.开始排列组合
+    # 3.开始排列组合
     x11 = (LAYOUT_WIDTH - centerBlockWidth) // 2
     y11 = (LAYOUT_HEIGHT - centerBlockHeight) // 2
     typography_arr = []
@@ -110,9 +133,9 @@ def generate_layout_array(input_height, input_width, LAYOUT_WIDTH=1795, LAYOUT_H
         for i in range(layout_mode[0]):
             xi = x11 + i * input_width + i * PHOTO_INTERVAL_W
             yi = y11 + j * input_height + j * PHOTO_INTERVAL_H
-            typography_arr.append([xi, yi])
+            typography_arr.append((xi, yi))
 
-    return typography_arr, typography_rotate
+    return tuple(typography_arr), typography_rotate
 
 
 def generate_layout_image(
@@ -123,8 +146,7 @@ def generate_layout_image(
 ):
   
     # 创建一个白色背景的空白画布
-    white_background = np.zeros([LAYOUT_HEIGHT, LAYOUT_WIDTH, 3], np.uint8)
-    white_background.fill(255)
+    white_background = np.full([LAYOUT_HEIGHT, LAYOUT_WIDTH, 3], 255, np.uint8)
     
     # 如果输入图像的高度不等于指定高度，则调整图像大小
     if input_image.shape[0] != height:
@@ -176,3 +198,53 @@ def generate_layout_image(
 
     # 返回排版后的图像
     return white_background
+
+
+def generate_layout_sheets(input_image, sheets=("6inch",), width=295, height=413, crop_line: bool = False):
+    """
+    用同一张证件照一次生成多种相纸的排版照
+    照片只缩放一次，需要旋转排列时也只旋转一次，各相纸共用
+    :param input_image: 证件照
+    :param sheets: LAYOUT_SHEETS 中的相纸名称
+    :param width: 证件照宽度
+    :param height: 证件照高度
+    :param crop_line: 是否添加裁剪线
+    :return: {相纸名称: 排版照}
+    """
+    unknown = [name for name in sheets if name not in LAYOUT_SHEETS]
+    if unknown:
+        raise ValueError(f"不支持的相纸尺寸: {', '.join(unknown)}，可选: {', '.join(LAYOUT_SHEETS)}")
+
+    if input_image.shape[0] != height:
+        input_image = cv2.resize(input_image, (width, height))
+    rotated_image = None
+
+    results = {}
+    for name in sheets:
+        sheet = LAYOUT_SHEETS[name]
+        typography_arr, typography_rotate = generate_layout_array(
+            input_height=height,
+            input_width=width,
+            LAYOUT_WIDTH=sheet["width"],
+            LAYOUT_HEIGHT=sheet["height"],
+            max_rows=sheet["max_rows"],
+            max_cols=sheet["max_cols"],
+        )
+        image = input_image
+        if typography_rotate:
+            if rotated_image is None:
+                rotated_image = cv2.flip(cv2.transpose(input_image), 0)
+            image = rotated_image
+
+        # 已经按需旋转过，这里按旋转后的宽高直接铺放
+        results[name] = generate_layout_image(
+            image,
+            typography_arr,
+            False,
+            width=image.shape[1],
+            height=image.shape[0],
+            crop_line=crop_line,
+            LAYOUT_WIDTH=sheet["width"],
+            LAYOUT_HEIGHT=sheet["height"],
+        )
+    return results
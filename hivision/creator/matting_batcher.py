@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+@DATE: 2026/10/16 15:40
+@File: matting_batcher.py
+@IDE: pycharm
+@Description:
+    抠图微批处理：把并发请求的 MODNet 输入在几毫秒内攒成一个 batch，
+    合并为一次 session.run，提高突发流量下的 CPU 吞吐
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .model_manager import model_manager, _env_int
+
+
+class _PendingItem:
+    def __init__(self, tensor: np.ndarray):
+        self.tensor = tensor
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class MattingBatcher:
+    """
+    单个模型的微批调度器
+
+    - 调用方线程提交 [1, C, H, W] 输入后阻塞等待结果
+    - 后台线程取到第一个请求后，最多再等待 max_wait_ms 或凑满 max_batch_size 张，
+      拼成 [N, C, H, W] 执行一次推理，再按顺序拆分结果
+    - 模型的 batch 维度固定为 1 或输入尺寸不一致时，退化为逐张推理
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        max_batch_size: int = 4,
+        max_wait_ms: int = 5,
+    ):
+        """
+        :param name: 模型名称，对应 model_manager 中的注册名
+        :param path: 权重文件路径
+        :param max_batch_size: 单次推理的最大图片数，<=1 表示不做批处理
+        :param max_wait_ms: 收到第一个请求后等待更多请求的最长时间（毫秒）
+        """
+        self.name = name
+        self.path = path
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue[_PendingItem]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.max_batch_seen = 0
+
+    def run(self, tensor: np.ndarray) -> np.ndarray:
+        """
+        执行推理
+        :param tensor: 模型输入，形状为 [1, C, H, W]
+        :return: 模型第一个输出中对应这张图片的部分，形状为 [1, ...]
+        """
+        if self.max_batch_size <= 1:
+            result = self._infer([tensor])[0]
+            self._record(1)
+            return result
+
+        self._ensure_worker()
+        item = _PendingItem(tensor)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+        }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name=f"matting-batcher-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self._infer([item.tensor for item in batch])
+                for item, result in zip(batch, results):
+                    item.result = result
+            except BaseException as e:
+                for item in batch:
+                    item.error = e
+            finally:
+                self._record(len(batch))
+                for item in batch:
+                    item.done.set()
+
+    def _infer(self, tensors: List[np.ndarray]) -> List[np.ndarray]:
+        sess = model_manager.get(self.name, self.path)
+        input_name = sess.get_inputs()[0].name
+        output_name = sess.get_outputs()[0].name
+
+        if len(tensors) == 1 or not self._can_batch(sess, tensors):
+            return [sess.run([output_name], {input_name: t})[0] for t in tensors]
+
+        output = sess.run([output_name], {input_name: np.concatenate(tensors, axis=0)})[0]
+        return [output[i : i + 1] for i in range(len(tensors))]
+
+    @staticmethod
+    def _can_batch(sess, tensors: List[np.ndarray]) -> bool:
+        # batch 维度为符号或 None 时才是动态的，导出时固定为 1 的模型不能拼接
+        batch_dim = sess.get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            return False
+        shape = tensors[0].shape
+        return all(t.shape == shape for t in tensors)
+
+    def _record(self, size: int):
+        with self._lock:
+            self.batches += 1
+            self.images += size
+            self.max_batch_seen = max(self.max_batch_seen, size)
+
+
+MAX_BATCH_SIZE = _env_int("MATTING_MAX_BATCH", 4)
+MAX_WAIT_MS = _env_int("MATTING_BATCH_WAIT_MS", 5)
+
+_batchers: Dict[Tuple[str, str], MattingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def configure_batching(max_batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None):
+    """
+    调整微批参数，对已创建的调度器同样生效
+    :param max_batch_size: 单次推理的最大图片数，<=1 表示关闭批处理
+    :param max_wait_ms: 等待凑批的最长时间（毫秒）
+    """
+    global MAX_BATCH_SIZE, MAX_WAIT_MS
+    with _batchers_lock:
+        if max_batch_size is not None:
+            MAX_BATCH_SIZE = max_batch_size
+        if max_wait_ms is not None:
+            MAX_WAIT_MS = max_wait_ms
+        for batcher in _batchers.values():
+            batcher.max_batch_size = MAX_BATCH_SIZE
+            batcher.max_wait_ms = MAX_WAIT_MS
+
+
+def get_batcher(name: str, path: str) -> MattingBatcher:
+    with _batchers_lock:
+        batcher = _batchers.get((name, path))
+        if batcher is None:
+            batcher = MattingBatcher(name, path, MAX_BATCH_SIZE, MAX_WAIT_MS)
+            _batchers[(name, path)] = batcher
+        return batcher
+
+
+def batcher_stats() -> dict:
+    return {batcher.name: batcher.stats() for batcher in _batchers.values()}
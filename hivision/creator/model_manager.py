@@ -0,0 +1,432 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+r"""
+@DATE: 2026/10/16 10:12
+@File: model_manager.py
+@IDE: pycharm
+@Description:
+    模型会话管理器：常驻加载推理会话，支持预热、按内存预算的 LRU 淘汰、
+    空闲超时卸载，以及按模型配置 ONNX 的 intra-/inter-op 线程数
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import onnxruntime
+
+
+ONNX_DEVICE = onnxruntime.get_device()
+ONNX_PROVIDER = (
+    "CUDAExecutionProvider" if ONNX_DEVICE == "GPU" else "CPUExecutionProvider"
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Invalid integer for {name}: {value}, fallback to {default}")
+        return default
+
+
+def _env_threads(name: str) -> Dict[str, Tuple[int, int]]:
+    """
+    解析按模型指定的线程数，格式为 "模型名称=intra[:inter],..."，如 "hivision_modnet=4:1,mtcnn=2"
+    未指定 inter 时为 0（使用 onnxruntime 默认值）
+    """
+    threads = {}
+    for item in (os.getenv(name) or "").split(","):
+        model, _, value = item.partition("=")
+        if not model.strip() or not value.strip():
+            continue
+        intra, _, inter = value.partition(":")
+        try:
+            threads[model.strip()] = (int(intra), int(inter or 0))
+        except ValueError:
+            print(f"Invalid thread config for {model.strip()} in {name}: {value}")
+    return threads
+
+
+def create_onnx_session(
+    checkpoint_path: str,
+    prefer_gpu: bool = False,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+):
+    """
+    创建 ONNX 推理会话
+    :param checkpoint_path: 模型路径
+    :param prefer_gpu: 是否优先使用 CUDA，失败时回退到 CPU
+    :param intra_op_threads: 单个算子内部的并行线程数，0 表示使用 onnxruntime 默认值
+    :param inter_op_threads: 算子之间的并行线程数，0 表示使用 onnxruntime 默认值
+    :return: onnxruntime.InferenceSession
+    """
+    sess_options = onnxruntime.SessionOptions()
+    if intra_op_threads > 0:
+        sess_options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads > 0:
+        sess_options.inter_op_num_threads = inter_op_threads
+
+    if not prefer_gpu or ONNX_PROVIDER != "CUDAExecutionProvider":
+        return onnxruntime.InferenceSession(
+            checkpoint_path, sess_options, providers=["CPUExecutionProvider"]
+        )
+
+    try:
+        return onnxruntime.InferenceSession(
+            checkpoint_path,
+            sess_options,
+            providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+        )
+    except Exception as e:
+        print(f"Failed to load model with CUDAExecutionProvider: {e}")
+        print("Falling back to CPUExecutionProvider")
+        return onnxruntime.InferenceSession(
+            checkpoint_path, sess_options, providers=["CPUExecutionProvider"]
+        )
+
+
+class ModelSpec:
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        prefer_gpu: bool = False,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        loader: Optional[Callable[["ModelSpec"], object]] = None,
+        size_bytes: Optional[int] = None,
+        keep_alive: Optional[int] = None,
+        pinned: bool = False,
+    ):
+        """
+        模型注册信息
+        :param name: 模型名称，作为管理器中的唯一键
+        :param path: 权重文件路径
+        :param prefer_gpu: 是否优先使用 GPU
+        :param intra_op_threads: intra-op 线程数，None 表示使用管理器的默认值
+        :param inter_op_threads: inter-op 线程数，None 表示使用管理器的默认值
+        :param loader: 自定义加载函数，接收 ModelSpec 返回模型对象；为空时按 ONNX 加载
+        :param size_bytes: 预估的常驻内存，为空时按权重文件大小估算
+        :param keep_alive: 空闲多少秒后卸载，None 表示使用管理器的默认值，0 表示不因空闲卸载
+        :param pinned: 是否常驻，常驻模型不会因空闲或内存预算被卸载，只能显式 unload
+        """
+        self.name = name
+        self.path = path
+        self.prefer_gpu = prefer_gpu
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.loader = loader
+        self.size_bytes = size_bytes
+        self.keep_alive = keep_alive
+        self.pinned = pinned
+
+    def estimate_size(self) -> int:
+        if self.size_bytes is not None:
+            return self.size_bytes
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+class _LoadedModel:
+    def __init__(self, model, size_bytes: int, load_time: float):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+
+class ModelManager:
+    """
+    模型注册表，替代各模块中的全局会话变量。
+
+    - 会话加载后常驻内存，按最近使用顺序（LRU）维护
+    - 常驻模型的预估内存之和超过预算时，淘汰最久未使用的模型
+    - 空闲超过 keep_alive 秒的模型在下一次访问管理器时卸载
+    - pinned 的模型（如启动时预加载的模型）不会被自动卸载
+    - 同一模型并发首次加载时只会加载一次
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: int = 0,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        keep_alive: int = 0,
+        threads: Optional[Dict[str, Tuple[int, int]]] = None,
+    ):
+        """
+        :param memory_budget_mb: 常驻模型的内存预算（MB），0 表示不限制
+        :param intra_op_threads: 默认 intra-op 线程数，0 表示使用 onnxruntime 默认值
+        :param inter_op_threads: 默认 inter-op 线程数，0 表示使用 onnxruntime 默认值
+        :param keep_alive: 默认的空闲卸载时间（秒），0 表示不因空闲卸载
+        :param threads: 按模型名称指定的 (intra, inter) 线程数，之后注册的同名模型同样生效
+        """
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.keep_alive = keep_alive
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.threads: Dict[str, Tuple[int, int]] = dict(threads or {})
+        self._specs: Dict[str, ModelSpec] = {}
+        self._loaded: "OrderedDict[str, _LoadedModel]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.evictions = 0
+        self.idle_unloads = 0
+
+    @classmethod
+    def from_env(cls) -> "ModelManager":
+        # 环境变量名与 src/utils/config.py 一致
+        return cls(
+            memory_budget_mb=_env_int("MODEL_MEMORY_BUDGET_MB", 4096),
+            intra_op_threads=_env_int("ONNX_INTRA_OP_THREADS", 0),
+            inter_op_threads=_env_int("ONNX_INTER_OP_THREADS", 0),
+            keep_alive=_env_int("MODEL_KEEP_ALIVE_SECONDS", 0),
+            threads=_env_threads("MODEL_THREADS"),
+        )
+
+    def configure(
+        self,
+        memory_budget_mb: Optional[int] = None,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        threads: Optional[Dict[str, Tuple[int, int]]] = None,
+        keep_alive: Optional[int] = None,
+    ):
+        """
+        调整管理器配置，只影响之后加载的会话（已加载的会话线程数不变）
+        :param memory_budget_mb: 内存预算（MB），0 表示不限制
+        :param intra_op_threads: 默认 intra-op 线程数
+        :param inter_op_threads: 默认 inter-op 线程数
+        :param threads: 按模型名称指定的 (intra, inter) 线程数，尚未注册的模型在注册时生效
+        :param keep_alive: 默认的空闲卸载时间（秒），0 表示不因空闲卸载
+        """
+        with self._lock:
+            if memory_budget_mb is not None:
+                self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+            if intra_op_threads is not None:
+                self.intra_op_threads = intra_op_threads
+            if inter_op_threads is not None:
+                self.inter_op_threads = inter_op_threads
+            if keep_alive is not None:
+                self.keep_alive = keep_alive
+            for name, (intra, inter) in (threads or {}).items():
+                self.threads[name] = (intra, inter)
+                spec = self._specs.get(name)
+                if spec is not None:
+                    spec.intra_op_threads = intra
+                    spec.inter_op_threads = inter
+            self._evict_if_needed()
+
+    def register(self, name: str, path: str, **kwargs) -> ModelSpec:
+        """
+        注册模型，已注册的同名模型会被覆盖（已加载的会话会被卸载）
+        :param name: 模型名称
+        :param path: 权重文件路径
+        :param kwargs: 透传给 ModelSpec
+        """
+        if name in self.threads:
+            kwargs.setdefault("intra_op_threads", self.threads[name][0])
+            kwargs.setdefault("inter_op_threads", self.threads[name][1])
+        spec = ModelSpec(name, path, **kwargs)
+        with self._lock:
+            self._specs[name] = spec
+            self._loaded.pop(name, None)
+        return spec
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._specs
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get(self, name: str, path: Optional[str] = None, **kwargs):
+        """
+        获取模型会话，未加载时加载
+        :param name: 模型名称
+        :param path: 权重路径；当路径与已注册的不一致时，以路径为键注册一个新模型
+        :param kwargs: 按路径注册新模型时透传给 ModelSpec
+        :return: 模型会话
+        """
+        spec = self._specs.get(name)
+        if path is not None and (spec is None or spec.path != path):
+            name = path
+            spec = self._specs.get(name)
+            if spec is None:
+                spec = self.register(name, path, **kwargs)
+        if spec is None:
+            raise KeyError(f"Model not registered: {name}")
+
+        with self._lock:
+            self._unload_idle(keep=name)
+            loaded = self._touch(name)
+            if loaded is not None:
+                return loaded.model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # 加载放在全局锁之外，避免大模型加载时阻塞其他模型的访问
+        with load_lock:
+            with self._lock:
+                loaded = self._touch(name)
+                if loaded is not None:
+                    return loaded.model
+
+            tic = time.time()
+            model = self._load(spec)
+            load_time = time.time() - tic
+            print(f"[ModelManager] Loaded {name} in {load_time:.3f}s")
+
+            with self._lock:
+                self._loaded[name] = _LoadedModel(model, spec.estimate_size(), load_time)
+                self._loaded[name].hits += 1
+                self._evict_if_needed(keep=name)
+            return model
+
+    def warmup(self, names: Optional[Iterable[str]] = None, pin: bool = False):
+        """
+        预加载模型，权重文件不存在的模型会被跳过
+        :param names: 需要预加载的模型名称，为空时预加载全部已注册模型
+        :param pin: 是否把预加载的模型设为常驻
+        :return: 成功加载的模型名称
+        """
+        loaded = []
+        for name in list(names) if names is not None else list(self._specs):
+            spec = self._specs.get(name)
+            if spec is None:
+                print(f"[ModelManager] Skip warmup, model not registered: {name}")
+                continue
+            if spec.loader is None and not os.path.exists(spec.path):
+                print(f"[ModelManager] Skip warmup, checkpoint not found: {spec.path}")
+                continue
+            if pin:
+                spec.pinned = True
+            self.get(name)
+            loaded.append(name)
+        return loaded
+
+    def unload(self, name: Optional[str] = None):
+        """
+        卸载模型，同时取消常驻
+        :param name: 模型名称，为空时卸载全部模型
+        """
+        with self._lock:
+            if name is None:
+                self._loaded.clear()
+                for spec in self._specs.values():
+                    spec.pinned = False
+            else:
+                self._loaded.pop(name, None)
+                if name in self._specs:
+                    self._specs[name].pinned = False
+
+    def unload_idle(self):
+        """
+        卸载空闲超过 keep_alive 的模型，返回被卸载的模型名称
+        """
+        with self._lock:
+            return self._unload_idle()
+
+    def status(self) -> dict:
+        with self._lock:
+            used = sum(m.size_bytes for m in self._loaded.values())
+            models = []
+            for name, spec in self._specs.items():
+                loaded = self._loaded.get(name)
+                models.append(
+                    {
+                        "name": name,
+                        "path": spec.path,
+                        "loaded": loaded is not None,
+                        "pinned": spec.pinned,
+                        "keep_alive": self._keep_alive(spec),
+                        "size_mb": round(spec.estimate_size() / 1024 / 1024, 2),
+                        "intra_op_threads": self._threads(spec)[0],
+                        "inter_op_threads": self._threads(spec)[1],
+                        "load_time": round(loaded.load_time, 4) if loaded else None,
+                        "last_used": loaded.last_used if loaded else None,
+                        "hits": loaded.hits if loaded else 0,
+                    }
+                )
+            return {
+                "memory_budget_mb": round(self.memory_budget_bytes / 1024 / 1024, 2),
+                "memory_used_mb": round(used / 1024 / 1024, 2),
+                "evictions": self.evictions,
+                "idle_unloads": self.idle_unloads,
+                "models": models,
+            }
+
+    def _threads(self, spec: ModelSpec) -> Tuple[int, int]:
+        intra = (
+            spec.intra_op_threads
+            if spec.intra_op_threads is not None
+            else self.intra_op_threads
+        )
+        inter = (
+            spec.inter_op_threads
+            if spec.inter_op_threads is not None
+            else self.inter_op_threads
+        )
+        return intra, inter
+
+    def _keep_alive(self, spec: ModelSpec) -> int:
+        return spec.keep_alive if spec.keep_alive is not None else self.keep_alive
+
+    def _unload_idle(self, keep: Optional[str] = None):
+        now = time.time()
+        unloaded = []
+        for name, loaded in list(self._loaded.items()):
+            spec = self._specs.get(name)
+            if name == keep or spec is None or spec.pinned:
+                continue
+            keep_alive = self._keep_alive(spec)
+            if keep_alive > 0 and now - loaded.last_used > keep_alive:
+                self._loaded.pop(name)
+                self.idle_unloads += 1
+                unloaded.append(name)
+                print(f"[ModelManager] Unloaded {name} (idle for {now - loaded.last_used:.0f}s)")
+        return unloaded
+
+    def _load(self, spec: ModelSpec):
+        if spec.loader is not None:
+            return spec.loader(spec)
+        intra, inter = self._threads(spec)
+        return create_onnx_session(
+            spec.path,
+            prefer_gpu=spec.prefer_gpu,
+            intra_op_threads=intra,
+            inter_op_threads=inter,
+        )
+
+    def _touch(self, name: str) -> Optional[_LoadedModel]:
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            self._loaded.move_to_end(name)
+            loaded.last_used = time.time()
+            loaded.hits += 1
+        return loaded
+
+    def _evict_if_needed(self, keep: Optional[str] = None):
+        if self.memory_budget_bytes <= 0:
+            return
+        used = sum(m.size_bytes for m in self._loaded.values())
+        # 按 LRU 顺序淘汰，正在加载的模型即使单独超出预算也会保留
+        for name in list(self._loaded):
+            if used <= self.memory_budget_bytes:
+                break
+            spec = self._specs.get(name)
+            if name == keep or (spec is not None and spec.pinned):
+                continue
+            used -= self._loaded.pop(name).size_bytes
+            self.evictions += 1
+            print(f"[ModelManager] Evicted {name} (memory budget exceeded)")
+
+
+model_manager = ModelManager.from_env()
@@ -81,7 +81,16 @@ def load_onnx_model(checkpoint_path, set_cpu=False):
     return sess
 
 
-def retinaface_detect_faces(image, model_path: str, sess=None):
+def retinaface_detect_faces(image, model_path: str, sess=None, max_side: int = 0):
+    """
+    RetinaFace 人脸检测
+    :param image: BGR 图像
+    :param model_path: 模型路径
+    :param sess: 已加载的推理会话，为空时加载
+    :param max_side: 检测分辨率的最大边长，图像更大时先按比例缩小再检测，
+        人脸框与关键点会换算回原图坐标；0 表示使用原图
+    :return: (dets, sess)，dets 每行为 [x1, y1, x2, y2, score, 10 个关键点坐标]
+    """
     cfg = {
         "name": "Resnet50",
         "min_sizes": [[16, 32], [64, 128], [256, 512]],
@@ -109,6 +118,14 @@ def retinaface_detect_faces(image, model_path: str, sess=None):
         retinaface = sess
 
     resize = 1
+    im_height, im_width = image.shape[:2]
+    if max_side > 0 and max(im_height, im_width) > max_side:
+        resize = max_side / max(im_height, im_width)
+        image = cv2.resize(
+            image,
+            (max(1, round(im_width * resize)), max(1, round(im_height * resize))),
+            interpolation=cv2.INTER_AREA,
+        )
 
     # Read and preprocess the image
     img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
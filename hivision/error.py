@@ -20,6 +20,10 @@ class FaceError(Exception):
         super().__init__(err)
         self.face_num = face_num
 
+    def __reduce__(self):
+        # 保证异常在进程池中可以被 pickle 传回主进程
+        return self.__class__, (self.args[0], self.face_num)
+
 
 class APIError(Exception):
     def __init__(self, err, status_code):
@@ -31,3 +35,6 @@ class APIError(Exception):
         """
         super().__init__(err)
         self.status_code = status_code
+
+    def __reduce__(self):
+        return self.__class__, (self.args[0], self.status_code)
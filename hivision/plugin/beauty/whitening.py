@@ -1,17 +1,41 @@
 import cv2
 import numpy as np
 import os
-import gradio as gr
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 
 class LutWhite:
+    """
+    美白 LUT，支持两种模式：
+    - full：256x256x256x3 的完整查找表（48 MB），首次使用时由 LUT 图片生成 .npy 文件，
+      之后以 np.load(mmap_mode="r") 映射加载，多个进程通过系统页缓存共享同一份内存
+    - trilinear：64x64x64x3 的查找表（768 KB），按需三线性插值，占用小但单次计算更慢
+    """
+
     CUBE64_ROWS = 8
     CUBE64_SIZE = 64
     CUBE256_SIZE = 256
     CUBE_SCALE = CUBE256_SIZE // CUBE64_SIZE
+    MODES = ("full", "trilinear")
 
-    def __init__(self, lut_image):
-        self.lut = self._create_lut(lut_image)
+    def __init__(self, lut_image, mode: str = "full", cache_path: str = None):
+        """
+        :param lut_image: 8x8 排列的 64 色立方体 LUT 图片（BGR）
+        :param mode: full 或 trilinear
+        :param cache_path: full 模式下 .npy 文件路径，为空时每次在内存中生成
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported LUT mode: {mode}, expected one of {self.MODES}")
+        self.mode = mode
+        if mode == "trilinear":
+            self.cube = self._create_cube64(lut_image)
+            self._init_trilinear()
+        elif cache_path:
+            self.lut = self._load_or_build_lut(lut_image, cache_path)
+        else:
+            self.lut = self._create_lut(lut_image)
 
     def _create_lut(self, lut_image):
         reshape_lut = np.zeros(
@@ -28,14 +52,126 @@ class LutWhite:
             reshape_lut[i * self.CUBE_SCALE : (i + 1) * self.CUBE_SCALE] = cube256
         return reshape_lut
 
+    def _load_or_build_lut(self, lut_image, cache_path):
+        shape = (self.CUBE256_SIZE,) * 3 + (3,)
+        if os.path.exists(cache_path):
+            try:
+                lut = np.load(cache_path, mmap_mode="r")
+                if lut.shape == shape and lut.dtype == np.uint8:
+                    return lut
+                print(f"Invalid whitening LUT cache {cache_path}, rebuilding")
+            except (OSError, ValueError) as e:
+                print(f"Failed to load whitening LUT cache {cache_path}: {e}, rebuilding")
+
+        lut = self._create_lut(lut_image)
+        # 先写临时文件再替换，避免多个进程同时生成时读到不完整的文件
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, lut)
+            os.replace(tmp_path, cache_path)
+            return np.load(cache_path, mmap_mode="r")
+        except OSError as e:
+            print(f"Failed to write whitening LUT cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return lut
+
+    def _create_cube64(self, lut_image):
+        # cube[b, g, r]：第 b 个切片在 LUT 图片中按 8x8 排列，切片内行为 g、列为 r
+        size, rows = self.CUBE64_SIZE, self.CUBE64_ROWS
+        cube = lut_image[: rows * size, : rows * size].reshape(rows, size, rows, size, 3)
+        return np.ascontiguousarray(cube.transpose(0, 2, 1, 3, 4).reshape(size, size, size, 3))
+
+    def _init_trilinear(self):
+        # 预计算 0~255 每个取值在 64 格立方体中的相邻下标与权重，与 cv2.resize 的像素中心对齐方式一致
+        size = self.CUBE64_SIZE
+        coord = np.clip((np.arange(256) + 0.5) / self.CUBE_SCALE - 0.5, 0, size - 1)
+        lo = np.floor(coord).astype(np.int32)
+        hi = np.minimum(lo + 1, size - 1)
+        self._w = (coord - lo).astype(np.float32)
+        # 展平后的下标偏移：index = b * size^2 + g * size + r
+        self._b = np.stack([lo * size * size, hi * size * size])
+        self._g = np.stack([lo * size, hi * size])
+        self._r = np.stack([lo, hi])
+        self._flat_cube = self.cube.reshape(-1, 3).astype(np.float32)
+
+    def _apply_trilinear(self, src, flat_cube=None):
+        b, g, r = src[:, :, 0], src[:, :, 1], src[:, :, 2]
+        wb, wg, wr = self._w[b][..., None], self._w[g][..., None], self._w[r][..., None]
+        r0, r1 = self._r[0][r], self._r[1][r]
+        cube = self._flat_cube if flat_cube is None else flat_cube
+
+        result = None
+        for bi, wb_i in ((0, 1 - wb), (1, wb)):
+            for gi, wg_i in ((0, 1 - wg), (1, wg)):
+                base = self._b[bi][b] + self._g[gi][g]
+                # 先在 r 方向插值，再乘以 b、g 方向的权重累加
+                c = np.take(cube, base + r0, axis=0)
+                c += (np.take(cube, base + r1, axis=0) - c) * wr
+                c *= wb_i * wg_i
+                result = c if result is None else result + c
+        return np.clip(result + 0.5, 0, 255).astype(np.uint8)
+
     def apply(self, src):
+        if self.mode == "trilinear":
+            return self._apply_trilinear(src)
         b, g, r = src[:, :, 0], src[:, :, 1], src[:, :, 2]
         return self.lut[b, g, r]
 
+    def grid(self) -> np.ndarray:
+        """
+        LUT 定义域上的颜色网格（按 b、g、r 下标排列），用于预合成其他查找表
+        - full：全部 256^3 种颜色
+        - trilinear：64^3 个格点对应的颜色
+        """
+        if self.mode == "trilinear":
+            values = np.clip(np.arange(self.CUBE64_SIZE) * self.CUBE_SCALE + self.CUBE_SCALE // 2, 0, 255)
+        else:
+            values = np.arange(self.CUBE256_SIZE)
+        values = values.astype(np.uint8)
+        n = len(values)
+        grid = np.empty((n, n, n, 3), dtype=np.uint8)
+        grid[..., 0] = values[:, None, None]
+        grid[..., 1] = values[None, :, None]
+        grid[..., 2] = values[None, None, :]
+        return grid
+
+    def apply_table(self, src, table):
+        """
+        使用与 grid() 对应的查找表处理图像
+        :param table: full 模式为 [256, 256, 256, 3] uint8，trilinear 模式为 [64^3, 3] float32
+        """
+        if self.mode == "trilinear":
+            return self._apply_trilinear(src, table)
+        return table[src[:, :, 0], src[:, :, 1], src[:, :, 2]]
+
 
 class MakeWhiter:
-    def __init__(self, lut_image):
-        self.lut_white = LutWhite(lut_image)
+    # 支持的最大美白强度，超出时按最大值处理，预合成查找表的数量因此有上限
+    MAX_STRENGTH = 30
+
+    def __init__(
+        self,
+        lut_image,
+        mode: str = "full",
+        cache_path: str = None,
+        composed_cache_size: int = 4,
+    ):
+        """
+        :param lut_image: LUT 图片
+        :param mode: LUT 模式，见 LutWhite
+        :param cache_path: full 模式下 .npy 文件路径
+        :param composed_cache_size: 内存中保留的预合成查找表数量
+        """
+        self.lut_white = LutWhite(lut_image, mode=mode, cache_path=cache_path)
+        self.cache_path = cache_path
+        self.composed_cache_size = composed_cache_size
+        self._composed = OrderedDict()
+        # 正在合成的查找表 {key: Future}，相同强度的并发请求等待同一次合成
+        self._pending = {}
+        self._executor = None
+        self._lock = threading.Lock()
 
     def run(self, src: np.ndarray, strength: int) -> np.ndarray:
         strength = np.clip(strength / 10.0, 0, 1)
@@ -44,24 +180,112 @@ class MakeWhiter:
         img = self.lut_white.apply(src[:, :, :3])
         return cv2.addWeighted(src[:, :, :3], 1 - strength, img, strength, 0)
 
+    def run_iterative(self, src: np.ndarray, strength: int) -> np.ndarray:
+        """
+        逐次叠加的美白：强度每满 10 完整应用一次 LUT，余数按比例混合
+        """
+        for _ in range(strength // 10):
+            src = self.run(src, 10)
+        return self.run(src, strength % 10)
 
-base_dir = os.path.dirname(os.path.abspath(__file__))
-default_lut = cv2.imread(os.path.join(base_dir, "lut/lut_origin.png"))
-make_whiter = MakeWhiter(default_lut)
+    def apply_strength(self, src: np.ndarray, strength: int, rgb: bool = False) -> np.ndarray:
+        """
+        任意强度的美白。预合成的查找表已就绪时单次查表完成，耗时与强度无关，结果与 run_iterative 一致
+        （trilinear 模式下为近似）；未就绪时本次逐次应用 LUT，同时在后台合成查找表
+        :param src: 3 通道图像
+        :param strength: 美白强度，超过 MAX_STRENGTH 时按 MAX_STRENGTH 处理
+        :param rgb: 输入输出是否为 RGB 顺序，是则直接使用 RGB 下标的查找表，无需转换颜色空间
+        """
+        strength = self._clamp(strength)
+        src = src[:, :, :3]
+        if strength <= 0:
+            return src
+        table = self.composed_table(strength, rgb, wait=False)
+        if table is not None:
+            return self.lut_white.apply_table(src, table)
+        if rgb:
+            bgr = cv2.cvtColor(src, cv2.COLOR_RGB2BGR)
+            return cv2.cvtColor(self.run_iterative(bgr, strength), cv2.COLOR_BGR2RGB)
+        return self.run_iterative(src, strength)
 
+    def composed_table(self, strength: int, rgb: bool = False, wait: bool = True):
+        """
+        获取指定强度的预合成查找表，仅在内存中按 LRU 缓存
 
-def make_whitening(image, strength):
-    image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        查找表在单独的后台线程中逐个合成，锁只保护缓存的查找与写入，合成期间不阻塞其他强度的请求
+        :param wait: 未缓存时是否等待合成完成；为 False 时立即返回 None，
+            且只在没有其他查找表正在合成时才提交合成，强度频繁变化时不会持续占用 CPU
+        """
+        key = (self._clamp(strength), bool(rgb))
+        with self._lock:
+            table = self._composed.get(key)
+            if table is not None:
+                self._composed.move_to_end(key)
+                return table
+            future = self._pending.get(key)
+            if future is None:
+                if not wait and self._pending:
+                    return None
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whitening-compose")
+                future = self._pending[key] = self._executor.submit(self._compose_and_cache, key)
+        return future.result() if wait else None
+
+    def _compose_and_cache(self, key):
+        try:
+            table = self._compose(*key)
+        except BaseException:
+            with self._lock:
+                self._pending.pop(key, None)
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            self._composed[key] = table
+            while len(self._composed) > self.composed_cache_size:
+                self._composed.popitem(last=False)
+        return table
+
+    def _clamp(self, strength: int) -> int:
+        return min(max(int(strength), 0), self.MAX_STRENGTH)
 
-    iteration = strength // 10
-    bias = strength % 10
+    def _compose(self, strength: int, rgb: bool):
+        # 美白是逐像素的颜色映射，直接对 LUT 定义域上的所有颜色执行一遍逐次叠加即可得到合成后的查找表
+        grid = self.lut_white.grid()
+        n = grid.shape[0]
+        table = self.run_iterative(grid.reshape(n * n, n, 3), strength).reshape(grid.shape)
+        if rgb:
+            # table[b, g, r] 为 BGR 颜色，转为以 (r, g, b) 为下标、输出 RGB 颜色的查找表
+            table = table.transpose(2, 1, 0, 3)[..., ::-1]
+        table = np.ascontiguousarray(table)
+        if self.lut_white.mode == "trilinear":
+            return table.reshape(-1, 3).astype(np.float32)
+        return table
 
-    for i in range(iteration):
-        image = make_whiter.run(image, 10)
 
-    image = make_whiter.run(image, bias)
+base_dir = os.path.dirname(os.path.abspath(__file__))
+LUT_IMAGE_PATH = os.path.join(base_dir, "lut/lut_origin.png")
+# 美白 LUT 模式：full（完整 LUT，mmap 共享）或 trilinear（64^3 LUT + 三线性插值）
+WHITENING_LUT_MODE = os.getenv("WHITENING_LUT_MODE", "full")
+# full 模式下生成的 .npy 文件路径
+WHITENING_LUT_CACHE = os.getenv(
+    "WHITENING_LUT_CACHE", os.path.join(base_dir, "lut/lut_origin_256.npy")
+)
+
+# 内存中保留的按强度预合成的查找表数量
+WHITENING_COMPOSED_CACHE_SIZE = int(os.getenv("WHITENING_COMPOSED_CACHE_SIZE", "4"))
+
+default_lut = cv2.imread(LUT_IMAGE_PATH)
+make_whiter = MakeWhiter(
+    default_lut,
+    mode=WHITENING_LUT_MODE,
+    cache_path=WHITENING_LUT_CACHE,
+    composed_cache_size=WHITENING_COMPOSED_CACHE_SIZE,
+)
 
-    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def make_whitening(image, strength):
+    # 使用按强度预合成、以 RGB 为下标的查找表，单次查表完成，耗时与强度无关
+    return make_whiter.apply_strength(np.array(image), strength, rgb=True)
 
 
 def make_whitening_png(image, strength):
@@ -76,8 +300,60 @@ def make_whitening_png(image, strength):
     return cv2.cvtColor(output_image, cv2.COLOR_RGBA2BGRA)
 
 
+def benchmark(image_size=(2000, 1500), repeat=3):
+    """
+    对比各 LUT 模式的启动耗时、常驻内存与单张图片耗时
+    python -m hivision.plugin.beauty.whitening --benchmark
+    """
+    from time import perf_counter
+    import tempfile
+
+    lut_image = cv2.imread(LUT_IMAGE_PATH)
+    image = np.random.randint(0, 256, image_size + (3,), dtype=np.uint8)
+    cache_path = os.path.join(tempfile.mkdtemp(), "lut_origin_256.npy")
+
+    cases = [
+        ("full (build in memory)", dict(mode="full")),
+        ("full (build + save .npy)", dict(mode="full", cache_path=cache_path)),
+        ("full (mmap .npy)", dict(mode="full", cache_path=cache_path)),
+        ("trilinear (64^3)", dict(mode="trilinear")),
+    ]
+    reference = None
+    for name, kwargs in cases:
+        tic = perf_counter()
+        lut_white = LutWhite(lut_image, **kwargs)
+        startup = perf_counter() - tic
+
+        lut = lut_white.cube if lut_white.mode == "trilinear" else lut_white.lut
+        resident = "shared page cache" if isinstance(lut, np.memmap) else f"{lut.nbytes / 1024 / 1024:.2f} MB"
+
+        tic = perf_counter()
+        for _ in range(repeat):
+            result = lut_white.apply(image)
+        apply_time = (perf_counter() - tic) / repeat
+
+        if reference is None:
+            reference = result
+        diff = np.abs(result.astype(np.int16) - reference).mean()
+        print(
+            f"{name:<26} startup {startup * 1000:8.2f}ms | lut {resident:<17} | "
+            f"apply {image_size[1]}x{image_size[0]} {apply_time * 1000:7.2f}ms | "
+            f"mean abs diff {diff:.3f}"
+        )
+
+    os.remove(cache_path)
+
+
 # 启动Gradio应用
 if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
+    import gradio as gr
+
     demo = gr.Interface(
         fn=make_whitening,
         inputs=[
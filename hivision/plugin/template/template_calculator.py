@@ -1,78 +1,194 @@
 import cv2
 import numpy as np
 import json
+import threading
 from hivision.creator.rotation_adjust import rotate_bound
 import os
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 template_config_path = os.path.join(base_path, 'assets', 'template_config.json')
 
-def generte_template_photo(template_name: str, input_image: np.ndarray) -> np.ndarray:
+
+class Template:
     """
-    生成模板照片
-    :param template_name: 模板名称
-    :param input_image: 输入图像
-    :return: 模板照片
+    已加载的模板：配置、照片区域几何信息与预乘 alpha 的模板图像
     """
-    # 读取模板配置json
-    with open(template_config_path, 'r') as f:
-        template_config_dict = json.load(f)
-    # 获取对应该模板的配置
-    template_config = template_config_dict[template_name]
-    
-    template_width = template_config['width']
-    template_height = template_config['height']
-
-    anchor_points = template_config['anchor_points']
-    rotation = anchor_points['rotation']
-    left_top = anchor_points['left_top']
-    right_top = anchor_points['right_top']
-    left_bottom = anchor_points['left_bottom']
-    right_bottom = anchor_points['right_bottom']
-
-    if rotation < 0:
-        height = right_bottom[1] - left_top[1]
-        width = right_top[0] - left_bottom[0]
-    else:
-        height = left_top[1] - right_bottom[1]
-        width = left_bottom[0] - right_top[0]
-
-    # 读取模板图像
-    template_image_path = os.path.join(base_path, 'assets', f'{template_name}.png')
-    template_image = cv2.imread(template_image_path, cv2.IMREAD_UNCHANGED)
 
+    def __init__(self, name: str, config: dict, image: np.ndarray, mtime: float):
+        self.name = name
+        self.width = config['width']
+        self.height = config['height']
+        self.mtime = mtime
+
+        anchor_points = config['anchor_points']
+        self.rotation = anchor_points['rotation']
+        left_top = anchor_points['left_top']
+        right_top = anchor_points['right_top']
+        left_bottom = anchor_points['left_bottom']
+        right_bottom = anchor_points['right_bottom']
+
+        if self.rotation < 0:
+            self.photo_height = right_bottom[1] - left_top[1]
+            self.photo_width = right_top[0] - left_bottom[0]
+        else:
+            self.photo_height = left_top[1] - right_bottom[1]
+            self.photo_width = left_bottom[0] - right_top[0]
+
+        # 照片的粘贴位置
+        self.paste_x = left_bottom[0]
+        self.paste_y = left_top[1]
+
+        # 预乘 alpha：合成时只需 photo * (255 - a) + rgb * a，模板部分在加载时算好
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+        alpha = image[:, :, 3:]
+        self.premultiplied = np.multiply(image[:, :, :3], alpha, dtype=np.uint16)
+        self.inverse_alpha = 255 - alpha
+        self.premultiplied.setflags(write=False)
+        self.inverse_alpha.setflags(write=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "photo_width": self.photo_width,
+            "photo_height": self.photo_height,
+            "rotation": self.rotation,
+        }
+
+
+class TemplateRegistry:
+    """
+    模板注册表
+
+    - 首次使用时才读取配置与模板图像
+    - 每次获取模板时比较配置文件和模板图像的 mtime，文件更新后自动重新加载
+    """
+
+    def __init__(self, assets_path: str = os.path.join(base_path, 'assets')):
+        self.assets_path = assets_path
+        self.config_path = os.path.join(assets_path, 'template_config.json')
+        self._lock = threading.Lock()
+        self._config = {}
+        self._config_mtime = None
+        self._templates = {}
+
+    def _load_config(self) -> dict:
+        mtime = os.path.getmtime(self.config_path)
+        if mtime != self._config_mtime:
+            with open(self.config_path, 'r') as f:
+                self._config = json.load(f)
+            self._config_mtime = mtime
+            # 配置变化后模板的几何信息可能失效，全部重新加载
+            self._templates.clear()
+        return self._config
+
+    def names(self) -> list:
+        """
+        模板名称列表，只读取配置文件（未修改时只检查 mtime），不加载模板图像
+        """
+        with self._lock:
+            return list(self._load_config())
+
+    def get(self, template_name: str) -> Template:
+        """
+        :param template_name: 模板名称
+        :return: 已加载的模板
+        :raises KeyError: 模板不存在
+        :raises OSError: 模板图像不存在
+        :raises ValueError: 模板图像不是带 alpha 通道的 PNG
+
+        锁只保护配置与缓存的读写，模板图像在锁外解码，重新加载一个模板时不阻塞其他模板的获取
+        """
+        with self._lock:
+            config = self._load_config()
+            if template_name not in config:
+                raise KeyError(template_name)
+            template_config = config[template_name]
+            config_mtime = self._config_mtime
+            template = self._templates.get(template_name)
+
+        image_path = os.path.join(self.assets_path, f'{template_name}.png')
+        mtime = os.path.getmtime(image_path)
+        if template is not None and template.mtime == mtime:
+            return template
+
+        image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+        if image is None or image.ndim != 3 or image.shape[2] != 4:
+            raise ValueError(f"模板图像需要是带 alpha 通道的 PNG: {image_path}")
+        template = Template(template_name, template_config, image, mtime)
+
+        with self._lock:
+            # 解码期间配置被重新加载时，不缓存按旧配置构建的模板
+            if self._config_mtime == config_mtime:
+                self._templates[template_name] = template
+        return template
+
+    def describe(self) -> list:
+        """
+        所有模板的信息，图像缺失或无效的模板标记为不可用，不影响其他模板
+        """
+        templates = []
+        for name in self.names():
+            try:
+                templates.append(dict(self.get(name).to_dict(), available=True))
+            except (KeyError, OSError, ValueError) as e:
+                print(f"Template {name} is unavailable: {e}")
+                # 返回给调用方的原因不包含服务器上的文件路径
+                error = "模板图像不存在" if isinstance(e, OSError) else "模板配置或图像无效"
+                templates.append({"name": name, "available": False, "error": error})
+        return templates
+
+
+template_registry = TemplateRegistry()
+
+
+def composite_template(template: Template, input_image: np.ndarray) -> np.ndarray:
+    """
+    把照片放进模板的照片区域，再叠加模板
+    :param template: 已加载的模板
+    :param input_image: 输入图像，RGB
+    :return: 模板照片，RGB
+    """
     # 无损旋转
-    rotated_image = rotate_bound(input_image, -1 * rotation)[0]
+    rotated_image = rotate_bound(input_image, -1 * template.rotation)[0]
     rotated_image_height, rotated_image_width, _ = rotated_image.shape
 
     # 计算缩放比例
-    scale_x = width / rotated_image_width
-    scale_y = height / rotated_image_height
+    scale_x = template.photo_width / rotated_image_width
+    scale_y = template.photo_height / rotated_image_height
     scale = max(scale_x, scale_y)
 
     resized_image = cv2.resize(rotated_image, None, fx=scale, fy=scale)
     resized_height, resized_width, _ = resized_image.shape
 
-    # 创建一个与template_image大小相同的背景，使用白色填充
-    result = np.full((template_height, template_width, 3), 255, dtype=np.uint8)
-
-    # 计算粘贴位置
-    paste_x = left_bottom[0]
-    paste_y = left_top[1]
+    # 创建一个与模板大小相同的背景，使用白色填充
+    result = np.full((template.height, template.width, 3), 255, dtype=np.uint8)
 
     # 确保不会超出边界
-    paste_height = min(resized_height, template_height - paste_y)
-    paste_width = min(resized_width, template_width - paste_x)
+    paste_x, paste_y = template.paste_x, template.paste_y
+    paste_height = min(resized_height, template.height - paste_y)
+    paste_width = min(resized_width, template.width - paste_x)
 
     # 将旋转后的图像粘贴到结果图像上
     result[paste_y:paste_y+paste_height, paste_x:paste_x+paste_width] = resized_image[:paste_height, :paste_width]
-    
-    template_image = cv2.cvtColor(template_image, cv2.COLOR_BGRA2RGBA)
 
-    # 将template_image叠加到结果图像上
-    if template_image.shape[2] == 4:  # 确保template_image有alpha通道
-        alpha = template_image[:, :, 3] / 255.0
-        for c in range(0, 3):
-            result[:, :, c] = result[:, :, c] * (1 - alpha) + template_image[:, :, c] * alpha
+    # 叠加模板，uint16 定点运算：round((photo * (255 - a) + rgb * a) / 255)
+    acc = np.multiply(result, template.inverse_alpha, dtype=np.uint16)
+    acc += template.premultiplied
+    acc += 128
+    acc += acc >> 8
+    np.right_shift(acc, 8, out=acc)
+    np.copyto(result, acc, casting="unsafe")
 
     return result
+
+
+def generte_template_photo(template_name: str, input_image: np.ndarray) -> np.ndarray:
+    """
+    生成模板照片
+    :param template_name: 模板名称
+    :param input_image: 输入图像
+    :return: 模板照片
+    """
+    return composite_template(template_registry.get(template_name), input_image)
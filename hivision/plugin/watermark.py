@@ -6,8 +6,10 @@ import enum
 import os
 import math
 import textwrap
+from functools import lru_cache
+import cv2
+import numpy as np
 from PIL import Image, ImageFont, ImageDraw, ImageEnhance, ImageChops
-import os
 
 base_path = os.path.abspath(os.path.dirname(__file__))
 
@@ -93,37 +95,49 @@ class Watermarker(object):
         return image
 
     def _add_mark_striped(self):
+        """
+        斜向重复水印
+
+        等价于把文字块交错平铺到边长为图像对角线的画布上、旋转后居中贴回原图，
+        但不实际生成和旋转这张画布：缓存一个平铺周期单元，
+        用一次 warpAffine（逆映射 + BORDER_WRAP 取模）直接得到原图大小的水印层，耗时只与原图像素数有关
+        """
         origin_image = self.input_image.convert("RGBA")
-        width = len(self.text) * self.size
-        height = round(self.size * self.font_height_crop)
-        watermark_image = Image.new(mode="RGBA", size=(width, height))
-        draw_table = ImageDraw.Draw(watermark_image)
-        draw_table.text(
-            (0, 0),
+        cell = _striped_cell(
+            self.font_file,
             self.text,
-            fill=self.color,
-            font=ImageFont.truetype(self.font_file, size=self.size),
+            self.size,
+            _hashable_color(self.color),
+            self.opacity,
+            self.space,
+            self.font_height_crop,
         )
-        watermark_image = Watermarker.crop_image_edge(watermark_image)
-        Watermarker.set_image_opacity(watermark_image, self.opacity)
 
-        c = int(math.sqrt(origin_image.size[0] ** 2 + origin_image.size[1] ** 2))
-        watermark_mask = Image.new(mode="RGBA", size=(c, c))
-        y, idx = 0, 0
-        while y < c:
-            x = -int((watermark_image.size[0] + self.space) * 0.5 * idx)
-            idx = (idx + 1) % 2
-            while x < c:
-                watermark_mask.paste(watermark_image, (x, y))
-                x += watermark_image.size[0] + self.space
-            y += watermark_image.size[1] + self.space
+        width, height = origin_image.size
+        c = int(math.sqrt(width**2 + height**2))
+        offset_x, offset_y = int((width - c) / 2), int((height - c) / 2)
 
-        watermark_mask = watermark_mask.rotate(self.angle)
-        origin_image.paste(
-            watermark_mask,
-            (int((origin_image.size[0] - c) / 2), int((origin_image.size[1] - c) / 2)),
-            mask=watermark_mask.split()[3],
+        # 与 Image.rotate 相同的逆映射：原图像素中心 -> 旋转前画布坐标，
+        # warpAffine 最近邻按四舍五入取整，因此平移量再减 0.5 以对齐 Image.rotate 的向下取整
+        theta = -math.radians(self.angle % 360.0)
+        cos_t, sin_t = round(math.cos(theta), 15), round(math.sin(theta), 15)
+        center = c / 2
+        dx, dy = 0.5 - offset_x - center, 0.5 - offset_y - center
+        matrix = np.array(
+            [
+                [cos_t, sin_t, cos_t * dx + sin_t * dy + center - 0.5],
+                [-sin_t, cos_t, -sin_t * dx + cos_t * dy + center - 0.5],
+            ]
+        )
+        mark = cv2.warpAffine(
+            cell,
+            matrix,
+            (width, height),
+            flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_WRAP,
         )
+        mark_image = Image.fromarray(mark)
+        origin_image.paste(mark_image, (0, 0), mask=mark_image)
         return origin_image
 
     def _add_mark_central(self):
@@ -132,16 +146,15 @@ class Watermarker(object):
         text = "\n".join(text_lines)
         width = len(text) * self.size
         height = round(self.size * self.font_height_crop * len(text_lines))
-        watermark_image = Image.new(mode="RGBA", size=(width, height))
-        draw_table = ImageDraw.Draw(watermark_image)
-        draw_table.text(
-            (0, 0),
+        watermark_image = _text_tile(
+            self.font_file,
             text,
-            fill=self.color,
-            font=ImageFont.truetype(self.font_file, size=self.size),
+            self.size,
+            _hashable_color(self.color),
+            self.opacity,
+            width,
+            height,
         )
-        watermark_image = Watermarker.crop_image_edge(watermark_image)
-        Watermarker.set_image_opacity(watermark_image, self.opacity)
 
         c = int(math.sqrt(origin_image.size[0] ** 2 + origin_image.size[1] ** 2))
         watermark_mask = Image.new(mode="RGBA", size=(c, c))
@@ -178,6 +191,58 @@ class Watermarker(object):
             self.image.save(f, image_format)
 
 
+def _hashable_color(color):
+    # 颜色可能以列表形式传入，转成元组后才能作为缓存键
+    return tuple(color) if isinstance(color, list) else color
+
+
+@lru_cache(maxsize=8)
+def _load_font(font_file: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_file, size=size)
+
+
+@lru_cache(maxsize=32)
+def _text_tile(font_file, text, size, color, opacity, width, height) -> Image.Image:
+    """
+    渲染单个文字块：按给定画布大小绘制文字、裁掉空白边缘并应用透明度
+    返回的图像会被多次复用，调用方不要原地修改
+    """
+    watermark_image = Image.new(mode="RGBA", size=(width, height))
+    draw_table = ImageDraw.Draw(watermark_image)
+    draw_table.text((0, 0), text, fill=color, font=_load_font(font_file, size))
+    watermark_image = Watermarker.crop_image_edge(watermark_image)
+    return Watermarker.set_image_opacity(watermark_image, opacity)
+
+
+@lru_cache(maxsize=32)
+def _striped_cell(font_file, text, size, color, opacity, space, font_height_crop) -> np.ndarray:
+    """
+    斜向重复水印的一个平铺周期（两行）：文字块放在左上角，右侧和下方补 space 的透明间距，
+    第二行左移半个周期，与交错平铺一致
+    :return: [2 * cell_height, cell_width, 4] 的只读 RGBA 数组
+    """
+    tile = _text_tile(
+        font_file,
+        text,
+        size,
+        color,
+        opacity,
+        len(text) * size,
+        round(size * font_height_crop),
+    )
+    tile_width, tile_height = tile.size
+    # space 为负时文字块互相重叠，后贴的文字块覆盖先贴的，取模后同样只保留后者
+    cell_width = max(1, tile_width + space)
+    cell_height = max(1, tile_height + space)
+
+    row = np.zeros((cell_height, cell_width, 4), dtype=np.uint8)
+    tile = np.array(tile)[:cell_height, :cell_width]
+    row[: tile.shape[0], : tile.shape[1]] = tile
+    cell = np.concatenate([row, np.roll(row, -int(cell_width * 0.5), axis=1)], axis=0)
+    cell.setflags(write=False)
+    return cell
+
+
 # Gradio 接口
 def watermark_image(
     image,
@@ -5,6 +5,7 @@ import io
 import numpy as np
 import cv2
 import base64
+from functools import lru_cache
 from hivision.plugin.watermark import Watermarker, WatermarkerStyles
 
 
@@ -32,19 +33,7 @@ def save_image_dpi_to_bytes(image: np.ndarray, output_image_path: str = None, dp
     return image_bytes
 
 
-def resize_image_to_kb(input_image: np.ndarray, output_image_path: str = None, target_size_kb: int = 100, dpi: int = 300):
-    """
-    Resize an image to a target size in KB.
-    将图像调整大小至目标文件大小（KB）。
-
-    :param input_image_path: Path to the input image. 输入图像的路径。
-    :param output_image_path: Path to save the resized image. 保存调整大小后的图像的路径。
-    :param target_size_kb: Target size in KB. 目标文件大小（KB）。
-
-    Example:
-    resize_image_to_kb('input_image.jpg', 'output_image.jpg', 50)
-    """
-
+def _to_rgb_image(input_image) -> Image.Image:
     if isinstance(input_image, np.ndarray):
         img = Image.fromarray(input_image)
     elif isinstance(input_image, Image.Image):
@@ -55,43 +44,129 @@ def resize_image_to_kb(input_image: np.ndarray, output_image_path: str = None, t
     # Convert image to RGB mode if it's not
     if img.mode != "RGB":
         img = img.convert("RGB")
+    return img
+
 
-    # Initial quality value
-    quality = 95
+def _encode_jpeg(img: Image.Image, quality: int, dpi: int = None) -> bytes:
+    img_byte_arr = io.BytesIO()
+    if dpi:
+        img.save(img_byte_arr, format="JPEG", quality=quality, dpi=(dpi, dpi))
+    else:
+        img.save(img_byte_arr, format="JPEG", quality=quality)
+    return img_byte_arr.getvalue()
 
+
+def _search_jpeg_quality(img: Image.Image, target_bytes: int, dpi: int = None, tolerance: float = 0.05):
+    """
+    查找不超过目标大小的最高 JPEG 质量（1~95）
+    首次以质量 95 编码，按目标大小与该次体积之比估算第一个探测点，
+    之后在已知上下界之间按 log(体积) 线性插值，插值停滞或越界时退化为二分
+    :param tolerance: 结果体积达到目标的 (1 - tolerance) 即可提前结束
+    :return: (编码结果, 质量, 编码次数)；质量 1 仍超出目标时返回质量 1 的结果
+    """
+    data = _encode_jpeg(img, 95, dpi)
+    attempts = 1
+    if len(data) <= target_bytes:
+        return data, 95, attempts
+
+    # lo 为已知满足目标的最高质量（质量 0 表示还没有），hi 为已知超出目标的最低质量
+    lo, hi = (0, 0, None), (95, len(data), data)
+    quality = max(1, int(95 * target_bytes / len(data)))
+    last_side = None
     while True:
-        # Create a BytesIO object to hold the image data in memory
-        img_byte_arr = io.BytesIO()
+        data = _encode_jpeg(img, quality, dpi)
+        attempts += 1
+        if len(data) <= target_bytes:
+            lo = (quality, len(data), data)
+            if len(data) >= target_bytes * (1 - tolerance):
+                break
+            side = "lo"
+        else:
+            hi = (quality, len(data), data)
+            side = "hi"
+        # 同一侧边界连续移动说明插值停滞
+        stalled, last_side = side == last_side, side
+
+        if hi[0] - lo[0] <= 1:
+            break
+        quality = 0
+        if lo[2] is not None and not stalled:
+            ratio = np.log(target_bytes / lo[1]) / np.log(hi[1] / lo[1])
+            quality = lo[0] + int(round((hi[0] - lo[0]) * ratio))
+        if not lo[0] < quality < hi[0]:
+            quality = (lo[0] + hi[0] + 1) // 2
+            last_side = None
+
+    best = lo if lo[2] is not None else hi
+    return best[2], best[0], attempts
+
+
+def encode_image_to_kb(input_image, target_size_kb: float, dpi: int = 300, pad: bool = True, min_side: int = 16):
+    """
+    将图像编码为不超过目标大小的 JPEG，并返回编码信息
+    - 按体积插值查找 JPEG 质量，插值停滞时二分
+    - 质量 1 仍超出目标时，按体积比例缩小图像后重新查找
+    - pad 为 True 时，用 0 字节把结果补齐到目标大小
+
+    :param input_image: NumPy 数组或 PIL 图像
+    :param target_size_kb: 目标文件大小（KB）
+    :param dpi: 写入 JPEG 的 DPI，为空时不写入
+    :param pad: 是否补齐到目标大小
+    :param min_side: 缩小图像时的最小边长
+    :return: (图像字节, {"quality", "attempts", "scale", "size_kb"})
+    """
+    img = _to_rgb_image(input_image)
 
-        # Save the image to the BytesIO object with the current quality
-        img.save(img_byte_arr, format="JPEG", quality=quality, dpi=(dpi, dpi))
+    target_bytes = int(target_size_kb * 1024)
+    original_width = img.width
+    attempts = 0
+    while True:
+        data, quality, n = _search_jpeg_quality(img, target_bytes, dpi)
+        attempts += n
+        if len(data) <= target_bytes or min(img.size) <= min_side:
+            break
+        # 质量 1 仍然超出目标，按体积比例缩小后重试
+        factor = min(0.9, (target_bytes / len(data)) ** 0.5 * 0.95)
+        new_size = (
+            max(min_side, int(img.width * factor)),
+            max(min_side, int(img.height * factor)),
+        )
+        img = img.resize(new_size, Image.LANCZOS)
+
+    info = {
+        "quality": quality,
+        "attempts": attempts,
+        "scale": round(img.width / original_width, 4),
+        "size_kb": round(len(data) / 1024, 2),
+    }
+
+    # If the image is smaller than the target size, add padding
+    if pad and len(data) < target_bytes:
+        data += b"\x00" * (target_bytes - len(data))
 
-        # Get the size of the image in KB
-        img_size_kb = len(img_byte_arr.getvalue()) / 1024
+    return data, info
 
-        # Check if the image size is within the target size
-        if img_size_kb <= target_size_kb or quality == 1:
-            # If the image is smaller than the target size, add padding
-            if img_size_kb < target_size_kb:
-                padding_size = int(
-                    (target_size_kb * 1024) - len(img_byte_arr.getvalue())
-                )
-                padding = b"\x00" * padding_size
-                img_byte_arr.write(padding)
 
-            # Save the image to the output path
-            if output_image_path:
-                with open(output_image_path, "wb") as f:
-                    f.write(img_byte_arr.getvalue())
-            
-            return img_byte_arr.getvalue()
+def resize_image_to_kb(input_image: np.ndarray, output_image_path: str = None, target_size_kb: int = 100, dpi: int = 300):
+    """
+    Resize an image to a target size in KB.
+    将图像调整大小至目标文件大小（KB）。
+
+    :param input_image_path: Path to the input image. 输入图像的路径。
+    :param output_image_path: Path to save the resized image. 保存调整大小后的图像的路径。
+    :param target_size_kb: Target size in KB. 目标文件大小（KB）。
 
-        # Reduce the quality if the image is still too large
-        quality -= 5
+    Example:
+    resize_image_to_kb('input_image.jpg', 'output_image.jpg', 50)
+    """
+    image_bytes, _ = encode_image_to_kb(input_image, target_size_kb, dpi=dpi)
+
+    # Save the image to the output path
+    if output_image_path:
+        with open(output_image_path, "wb") as f:
+            f.write(image_bytes)
 
-        # Ensure quality does not go below 1
-        if quality < 1:
-            quality = 1
+    return image_bytes
 
 
 def resize_image_to_kb_base64(input_image, target_size_kb, mode="exact"):
@@ -105,65 +180,16 @@ def resize_image_to_kb_base64(input_image, target_size_kb, mode="exact"):
 
     :return: Base64 encoded string of the resized image. 调整大小后的图像的base64编码字符串。
     """
-
-    if isinstance(input_image, np.ndarray):
-        img = Image.fromarray(input_image)
-    elif isinstance(input_image, Image.Image):
-        img = input_image
+    if mode == "min":
+        # 降低质量只会让体积更小，质量 95 的结果即是能得到的最大体积
+        image_bytes = _encode_jpeg(_to_rgb_image(input_image), 95)
     else:
-        raise ValueError("input_image must be a NumPy array or PIL Image.")
-
-    # Convert image to RGB mode if it's not
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-
-    # Initial quality value
-    quality = 95
-
-    while True:
-        # Create a BytesIO object to hold the image data in memory
-        img_byte_arr = io.BytesIO()
-
-        # Save the image to the BytesIO object with the current quality
-        img.save(img_byte_arr, format="JPEG", quality=quality)
-
-        # Get the size of the image in KB
-        img_size_kb = len(img_byte_arr.getvalue()) / 1024
-
-        # Check based on the mode
-        if mode == "exact":
-            # If the image size is equal to the target size, we can return it
-            if img_size_kb == target_size_kb:
-                break
-
-            # If the image is smaller than the target size, add padding
-            elif img_size_kb < target_size_kb:
-                padding_size = int(
-                    (target_size_kb * 1024) - len(img_byte_arr.getvalue())
-                )
-                padding = b"\x00" * padding_size
-                img_byte_arr.write(padding)
-                break
-
-        elif mode == "max":
-            # If the image size is within the target size, we can return it
-            if img_size_kb <= target_size_kb or quality == 1:
-                break
-
-        elif mode == "min":
-            # If the image size is greater than or equal to the target size, we can return it
-            if img_size_kb >= target_size_kb:
-                break
-
-        # Reduce the quality if the image is still too large
-        quality -= 5
-
-        # Ensure quality does not go below 1
-        if quality < 1:
-            quality = 1
+        image_bytes, _ = encode_image_to_kb(
+            input_image, target_size_kb, dpi=None, pad=mode == "exact"
+        )
 
     # Encode the image data to base64
-    img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode("utf-8")
+    img_base64 = base64.b64encode(image_bytes).decode("utf-8")
     return "data:image/png;base64," + img_base64
 
 
@@ -181,13 +207,17 @@ def base64_2_numpy(base64_image: str) -> np.ndarray:
     
     # Decode base64 string to bytes
     img_bytes = base64.b64decode(base64_image)
-    
+
+    return bytes_2_numpy(img_bytes)
+
+# 图像字节流（PNG/JPEG 等编码后的文件内容）转numpy
+def bytes_2_numpy(img_bytes: bytes) -> np.ndarray:
     # Convert bytes to numpy array
     img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-    
+
     # Decode the image array
     img = cv2.imdecode(img_array, cv2.IMREAD_UNCHANGED)
-    
+
     return img
 
 # 字节流转base64
@@ -228,105 +258,140 @@ def hex_to_rgb(value):
     )
 
 
-def generate_gradient(start_color, width, height, mode="updown"):
-    # 定义背景颜色
-    end_color = (255, 255, 255)  # 白色
-
-    # 创建一个空白图像
-    r_out = np.zeros((height, width), dtype=int)
-    g_out = np.zeros((height, width), dtype=int)
-    b_out = np.zeros((height, width), dtype=int)
-
-    if mode == "updown":
-        # 生成上下渐变色
-        for y in range(height):
-            r = int(
-                (y / height) * end_color[0] + ((height - y) / height) * start_color[0]
-            )
-            g = int(
-                (y / height) * end_color[1] + ((height - y) / height) * start_color[1]
-            )
-            b = int(
-                (y / height) * end_color[2] + ((height - y) / height) * start_color[2]
-            )
-            r_out[y, :] = r
-            g_out[y, :] = g
-            b_out[y, :] = b
+@lru_cache(maxsize=8)
+def background_plane(bgr, width, height, mode="pure_color"):
+    """
+    生成背景底图，相同的 (颜色, 尺寸, 模式) 会复用缓存
+    :param bgr: tuple, 背景的 BGR 值，渐变模式下为起始颜色（渐变到白色）
+    :param width: 宽度
+    :param height: 高度
+    :param mode: pure_color（纯色）、updown_gradient（上下渐变）或 center_gradient（中心渐变）
+    :return: numpy.array(height, width, 3), uint8 的 BGR 图像，只读
+    """
+    start_color = np.array(bgr, dtype=np.float64)
+    end_color = np.array((255, 255, 255), dtype=np.float64)
 
+    if mode == "pure_color":
+        plane = np.empty((height, width, 3), dtype=np.uint8)
+        plane[:] = np.array(bgr, dtype=np.uint8)
     else:
-        # 生成中心渐变色
-        img = np.zeros((height, width, 3))
-        # 定义椭圆中心和半径
-        center = (width // 2, height // 2)
-        end_axies = max(height, width)
-        # 定义渐变色
-        end_color = (255, 255, 255)
-        # 绘制椭圆
-        for y in range(end_axies):
-            axes = (end_axies - y, end_axies - y)
-            r = int(
-                (y / end_axies) * end_color[0]
-                + ((end_axies - y) / end_axies) * start_color[0]
-            )
-            g = int(
-                (y / end_axies) * end_color[1]
-                + ((end_axies - y) / end_axies) * start_color[1]
-            )
-            b = int(
-                (y / end_axies) * end_color[2]
-                + ((end_axies - y) / end_axies) * start_color[2]
-            )
-
-            cv2.ellipse(img, center, axes, 0, 0, 360, (b, g, r), -1)
-        b_out, g_out, r_out = cv2.split(np.uint64(img))
-
-    return r_out, g_out, b_out
-
-
-def add_background(input_image, bgr=(0, 0, 0), mode="pure_color"):
+        if mode == "updown_gradient":
+            # 第 y 行的颜色：y / height 处的线性插值
+            steps, total = np.arange(height, dtype=np.float64)[:, None], height
+        else:
+            # 中心渐变：由外向内逐圈覆盖的同心圆，像素颜色由包含它的最小圆决定，
+            # 半径为 ceil(距离)，对应第 total - 半径 圈。
+            # 原实现用 cv2.ellipse 绘制（多边形近似的圆），圈的边缘与这里的真实圆不完全一致，
+            # 结果与原实现最多相差 2 个色阶（120x200 时约 31% 的像素不同，2000x1500 时约 1.8%）；
+            # 上下渐变与纯色与原实现完全一致
+            total = max(height, width)
+            yy = np.arange(height, dtype=np.float64)[:, None] - height // 2
+            xx = np.arange(width, dtype=np.float64)[None, :] - width // 2
+            radius = np.clip(np.ceil(np.sqrt(yy * yy + xx * xx)), 1, total)
+            steps = total - radius
+        # 截断取整，与逐行/逐圈计算时的 int() 一致
+        plane = (
+            (steps / total)[..., None] * end_color
+            + ((total - steps) / total)[..., None] * start_color
+        ).astype(np.uint8)
+        plane = np.ascontiguousarray(np.broadcast_to(plane, (height, width, 3)))
+
+    plane.setflags(write=False)
+    return plane
+
+
+def generate_gradient(start_color, width, height, mode="updown"):
+    """
+    生成渐变背景，返回三个通道（顺序与 start_color 一致）
+    :param start_color: tuple, 起始颜色，渐变到白色
+    :param mode: updown（上下渐变）或 center（中心渐变）
+    """
+    plane = background_plane(
+        tuple(int(c) for c in start_color),
+        int(width),
+        int(height),
+        "updown_gradient" if mode == "updown" else "center_gradient",
+    )
+    return plane[:, :, 0], plane[:, :, 1], plane[:, :, 2]
+
+
+def alpha_composite(
+    foreground: np.ndarray,
+    background: np.ndarray,
+    out: np.ndarray = None,
+    block_rows: int = 256,
+) -> np.ndarray:
+    """
+    透明图像与背景的 alpha 合成，uint16 定点运算：
+    out = round((fg * a + bg * (255 - a)) / 255)
+    按行分块处理，临时缓冲区只占用 block_rows 行，避免整幅 float64 中间结果
+    :param foreground: numpy.array(height, width, 4), uint8 的透明图像
+    :param background: numpy.array(height, width, 3), uint8 的背景图像
+    :param out: 预分配的输出缓冲区 (height, width, 3) uint8，为空时新建；可以与 background 相同
+    :param block_rows: 每次处理的行数
+    :return: out
+    """
+    height, width = foreground.shape[:2]
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+
+    rows = max(1, min(block_rows, height))
+    acc = np.empty((rows, width, 3), dtype=np.uint16)
+    tmp = np.empty((rows, width, 3), dtype=np.uint16)
+    inv_alpha = np.empty((rows, width, 1), dtype=np.uint8)
+    for y in range(0, height, rows):
+        n = min(rows, height - y)
+        fg = foreground[y : y + n]
+        alpha = fg[:, :, 3:]
+        acc_n, tmp_n, inv_n = acc[:n], tmp[:n], inv_alpha[:n]
+
+        np.multiply(fg[:, :, :3], alpha, out=acc_n, dtype=np.uint16)
+        np.subtract(255, alpha, out=inv_n)
+        np.multiply(background[y : y + n], inv_n, out=tmp_n, dtype=np.uint16)
+        acc_n += tmp_n
+        # x / 255 四舍五入的整数实现：(x + 128 + ((x + 128) >> 8)) >> 8，x <= 255 * 255 时精确
+        acc_n += 128
+        np.right_shift(acc_n, 8, out=tmp_n)
+        acc_n += tmp_n
+        np.right_shift(acc_n, 8, out=acc_n)
+        np.copyto(out[y : y + n], acc_n, casting="unsafe")
+
+    return out
+
+
+def add_background(input_image, bgr=(0, 0, 0), mode="pure_color", out=None):
     """
     本函数的功能为为透明图像加上背景。
     :param input_image: numpy.array(4 channels), 透明图像
     :param bgr: tuple, 合成纯色底时的 BGR 值
-    :param new_background: numpy.array(3 channels)，合成自定义图像底时的背景图
-    :return: output: 合成好的输出图像
+    :param mode: pure_color、updown_gradient 或 center_gradient
+    :param out: 预分配的输出缓冲区 (height, width, 3) uint8，为空时新建
+    :return: output: 合成好的输出图像，uint8
     """
     height, width = input_image.shape[0], input_image.shape[1]
-    try:
-        b, g, r, a = cv2.split(input_image)
-    except ValueError:
+    if input_image.ndim != 3 or input_image.shape[2] != 4:
         raise ValueError(
             "The input image must have 4 channels. 输入图像必须有4个通道，即透明图像。"
         )
 
-    a_cal = a / 255
-    if mode == "pure_color":
-        # 纯色填充
-        b2 = np.full([height, width], bgr[0], dtype=int)
-        g2 = np.full([height, width], bgr[1], dtype=int)
-        r2 = np.full([height, width], bgr[2], dtype=int)
-    elif mode == "updown_gradient":
-        b2, g2, r2 = generate_gradient(bgr, width, height, mode="updown")
-    else:
-        b2, g2, r2 = generate_gradient(bgr, width, height, mode="center")
+    if mode not in ("pure_color", "updown_gradient"):
+        mode = "center_gradient"
+    background = background_plane(tuple(int(c) for c in bgr), width, height, mode)
 
-    output = cv2.merge(
-        ((b - b2) * a_cal + b2, (g - g2) * a_cal + g2, (r - r2) * a_cal + r2)
-    )
+    return alpha_composite(input_image, background, out=out)
 
-    return output
-
-def add_background_with_image(input_image: np.ndarray, background_image: np.ndarray) -> np.ndarray:
+def add_background_with_image(
+    input_image: np.ndarray, background_image: np.ndarray, out: np.ndarray = None
+) -> np.ndarray:
     """
     本函数的功能为为透明图像加上背景。
     :param input_image: numpy.array(4 channels), 透明图像
     :param background_image: numpy.array(3 channels), 背景图像
+    :param out: 预分配的输出缓冲区 (height, width, 3) uint8，为空时新建
     :return: output: 合成好的输出图像
     """
     height, width = input_image.shape[:2]
-    try:
-        b, g, r, a = cv2.split(input_image)
-    except ValueError:
+    if input_image.ndim != 3 or input_image.shape[2] != 4:
         raise ValueError(
             "The input image must have 4 channels. 输入图像必须有4个通道，即透明图像。"
         )
@@ -334,18 +399,8 @@ def add_background_with_image(input_image: np.ndarray, background_image: np.ndar
     # 确保背景图像与输入图像大小一致
     background_image = cv2.resize(background_image, (width, height), cv2.INTER_AREA)
     background_image = cv2.cvtColor(background_image, cv2.COLOR_BGR2RGB)
-    b2, g2, r2 = cv2.split(background_image)
 
-    a_cal = a / 255.0
-
-    # 修正混合公式
-    output = cv2.merge(
-        (b * a_cal + b2 * (1 - a_cal),
-         g * a_cal + g2 * (1 - a_cal),
-         r * a_cal + r2 * (1 - a_cal))
-    )
-
-    return output.astype(np.uint8)
+    return alpha_composite(input_image, background_image, out=out)
 
 def add_watermark(
     image, text, size=50, opacity=0.5, angle=45, color="#8B8B1B", space=75
@@ -362,3 +417,50 @@ def add_watermark(
         space=space,
     )
     return np.array(watermarker.image.convert("RGB"))
+
+
+if __name__ == "__main__":
+    # 合成基准测试：python -m hivision.utils
+    import tracemalloc
+    from time import perf_counter
+
+    def _add_background_float(input_image, bgr):
+        # 原先的 float64 逐通道实现，仅用于对比
+        height, width = input_image.shape[:2]
+        b, g, r, a = cv2.split(input_image)
+        a_cal = a / 255
+        b2 = np.full([height, width], bgr[0], dtype=int)
+        g2 = np.full([height, width], bgr[1], dtype=int)
+        r2 = np.full([height, width], bgr[2], dtype=int)
+        output = cv2.merge(
+            ((b - b2) * a_cal + b2, (g - g2) * a_cal + g2, (r - r2) * a_cal + r2)
+        )
+        return output.astype(np.uint8)
+
+    def _measure(fn, repeat=5):
+        fn()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        tic = perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (perf_counter() - tic) / repeat, peak
+
+    image = np.random.randint(0, 256, (2000, 1500, 4), dtype=np.uint8)
+    bgr = (30, 120, 200)
+    buffer = np.empty((2000, 1500, 3), dtype=np.uint8)
+    cases = [
+        ("float64 (legacy)", lambda: _add_background_float(image, bgr)),
+        ("uint16 fixed point", lambda: add_background(image, bgr)),
+        ("uint16 fixed point + out", lambda: add_background(image, bgr, out=buffer)),
+    ]
+    reference = _add_background_float(image, bgr)
+    for name, fn in cases:
+        latency, peak = _measure(fn)
+        diff = np.abs(fn().astype(np.int16) - reference).max()
+        print(
+            f"{name:<26} 2000x1500 RGBA | latency {latency * 1000:7.2f}ms | "
+            f"peak memory {peak / 1024 / 1024:7.2f}MB | max diff vs legacy {diff}"
+        )
@@ -67,11 +67,98 @@ async def startup_event():
     """应用启动时的事件处理"""
     logger.info(f"API 服务启动 - 环境: {current_env}")
 
+    # 配置证件照模型管理器，并预加载常用模型
+    from hivision.creator.model_manager import model_manager
+    model_manager.configure(
+        memory_budget_mb=config.MODEL_MEMORY_BUDGET_MB,
+        intra_op_threads=config.ONNX_INTRA_OP_THREADS,
+        inter_op_threads=config.ONNX_INTER_OP_THREADS,
+        keep_alive=config.MODEL_KEEP_ALIVE_SECONDS,
+    )
+    from hivision.creator.matting_batcher import configure_batching
+    configure_batching(
+        max_batch_size=config.MATTING_MAX_BATCH,
+        max_wait_ms=config.MATTING_BATCH_WAIT_MS,
+    )
+    if config.MODEL_PRELOAD:
+        logger.info(f"预加载模型: {config.MODEL_PRELOAD}")
+        model_manager.warmup(config.MODEL_PRELOAD, pin=True)
+
+    # 初始化爬虫共享的 HTTP 客户端连接池
+    from src.utils.http_client import http_clients
+    http_clients.start()
+
+    # 初始化解析结果缓存
+    from src.utils.analyze_cache import analyze_cache
+    analyze_cache.start()
+
+    # 合并相同内容的并发解析请求
+    from src.utils.single_flight import analyze_flights
+    analyze_flights.start()
+
+    # 初始化分享短链解析缓存
+    from src.utils.short_link import short_links
+    short_links.start()
+
+    # 配置抖音获取策略的对冲调度
+    from src.crawlers.douyin.strategy_scheduler import strategy_scheduler
+    strategy_scheduler.configure(
+        hedge_delay=config.DOUYIN_HEDGE_DELAY,
+        max_parallel=config.DOUYIN_STRATEGY_MAX_PARALLEL,
+        window=config.DOUYIN_STRATEGY_WINDOW,
+    )
+
+    # 预编译抖音请求配置，config.yaml 修改后自动重新加载
+    from src.crawlers.douyin.request_profile import douyin_profiles
+    douyin_profiles.check_interval = config.DOUYIN_PROFILE_CHECK_INTERVAL
+    douyin_profiles.get()
+
+    # 启动抖音 msToken / ttwid 后台令牌池
+    from src.crawlers.douyin.token_pool import token_pool
+    token_pool.configure(
+        size=config.DOUYIN_TOKEN_POOL_SIZE,
+        ttl=config.DOUYIN_TOKEN_TTL,
+        refresh_interval=config.DOUYIN_TOKEN_REFRESH_INTERVAL,
+        refresh_ahead=config.DOUYIN_TOKEN_REFRESH_AHEAD,
+    )
+    token_pool.start()
+
+    # 配置爬虫按主机的熔断与限流
+    from src.crawlers.circuit_breaker import host_guards
+    host_guards.configure(
+        enabled=config.CIRCUIT_BREAKER_ENABLED,
+        failure_threshold=config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        open_seconds=config.CIRCUIT_BREAKER_OPEN_SECONDS,
+        max_open_seconds=config.CIRCUIT_BREAKER_MAX_OPEN_SECONDS,
+        half_open_probes=config.CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+        rate=config.HOST_RATE_LIMIT,
+        burst=config.HOST_RATE_BURST,
+        host_rates=config.HOST_RATE_LIMITS,
+        max_wait=config.HOST_RATE_MAX_WAIT,
+        retry_backoff=config.CRAWLER_RETRY_BACKOFF,
+    )
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的事件处理"""
     logger.info("API 服务关闭")
 
+    # 关闭证件照等工作池
+    from src.utils.worker_pool import shutdown_pools
+    shutdown_pools(wait=False)
+
+    # 停止抖音令牌池的后台刷新
+    from src.crawlers.douyin.token_pool import token_pool
+    await token_pool.stop()
+
+    # 关闭共享的 HTTP 客户端
+    from src.utils.http_client import http_clients
+    await http_clients.aclose()
+
+    # 关闭解析结果缓存的二级缓存后端
+    from src.utils.analyze_cache import analyze_cache
+    await analyze_cache.aclose()
+
 # Root endpoint
 @app.get("/")
 async def root():
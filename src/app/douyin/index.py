@@ -1,30 +1,21 @@
 import json
 import os
-import yaml
 import httpx
 from src.crawlers.base_crawler import BaseCrawler
 from src.crawlers.douyin.endpoints import DouyinAPIEndpoints
 from src.crawlers.douyin.util import AwemeIdFetcher, BogusManager
-from src.crawlers.util import PostDetail
+from src.crawlers.douyin.strategy_scheduler import strategy_scheduler
+from src.crawlers.douyin.token_pool import token_pool
+from src.crawlers.douyin.request_profile import douyin_profiles
 from src.crawlers.exceptions import APIResponseError
 from src.utils import get_analyze_logger, config
 from src.utils.index import find_url
 from src.utils.response import Response
 from urllib.parse import urlencode
-from pathlib import Path
 
 
 logger = get_analyze_logger()
 
-# 配置文件路径
-# Read the configuration file
-path = Path(__file__).parent.parent.parent / "crawlers" / "douyin" / "config.yaml"
-
-# 读取配置文件
-with open(f"{path}", "r", encoding="utf-8") as f:
-    douyinConfig = yaml.safe_load(f)
-    logger.info(f"douyinConfig: {douyinConfig}")
-
 
 class Douyin:
     def __init__(self, text, type):
@@ -35,41 +26,52 @@ class Douyin:
         self.video_data = None
         # 初始化时不执行异步操作，而是在需要时调用
 
+    @property
+    def content_id(self):
+        """作品的唯一 ID，用于缓存"""
+        return self.aweme_id
+
+    async def resolve_id(self):
+        """解析分享链接得到 aweme_id，不请求作品数据"""
+        if self.aweme_id is None:
+            self.aweme_id = await AwemeIdFetcher.get_aweme_id(self.url)
+            logger.info(f"aweme_id: {self.aweme_id}")
+        return self.aweme_id
+
     async def initialize(self):
         """异步初始化方法"""
         try:
-            self.aweme_id = await AwemeIdFetcher.get_aweme_id(self.url)
-            logger.info(f"aweme_id: {self.aweme_id}")
+            await self.resolve_id()
             self.video_data = await self.fetch_one_video(self.aweme_id)
             logger.info(f"video_data: {self.video_data}")
         except Exception as e:
             logger.error(f"初始化抖音数据时出错: {str(e)}", exc_info=True)
             raise
 
-    # 从配置文件中获取抖音的请求头
+    @staticmethod
+    def get_douyin_cookie(profiles) -> str:
+        cookie = profiles.cookie
+        if "ttwid=" not in cookie:
+            # 配置的 Cookie 中没有 ttwid 时使用令牌池中的 ttwid
+            ttwid = token_pool.ttwid()
+            if ttwid:
+                cookie = f"{cookie}; ttwid={ttwid}" if cookie else f"ttwid={ttwid}"
+        return cookie
+
+    # 从预编译的请求配置中获取抖音的请求头
     async def get_douyin_headers(self):
-        douyin_config = douyinConfig["TokenManager"]["douyin"]
+        profiles = douyin_profiles.get()
+        headers = dict(profiles.headers)
+        headers["Cookie"] = self.get_douyin_cookie(profiles)
         kwargs = {
-            "headers": {
-                "Accept-Language": douyin_config["headers"]["Accept-Language"],
-                "User-Agent": douyin_config["headers"]["User-Agent"],
-                "Referer": douyin_config["headers"]["Referer"],
-                "Cookie": douyin_config["headers"]["Cookie"],
-            },
-            "proxies": {
-                "http://": douyin_config["proxies"]["http"],
-                "https://": douyin_config["proxies"]["https"],
-            },
+            "headers": headers,
+            "proxies": dict(profiles.proxies),
         }
         return kwargs
 
      # 获取单个作品数据
     async def fetch_one_video(self, aweme_id: str):
-        # 导入必要模块
-        import asyncio
-        from src.crawlers.exceptions import APIResponseError
-
-        # 尝试多种策略获取数据
+        # 尝试多种策略获取数据，按历史成功率与耗时排序，超过对冲延迟时并行执行下一个策略
         strategies = [
             self._strategy_web_api,
             self._strategy_bypass_detection,
@@ -78,24 +80,13 @@ class Douyin:
             self._strategy_emergency_fallback
         ]
 
-        for i, strategy in enumerate(strategies, 1):
-            try:
-                logger.info(f"🔄 尝试策略 {i}/{len(strategies)}: {strategy.__name__}")
-                result = await strategy(aweme_id)
-                if result and self._is_valid_response(result):
-                    logger.info(f"✅ 策略 {i} 成功获取数据")
-                    return result
-                else:
-                    logger.warning(f"❌ 策略 {i} 返回无效数据")
-            except Exception as e:
-                logger.error(f"❌ 策略 {i} 执行失败: {str(e)}")
-
-            # 策略间延迟
-            if i < len(strategies):
-                await asyncio.sleep(2)
-
-        logger.error("🚫 所有策略都失败了")
-        raise APIResponseError("所有获取策略都失败")
+        return await strategy_scheduler.run(
+            [
+                (strategy.__name__, lambda strategy=strategy: strategy(aweme_id))
+                for strategy in strategies
+            ],
+            self._is_valid_response,
+        )
 
     def _is_valid_response(self, response):
         """验证响应是否有效"""
@@ -108,27 +99,24 @@ class Douyin:
     async def _strategy_web_api(self, aweme_id: str):
         """策略1: 标准Web API"""
         import asyncio
-        from src.crawlers.douyin.anti_detection import AntiDetectionManager, CookieManager
+        from src.crawlers.douyin.anti_detection import AntiDetectionManager
 
-        # 获取抖音的实时Cookie
-        kwargs = await self.get_douyin_headers()
+        # 预编译的请求配置：同一个浏览器指纹的请求头与请求参数
+        profiles = douyin_profiles.get()
+        profile = profiles.pick_web()
 
-        # 验证Cookie有效性
-        if not CookieManager.validate_cookie_freshness(kwargs["headers"].get("Cookie", "")):
+        # 验证Cookie有效性（加载配置时已检查）
+        if not profiles.cookie_fresh:
             logger.warning("Cookie可能已过期，建议更新")
 
-        # 使用反检测管理器生成真实的参数
-        base_params = PostDetail(aweme_id=aweme_id).model_dump()
-        realistic_params = AntiDetectionManager.generate_realistic_params(base_params)
-
-        params = PostDetail(aweme_id=aweme_id, **{k: v for k, v in realistic_params.items() if k != 'aweme_id'})
-        params_dict = params.model_dump()
+        # 只有 aweme_id、msToken 与随机参数需要每次生成
+        params_dict, query = profile.build_params(aweme_id, token_pool.ms_token())
 
-        # 生成a_bogus签名
-        a_bogus = BogusManager.ab_model_2_endpoint(params_dict, kwargs["headers"]["User-Agent"])
+        # 生成a_bogus签名，使用实际发送的 User-Agent
+        a_bogus = BogusManager.ab_model_2_endpoint(params_dict, profile.headers["User-Agent"])
 
         # 构建完整的请求URL
-        endpoint = f"{DouyinAPIEndpoints.POST_DETAIL}?{urlencode(params_dict)}&a_bogus={a_bogus}"
+        endpoint = f"{DouyinAPIEndpoints.POST_DETAIL}?{query}&a_bogus={a_bogus}"
 
         logger.info("=" * 80)
         logger.info("抖音Web API请求详细信息:")
@@ -140,11 +128,11 @@ class Douyin:
         delay = AntiDetectionManager.add_timing_jitter()
         await asyncio.sleep(delay)
 
-        # 使用反检测管理器生成真实的请求头
-        enhanced_headers = AntiDetectionManager.generate_realistic_headers(kwargs["headers"])
+        # 指纹请求头已预先构建，只补充 Cookie 与随机请求头
+        enhanced_headers = profile.build_headers(self.get_douyin_cookie(profiles))
 
         # 创建一个基础爬虫
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=enhanced_headers)
+        base_crawler = BaseCrawler(proxies=dict(profiles.proxies), crawler_headers=enhanced_headers, profile="douyin_web")
         async with base_crawler as crawler:
             response = await crawler.fetch_get_json(endpoint)
             return response
@@ -195,7 +183,7 @@ class Douyin:
 
         await asyncio.sleep(1)
 
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=mobile_headers)
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=mobile_headers, profile="douyin_mobile")
         async with base_crawler as crawler:
             response = await crawler.fetch_get_json(mobile_endpoint)
             return response
@@ -230,7 +218,7 @@ class Douyin:
 
                 await asyncio.sleep(1)
 
-                base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=simple_headers)
+                base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=simple_headers, profile="douyin_web")
                 async with base_crawler as crawler:
                     response = await crawler.fetch_get_json(endpoint)
                     if response and len(str(response)) > 50:
@@ -1,7 +1,9 @@
 import json
 from bs4 import BeautifulSoup
-import httpx
 from src.utils import get_analyze_logger, config
+from src.utils.http_client import http_clients
+from src.crawlers.circuit_breaker import host_guards
+from src.utils.short_link import short_links
 from src.utils.index import find_url
 from src.utils.response import Response
 
@@ -18,10 +20,18 @@ class Kuaishou:
         self.video = ""
         self.image_list = []
         self.image_prefix = "https://tx2.a.kwimgs.com/"
+        self.html = ""
+        self.soup = None
+        self.title = ""
+        self.photo_id = ""
         if not self.url:
             error_msg = f"无法从文本 '{text}' 中提取 URL"
             logger.error(error_msg)
             raise ValueError(error_msg)
+        # 初始化时不执行网络请求，而是在 initialize 中异步获取
+
+    async def initialize(self):
+        """异步初始化方法"""
         try:
             headers = {
                 "User-Agent": config.MOBILE_USER_AGENT,
@@ -29,9 +39,12 @@ class Kuaishou:
                 "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
                 "Referer": "https://www.google.com/",
             }
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
+            client = http_clients.get(profile="kuaishou")
+            # 短链解析过时直接请求最终地址，省去重定向
+            response = await host_guards.request(
+                client, "GET", short_links.final_url(self.url), follow_redirects=True, headers=headers, timeout=10.0
             )
+            short_links.set(self.url, response.url, "kuaishou")
             self.html = response.text
             self.soup = BeautifulSoup(self.html, "html.parser")
             # 提取页面标题
@@ -95,6 +108,7 @@ class Kuaishou:
                 self.get_image_data(obj4_data)
             # 获取描述
             self.description = obj2_data.get("caption", "")
+            self.photo_id = str(obj2_data.get("photoId") or obj2_data.get("id") or "")
 
         except Exception as e:
             raise e
@@ -123,6 +137,11 @@ class Kuaishou:
         except Exception as e:
             raise e
 
+    @property
+    def content_id(self):
+        """作品的唯一 ID，用于缓存"""
+        return self.photo_id
+
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
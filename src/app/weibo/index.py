@@ -1,12 +1,14 @@
+import asyncio
 from bs4 import BeautifulSoup
 import execjs
-import httpx
 from seleniumwire import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from src.utils import config, get_analyze_logger
+from src.utils.http_client import http_clients
+from src.crawlers.circuit_breaker import host_guards
 from seleniumwire.request import (
     Request as SeleniumRequest,
     Response as SeleniumResponse,
@@ -31,11 +33,15 @@ class Weibo:
         self.description = ""
         self.video = ""
         self.app_type = "weibo"
+        # 初始化时不执行网络请求，而是在 initialize 中异步获取（request 方案）
         # self._init_driver()
-        self._init_request()
+
+    async def initialize(self):
+        """异步初始化方法"""
+        await self._init_request()
 
     # request方案
-    def _init_request(self):
+    async def _init_request(self):
         try:
             headers = {
                 "User-Agent": config.MOBILE_USER_AGENT,
@@ -43,14 +49,15 @@ class Weibo:
                 "Accept-Language": "zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7",
                 "Referer": "https://www.google.com/",
             }
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
+            client = http_clients.get(profile="weibo")
+            response = await host_guards.request(
+                client, "GET", self.url, follow_redirects=True, headers=headers, timeout=10.0
             )
             self.html = response.text
             self.soup = BeautifulSoup(self.html, "html.parser")
 
-            # 提取页面内容
-            self.extract_weibo_data()
+            # 提取页面内容，execjs 会启动 JS 运行时执行脚本，放到线程中避免阻塞事件循环
+            await asyncio.to_thread(self.extract_weibo_data)
         except Exception as e:
             logger.error(f"获取微博内容失败: {e}")
             raise e
@@ -166,6 +173,11 @@ class Weibo:
         self.description = description
         return self.description
 
+    @property
+    def content_id(self):
+        """微博的唯一 ID，用于缓存"""
+        return str(self.body.get("id") or self.body.get("mid") or "")
+
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
@@ -1,8 +1,10 @@
 from src.app.xiaohongshu.image import Image
 from src.utils import find_url, get_analyze_logger, config, Response
 import re
-import httpx
 from bs4 import BeautifulSoup
+from src.utils.http_client import http_clients
+from src.crawlers.circuit_breaker import host_guards
+from src.utils.short_link import short_links
 import json
 
 # 获取小红书模块的日志器
@@ -10,24 +12,29 @@ logger = get_analyze_logger()
 
 class Xiaohongshu:
     def __init__(self, text, type):
-        try:
-            self.text = text
-            self.url = find_url(text)
-            self.type = type
-            self.video = ""
-            self.image_list = []
-            self.live_list = []
-            self.description = ""
-            self.final_url = None
-            self.html = ""
-            self.soup = None
-            self.title = ""
-            self.data = {}
-            self.app_type_keyword = config.APP_TYPE_KEYWORD.get("xiaohongshu")
-            if not self.url:
-                error_msg = f"无法从文本 '{text}' 中提取 URL"
-                raise ValueError(error_msg)
+        self.text = text
+        self.url = find_url(text)
+        self.type = type
+        self.video = ""
+        self.image_list = []
+        self.live_list = []
+        self.description = ""
+        self.final_url = None
+        self.html = ""
+        self.soup = None
+        self.title = ""
+        self.data = {}
+        self.note_id = ""
+        self.app_type_keyword = config.APP_TYPE_KEYWORD.get("xiaohongshu")
+        if not self.url:
+            error_msg = f"无法从文本 '{text}' 中提取 URL"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        # 初始化时不执行网络请求，而是在 initialize 中异步获取
 
+    async def initialize(self):
+        """异步初始化方法"""
+        try:
             # 获取重定向 URL
             headers = {
                 "User-Agent": config.DEFAULT_USER_AGENT,
@@ -36,13 +43,23 @@ class Xiaohongshu:
                 "Referer": "https://www.google.com/",
             }
 
-            response = httpx.get(
-                self.url, follow_redirects=True, headers=headers, timeout=10.0
+            client = http_clients.get(profile="xiaohongshu")
+            # 短链解析过时直接请求最终地址，省去重定向
+            request_url = short_links.final_url(self.url)
+            response = await host_guards.request(
+                client, "GET", request_url, follow_redirects=True, headers=headers, timeout=10.0
             )
+            if "404" in str(response.url) and request_url != self.url:
+                # 缓存的最终地址可能已失效，重新从短链跳转
+                short_links.invalidate(self.url)
+                response = await host_guards.request(
+                    client, "GET", self.url, follow_redirects=True, headers=headers, timeout=10.0
+                )
             self.final_url = response.url
             if "404" in str(self.final_url):
                 # 抛出异常
                 raise ValueError(f"小红书链接已失效: {self.final_url}")
+            short_links.set(self.url, self.final_url, "xiaohongshu")
             self.html = response.text
             # 使用 BeautifulSoup 解析 HTML
             self.soup = BeautifulSoup(self.html, "html.parser")
@@ -94,6 +111,7 @@ class Xiaohongshu:
             note = self.data_dict.get("note", {})
             note_detail_map = note.get("noteDetailMap", {})
             first_note_id = note.get("firstNoteId", "")
+            self.note_id = first_note_id
             note_data = note_detail_map.get(first_note_id, {}).get("note", {})
             image_list = note_data.get("imageList", [])
             token_list = []
@@ -122,6 +140,11 @@ class Xiaohongshu:
         except Exception as e:
             raise e
 
+    @property
+    def content_id(self):
+        """笔记的唯一 ID，用于缓存"""
+        return self.note_id
+
     def to_dict(self):
         """将对象转换为字典，用于 API 返回"""
         try:
@@ -5,6 +5,8 @@ import re
 
 from httpx import Response
 from src.utils import get_analyze_logger
+from src.utils.http_client import http_clients
+from src.crawlers.circuit_breaker import host_guards
 
 from src.crawlers.exceptions import (
     APIError,
@@ -24,6 +26,11 @@ logger = get_analyze_logger()
 class BaseCrawler:
     """
     基础爬虫客户端 (Base crawler client)
+
+    底层使用应用级共享的 httpx.AsyncClient（按代理与 profile 复用连接池），
+    请求头随每次请求发送，创建和关闭爬虫对象都不会新建或关闭连接
+
+    每个请求都经过按主机的熔断与限流（host_guards），上游持续限流或故障时直接失败，不再请求
     """
 
     def __init__(
@@ -34,6 +41,7 @@ class BaseCrawler:
             timeout: int = 10,
             max_tasks: int = 50,
             crawler_headers: dict = {},
+            profile: str = "default",
     ):
         if isinstance(proxies, dict):
             self.proxies = proxies
@@ -48,26 +56,18 @@ class BaseCrawler:
         self._max_tasks = max_tasks
         self.semaphore = asyncio.Semaphore(max_tasks)
 
-        # 限制最大连接数 / Limit the maximum number of connections
+        # 最大连接数与底层连接重试次数由共享连接池统一配置 (HTTP_MAX_CONNECTIONS / HTTP_CLIENT_RETRIES)
         self._max_connections = max_connections
-        self.limits = httpx.Limits(max_connections=max_connections)
 
         # 业务逻辑重试次数 / Business logic retry count
         self._max_retries = max_retries
-        # 底层连接重试次数 / Underlying connection retry count
-        self.atransport = httpx.AsyncHTTPTransport(retries=max_retries)
 
         # 超时等待时间 / Timeout waiting time
         self._timeout = timeout
         self.timeout = httpx.Timeout(timeout)
-        # 异步客户端 / Asynchronous client
-        self.aclient = httpx.AsyncClient(
-            headers=self.crawler_headers,
-            proxies=self.proxies,
-            timeout=self.timeout,
-            limits=self.limits,
-            transport=self.atransport,
-        )
+        # 共享的异步客户端 / Shared asynchronous client
+        self.profile = profile
+        self.aclient = http_clients.get(self.proxies, profile)
 
     async def fetch_response(self, endpoint: str) -> Response:
         """获取数据 (Get data)
@@ -166,47 +166,54 @@ class BaseCrawler:
             response: 响应内容 (Response content)
         """
         for attempt in range(self._max_retries):
-            try:
-                # 添加详细的请求日志
-                logger.info(f"发起GET请求 (第{attempt + 1}次): {url}")
-                logger.info(f"请求头: {dict(self.aclient.headers)}")
-
-                response = await self.aclient.get(url, follow_redirects=True)
+            # 熔断中或限流排队过久时直接抛出异常，不进入下面的重试处理
+            async with host_guards.guard(url) as call:
+                try:
+                    # 添加详细的请求日志
+                    logger.info(f"发起GET请求 (第{attempt + 1}次): {url}")
+                    logger.info(f"请求头: {self.crawler_headers}")
+
+                    response = await self.aclient.get(
+                        url, headers=self.crawler_headers, timeout=self.timeout, follow_redirects=True
+                    )
 
-                # 添加详细的响应日志
-                logger.info(f"响应状态码: {response.status_code}")
-                logger.info(f"响应头: {dict(response.headers)}")
-                logger.info(f"响应内容长度: {len(response.content) if response.content else 0}")
-                logger.info(f"响应文本长度: {len(response.text) if response.text else 0}")
+                    # 添加详细的响应日志
+                    logger.info(f"响应状态码: {response.status_code}")
+                    logger.info(f"响应头: {dict(response.headers)}")
+                    logger.info(f"响应内容长度: {len(response.content) if response.content else 0}")
+                    logger.info(f"响应文本长度: {len(response.text) if response.text else 0}")
 
-                if not response.text.strip() or not response.content:
-                    error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
-                                                                                         response.status_code,
-                                                                                         response.url)
+                    if not response.text.strip() or not response.content:
+                        error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
+                                                                                             response.status_code,
+                                                                                             response.url)
 
-                    logger.warning(error_message)
+                        logger.warning(error_message)
+                        self._record_empty(call, response)
 
-                    if attempt == self._max_retries - 1:
-                        raise APIRetryExhaustedError(
-                            "获取端点数据失败, 次数达到上限"
-                        )
+                        if attempt == self._max_retries - 1:
+                            raise APIRetryExhaustedError(
+                                "获取端点数据失败, 次数达到上限"
+                            )
 
-                    await asyncio.sleep(self._timeout)
-                    continue
+                        await asyncio.sleep(host_guards.backoff(attempt, self._timeout))
+                        continue
 
-                response.raise_for_status()
-                return response
+                    self._record_response(call, response)
+                    response.raise_for_status()
+                    return response
 
-            except httpx.RequestError:
-                raise APIConnectionError("连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}"
-                                         .format(url, self.proxies, self.__class__.__name__)
-                                         )
+                except httpx.RequestError as e:
+                    self._record_error(call, e)
+                    raise APIConnectionError("连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}"
+                                             .format(url, self.proxies, self.__class__.__name__)
+                                             )
 
-            except httpx.HTTPStatusError as http_error:
-                self.handle_http_status_error(http_error, url, attempt + 1)
+                except httpx.HTTPStatusError as http_error:
+                    self.handle_http_status_error(http_error, url, attempt + 1)
 
-            except APIError as e:
-                e.display_error()
+                except APIError as e:
+                    e.display_error()
 
     async def post_fetch_data(self, url: str, params: dict = {}, data=None):
         """
@@ -220,71 +227,97 @@ class BaseCrawler:
             response: 响应内容 (Response content)
         """
         for attempt in range(self._max_retries):
-            try:
-                response = await self.aclient.post(
-                    url,
-                    json=None if not params else dict(params),
-                    data=None if not data else data,
-                    follow_redirects=True
-                )
-                if not response.text.strip() or not response.content:
-                    error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
-                                                                                         response.status_code,
-                                                                                         response.url)
+            async with host_guards.guard(url) as call:
+                try:
+                    response = await self.aclient.post(
+                        url,
+                        json=None if not params else dict(params),
+                        data=None if not data else data,
+                        headers=self.crawler_headers,
+                        timeout=self.timeout,
+                        follow_redirects=True
+                    )
+                    if not response.text.strip() or not response.content:
+                        error_message = "第 {0} 次响应内容为空, 状态码: {1}, URL:{2}".format(attempt + 1,
+                                                                                             response.status_code,
+                                                                                             response.url)
+
+                        logger.warning(error_message)
+                        self._record_empty(call, response)
+
+                        if attempt == self._max_retries - 1:
+                            raise APIRetryExhaustedError(
+                                "获取端点数据失败, 次数达到上限"
+                            )
+
+                        await asyncio.sleep(host_guards.backoff(attempt, self._timeout))
+                        continue
+
+                    # logger.info("响应状态码: {0}".format(response.status_code))
+                    self._record_response(call, response)
+                    response.raise_for_status()
+                    return response
+
+                except httpx.RequestError as e:
+                    self._record_error(call, e)
+                    raise APIConnectionError(
+                        "连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}".format(url, self.proxies,
+                                                                                       self.__class__.__name__)
+                    )
 
-                    logger.warning(error_message)
+                except httpx.HTTPStatusError as http_error:
+                    self.handle_http_status_error(http_error, url, attempt + 1)
 
-                    if attempt == self._max_retries - 1:
-                        raise APIRetryExhaustedError(
-                            "获取端点数据失败, 次数达到上限"
-                        )
+                except APIError as e:
+                    e.display_error()
 
-                    await asyncio.sleep(self._timeout)
-                    continue
+    async def head_fetch_data(self, url: str):
+        """
+        获取HEAD端点数据 (Get HEAD endpoint data)
 
+        Args:
+            url (str): 端点URL (Endpoint URL)
+
+        Returns:
+            response: 响应内容 (Response content)
+        """
+        async with host_guards.guard(url) as call:
+            try:
+                response = await self.aclient.head(url, headers=self.crawler_headers, timeout=self.timeout)
                 # logger.info("响应状态码: {0}".format(response.status_code))
+                self._record_response(call, response)
                 response.raise_for_status()
                 return response
 
-            except httpx.RequestError:
-                raise APIConnectionError(
-                    "连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}".format(url, self.proxies,
-                                                                                   self.__class__.__name__)
+            except httpx.RequestError as e:
+                self._record_error(call, e)
+                raise APIConnectionError("连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}".format(
+                    url, self.proxies, self.__class__.__name__
+                )
                 )
 
             except httpx.HTTPStatusError as http_error:
-                self.handle_http_status_error(http_error, url, attempt + 1)
+                self.handle_http_status_error(http_error, url, 1)
 
             except APIError as e:
                 e.display_error()
 
-    async def head_fetch_data(self, url: str):
-        """
-        获取HEAD端点数据 (Get HEAD endpoint data)
-
-        Args:
-            url (str): 端点URL (Endpoint URL)
-
-        Returns:
-            response: 响应内容 (Response content)
-        """
-        try:
-            response = await self.aclient.head(url)
-            # logger.info("响应状态码: {0}".format(response.status_code))
-            response.raise_for_status()
-            return response
-
-        except httpx.RequestError:
-            raise APIConnectionError("连接端点失败，检查网络环境或代理：{0} 代理：{1} 类名：{2}".format(
-                url, self.proxies, self.__class__.__name__
-            )
-            )
+    @staticmethod
+    def _record_response(call, response: Response):
+        """按状态码记录熔断结果：429 / 5xx 为失败，其余为成功"""
+        if call is not None:
+            call.observe(response)
 
-        except httpx.HTTPStatusError as http_error:
-            self.handle_http_status_error(http_error, url, 1)
+    @staticmethod
+    def _record_empty(call, response: Response):
+        # 抖音等接口被风控时返回 200 加空响应，同样计为失败
+        if call is not None:
+            call.for_url(response.url).failure("响应内容为空")
 
-        except APIError as e:
-            e.display_error()
+    @staticmethod
+    def _record_error(call, error: Exception):
+        if call is not None:
+            call.error(error)
 
     def handle_http_status_error(self, http_error, url: str, attempt):
         """
@@ -334,10 +367,11 @@ class BaseCrawler:
             raise APIResponseError(f"HTTP状态错误: {status_code}")
 
     async def close(self):
-        await self.aclient.aclose()
+        # 共享客户端由 http_clients 在应用关闭时统一关闭
+        pass
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.aclient.aclose()
+        await self.close()
@@ -0,0 +1,429 @@
+"""
+按主机的熔断与限流
+Per-host circuit breaker and token-bucket rate limiting
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from src.crawlers.exceptions import APIRateLimitError, APIUnavailableError
+from src.utils import get_analyze_logger
+
+logger = get_analyze_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 视为上游限流或故障的状态码
+FAILURE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def _host(url) -> str:
+    try:
+        return (urlparse(str(url)).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-After 头的秒数，日期格式或无法解析时返回 None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多累积 burst 个
+
+    被限流（429）时速率减半（最低为配置值的 1/10），之后每次成功按配置值的 5% 恢复
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = rate
+        self.min_rate = rate / 10
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = self.available(now)
+        self.updated = now
+
+    def available(self, now: float) -> float:
+        return min(self.burst, self.tokens + (now - self.updated) * self.rate)
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        预留一个令牌，返回需要等待的秒数；需要等待超过 max_wait 秒时不预留，返回 None
+        """
+        now = time.monotonic()
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def throttle(self):
+        self._refill(time.monotonic())
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        if self.rate < self.max_rate:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed：正常放行，连续失败 failure_threshold 次后熔断
+    - open：直接拒绝，熔断时长从 open_seconds 开始，每次连续熔断翻倍，最长 max_open_seconds；
+      上游返回 Retry-After 时至少熔断该时长
+    - half_open：熔断到期后最多放行 half_open_probes 个探测请求，成功则恢复，失败则再次熔断
+    """
+
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 10,
+                 max_open_seconds: float = 300, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0  # 连续失败次数
+        self.trips = 0  # 连续熔断次数，恢复后清零
+        self.total_trips = 0
+        self.open_until = 0.0
+        self.probes = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == OPEN:
+            if now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self.probes = 0
+        if self.state == HALF_OPEN:
+            if self.probes >= self.half_open_probes:
+                return False
+            self.probes += 1
+        return True
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.open_until - now)
+
+    def release_probe(self):
+        if self.state == HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def on_success(self):
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.trips = 0
+
+    def on_failure(self, now: float, retry_after: Optional[float] = None) -> bool:
+        """记录一次失败，返回是否因此熔断"""
+        if self.state == OPEN:
+            # 熔断前已发出的请求陆续失败，不再延长熔断
+            return False
+        self.failures += 1
+        if self.state == HALF_OPEN or retry_after is not None or self.failures >= self.failure_threshold:
+            self.trip(now, retry_after)
+            return True
+        return False
+
+    def trip(self, now: float, retry_after: Optional[float] = None):
+        self.trips += 1
+        self.total_trips += 1
+        duration = min(self.max_open_seconds, self.open_seconds * 2 ** (self.trips - 1))
+        if retry_after is not None:
+            duration = max(duration, min(retry_after, self.max_open_seconds))
+        self.state = OPEN
+        self.open_until = now + duration
+        self.probes = 0
+
+
+class HostGuard:
+    """单个主机的熔断器、令牌桶与计数"""
+
+    def __init__(self, host: str, breaker: CircuitBreaker, bucket: Optional[TokenBucket]):
+        self.host = host
+        self.breaker = breaker
+        self.bucket = bucket
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected_open = 0
+        self.rejected_rate = 0
+        self.last_error = None
+
+    def to_dict(self, now: float) -> dict:
+        breaker = self.breaker
+        return {
+            "state": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "trips": breaker.total_trips,
+            "retry_after": round(breaker.retry_after(now), 3) if breaker.state == OPEN else 0,
+            "rate": round(self.bucket.rate, 3) if self.bucket else None,
+            "max_rate": self.bucket.max_rate if self.bucket else None,
+            "tokens": round(self.bucket.available(now), 3) if self.bucket else None,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected_open": self.rejected_open,
+            "rejected_rate": self.rejected_rate,
+            "last_error": self.last_error,
+        }
+
+
+class GuardedCall:
+    """
+    一次受保护的请求，由 HostGuardRegistry.guard 创建
+
+    请求结束前调用 observe / error / success / failure 记录结果；没有记录结果时，
+    超时与连接错误记为失败，其余异常（包括被取消）不计入熔断统计
+
+    跟随重定向（如短链跳转到 www.xiaohongshu.com）时，observe / error 把结果记在最终请求的主机上，
+    请求的主机已完成重定向，记为成功
+    """
+
+    __slots__ = ("guard", "probe", "done", "registry")
+
+    def __init__(self, guard: HostGuard, probe: bool, registry: "HostGuardRegistry" = None):
+        self.guard = guard
+        self.probe = probe
+        self.done = False
+        self.registry = registry
+
+    def for_url(self, url) -> "GuardedCall":
+        """
+        返回记录 url 所在主机结果的调用：与请求的主机相同时为自身，
+        不同时（发生了重定向）先将请求的主机记为成功，再返回最终主机上的调用
+        """
+        host = _host(url) if url is not None else ""
+        if self.done or self.registry is None or not host or host == self.guard.host:
+            return self
+        self.success()
+        guard = self.registry.get(host)
+        guard.requests += 1
+        return GuardedCall(guard, False)
+
+    def observe(self, response: httpx.Response):
+        call = self.for_url(response.url)
+        status = response.status_code
+        if status in FAILURE_STATUS:
+            retry_after = _retry_after(response) if status in (429, 503) else None
+            call.failure(f"HTTP {status}", retry_after, throttled=status == 429)
+        else:
+            call.success()
+
+    def error(self, error: Exception):
+        """记录请求异常，异常发生在重定向后的请求上时记在最终主机上"""
+        try:
+            url = error.request.url
+        except (AttributeError, RuntimeError):
+            # 没有关联请求的异常
+            url = None
+        self.for_url(url).failure(type(error).__name__)
+
+    def success(self):
+        if self.done:
+            return
+        self.done = True
+        guard = self.guard
+        guard.successes += 1
+        guard.breaker.on_success()
+        if guard.bucket:
+            guard.bucket.recover()
+
+    def failure(self, reason: str, retry_after: Optional[float] = None, throttled: bool = False):
+        if self.done:
+            return
+        self.done = True
+        guard = self.guard
+        guard.failures += 1
+        guard.last_error = reason
+        if throttled and guard.bucket:
+            guard.bucket.throttle()
+        now = time.monotonic()
+        if guard.breaker.on_failure(now, retry_after):
+            logger.warning(
+                f"🔌 {guard.host} 熔断 {guard.breaker.retry_after(now):.1f}s（{reason}，第 {guard.breaker.trips} 次）"
+            )
+
+    def release(self):
+        if not self.done and self.probe:
+            self.guard.breaker.release_probe()
+
+
+class HostGuardRegistry:
+    """
+    按主机的熔断与限流注册表
+
+    - 每个主机一个熔断器，上游限流或故障时直接抛出 APIUnavailableError，不再请求
+    - 每个主机一个令牌桶，请求需要排队超过 max_wait 秒时直接抛出 APIRateLimitError
+    - rate 为 0 的主机不限流
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.failure_threshold = 5
+        self.open_seconds = 10.0
+        self.max_open_seconds = 300.0
+        self.half_open_probes = 1
+        self.rate = 10.0
+        self.burst = 20.0
+        self.host_rates: Dict[str, float] = {}
+        self.max_wait = 2.0
+        self.retry_backoff = 0.5
+        self._guards: Dict[str, HostGuard] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = None, failure_threshold: int = None, open_seconds: float = None,
+                  max_open_seconds: float = None, half_open_probes: int = None, rate: float = None,
+                  burst: float = None, host_rates: Dict[str, float] = None, max_wait: float = None,
+                  retry_backoff: float = None):
+        """调整参数，已有主机的状态会被清空"""
+        if enabled is not None:
+            self.enabled = enabled
+        if failure_threshold is not None:
+            self.failure_threshold = max(1, failure_threshold)
+        if open_seconds is not None:
+            self.open_seconds = open_seconds
+        if max_open_seconds is not None:
+            self.max_open_seconds = max(max_open_seconds, self.open_seconds)
+        if half_open_probes is not None:
+            self.half_open_probes = max(1, half_open_probes)
+        if rate is not None:
+            self.rate = rate
+        if burst is not None:
+            self.burst = burst
+        if host_rates is not None:
+            self.host_rates = {host.lower(): value for host, value in host_rates.items()}
+        if max_wait is not None:
+            self.max_wait = max_wait
+        if retry_backoff is not None:
+            self.retry_backoff = retry_backoff
+        self.reset()
+
+    def get(self, host: str) -> HostGuard:
+        guard = self._guards.get(host)
+        if guard is None:
+            with self._lock:
+                guard = self._guards.get(host)
+                if guard is None:
+                    rate = self.host_rates.get(host, self.rate)
+                    breaker = CircuitBreaker(
+                        self.failure_threshold, self.open_seconds, self.max_open_seconds, self.half_open_probes
+                    )
+                    bucket = TokenBucket(rate, self.burst) if rate > 0 else None
+                    guard = self._guards[host] = HostGuard(host, breaker, bucket)
+        return guard
+
+    async def acquire(self, url) -> Optional[GuardedCall]:
+        """
+        放行一次请求，熔断中或排队过久时抛出异常
+
+        异常:
+            APIUnavailableError: 主机熔断中
+            APIRateLimitError: 令牌桶需要等待超过 max_wait 秒
+        """
+        if not self.enabled:
+            return None
+        host = _host(url)
+        if not host:
+            return None
+        guard = self.get(host)
+        now = time.monotonic()
+        breaker = guard.breaker
+        if not breaker.allow(now):
+            guard.rejected_open += 1
+            raise APIUnavailableError(f"{host} 熔断中，{breaker.retry_after(now):.1f} 秒后重试")
+        probe = breaker.state == HALF_OPEN
+        if guard.bucket is not None:
+            wait = guard.bucket.reserve(self.max_wait)
+            if wait is None:
+                if probe:
+                    breaker.release_probe()
+                guard.rejected_rate += 1
+                raise APIRateLimitError(f"{host} 请求过于频繁，超过 {guard.bucket.rate:.1f} 次/秒")
+            if wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    if probe:
+                        breaker.release_probe()
+                    raise
+        guard.requests += 1
+        return GuardedCall(guard, probe, self)
+
+    @asynccontextmanager
+    async def guard(self, url):
+        """
+        用法:
+            async with host_guards.guard(url) as call:
+                response = await client.get(url)
+                call.observe(response)
+
+        关闭时 call 为 None
+        """
+        call = await self.acquire(url)
+        try:
+            yield call
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            if call is not None:
+                call.error(e)
+            raise
+        finally:
+            if call is not None:
+                call.release()
+
+    async def request(self, client: httpx.AsyncClient, method: str, url, **kwargs) -> httpx.Response:
+        """经过熔断与限流发送请求，并按状态码记录结果"""
+        async with self.guard(url) as call:
+            response = await client.request(method, url, **kwargs)
+            if call is not None:
+                call.observe(response)
+            return response
+
+    def backoff(self, attempt: int, cap: float) -> float:
+        """第 attempt 次（从 0 开始）重试前的等待秒数：指数退避加随机抖动，不超过 cap"""
+        delay = min(cap, self.retry_backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        with self._lock:
+            self._guards.clear()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            guards = list(self._guards.items())
+        return {
+            "enabled": self.enabled,
+            "failure_threshold": self.failure_threshold,
+            "open_seconds": self.open_seconds,
+            "max_open_seconds": self.max_open_seconds,
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_wait": self.max_wait,
+            "hosts": {host: guard.to_dict(now) for host, guard in guards},
+        }
+
+
+host_guards = HostGuardRegistry()
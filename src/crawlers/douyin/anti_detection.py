@@ -53,12 +53,9 @@ class AntiDetectionManager:
         return random.choice(cls.BROWSER_FINGERPRINTS).copy()
     
     @classmethod
-    def generate_realistic_headers(cls, base_headers: Dict[str, str]) -> Dict[str, str]:
-        """生成更真实的请求头"""
-        fingerprint = cls.get_random_fingerprint()
-        
-        enhanced_headers = base_headers.copy()
-        enhanced_headers.update({
+    def fingerprint_headers(cls, fingerprint: Dict[str, Any]) -> Dict[str, str]:
+        """指纹对应的固定请求头"""
+        return {
             "Accept": "application/json, text/plain, */*",
             "Accept-Encoding": "gzip, deflate, br, zstd",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
@@ -72,35 +69,61 @@ class AntiDetectionManager:
             "Sec-Fetch-Site": "same-origin",
             "X-Requested-With": "XMLHttpRequest",
             "User-Agent": fingerprint["user_agent"],
+            "X-Tt-Env": "prod",
+        }
+
+    @classmethod
+    def dynamic_headers(cls) -> Dict[str, str]:
+        """每次请求随机生成的请求头"""
+        return {
             # 添加一些随机的自定义头
             "X-Client-Version": f"29.{random.randint(1, 9)}.0",
-            "X-Tt-Env": "prod",
-        })
-        
-        return enhanced_headers
-    
+        }
+
     @classmethod
-    def generate_realistic_params(cls, base_params: Dict[str, Any]) -> Dict[str, Any]:
-        """生成更真实的请求参数"""
+    def generate_realistic_headers(cls, base_headers: Dict[str, str]) -> Dict[str, str]:
+        """生成更真实的请求头"""
         fingerprint = cls.get_random_fingerprint()
         
-        # 基于指纹更新参数
-        realistic_params = base_params.copy()
-        realistic_params.update({
+        enhanced_headers = base_headers.copy()
+        enhanced_headers.update(cls.fingerprint_headers(fingerprint))
+        enhanced_headers.update(cls.dynamic_headers())
+        
+        return enhanced_headers
+
+    @classmethod
+    def fingerprint_params(cls, fingerprint: Dict[str, Any]) -> Dict[str, Any]:
+        """指纹对应的固定请求参数"""
+        return {
             "screen_width": fingerprint["screen_width"],
             "screen_height": fingerprint["screen_height"],
             "cpu_core_num": fingerprint["cpu_cores"],
             "device_memory": fingerprint["memory"],
+            "browser_online": "true",
+            "cookie_enabled": "true",
+        }
+
+    @classmethod
+    def dynamic_params(cls) -> Dict[str, Any]:
+        """每次请求随机生成的请求参数"""
+        return {
             "round_trip_time": str(random.randint(20, 150)),
             "downlink": str(random.choice([10, 50, 100])),
             "effective_type": random.choice(["4g", "wifi"]),
-            # 添加一些时间相关的参数
-            "browser_online": "true",
-            "cookie_enabled": "true",
             # 随机化版本号
             "version_code": f"29{random.randint(1000, 9999)}",
             "update_version_code": f"17{random.randint(1000, 9999)}",
-        })
+        }
+    
+    @classmethod
+    def generate_realistic_params(cls, base_params: Dict[str, Any]) -> Dict[str, Any]:
+        """生成更真实的请求参数"""
+        fingerprint = cls.get_random_fingerprint()
+        
+        # 基于指纹更新参数
+        realistic_params = base_params.copy()
+        realistic_params.update(cls.fingerprint_params(fingerprint))
+        realistic_params.update(cls.dynamic_params())
         
         return realistic_params
     
@@ -84,10 +84,10 @@ class DouyinBypassManager:
             
             logger.info(f"尝试iframe方式: {iframe_url}")
             
-            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=iframe_headers)
+            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=iframe_headers, profile="douyin_web")
             async with base_crawler as crawler:
                 # 获取页面HTML
-                response = await crawler.aclient.get(iframe_url)
+                response = await crawler.aclient.get(iframe_url, headers=crawler.crawler_headers)
                 if response.status_code == 200 and response.text:
                     # 从HTML中提取JSON数据
                     json_data = cls._extract_json_from_html(response.text)
@@ -119,9 +119,11 @@ class DouyinBypassManager:
             
             logger.info(f"尝试分享链接方式: {share_url}")
             
-            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=share_headers)
+            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=share_headers, profile="douyin_web")
             async with base_crawler as crawler:
-                response = await crawler.aclient.get(share_url, follow_redirects=True)
+                response = await crawler.aclient.get(
+                    share_url, headers=crawler.crawler_headers, follow_redirects=True
+                )
                 if response.status_code == 200 and response.text:
                     json_data = cls._extract_json_from_html(response.text)
                     if json_data:
@@ -150,7 +152,7 @@ class DouyinBypassManager:
             
             logger.info(f"尝试搜索API方式: {search_url}")
             
-            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=search_headers)
+            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=search_headers, profile="douyin_web")
             async with base_crawler as crawler:
                 response = await crawler.fetch_get_json(search_url)
                 if response and isinstance(response, dict):
@@ -268,7 +270,7 @@ class DouyinBypassManager:
             
             logger.info(f"移动端请求: {mobile_url}")
             
-            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=mobile_headers)
+            base_crawler = BaseCrawler(proxies={'http': None, 'https': None}, crawler_headers=mobile_headers, profile="douyin_mobile")
             async with base_crawler as crawler:
                 response = await crawler.fetch_get_json(mobile_url)
                 if response and isinstance(response, dict):
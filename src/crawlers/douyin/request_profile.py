@@ -0,0 +1,149 @@
+"""
+抖音请求配置预编译
+Precompiled Douyin request profiles
+"""
+
+import os
+import random
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+import yaml
+
+from src.crawlers.douyin.anti_detection import AntiDetectionManager, CookieManager
+from src.crawlers.util import BaseRequestModel
+from src.utils import get_analyze_logger
+
+logger = get_analyze_logger()
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+# 每次请求都会变化的参数，不放进预先拼接的查询字符串
+DYNAMIC_PARAMS = frozenset(
+    ["aweme_id", "msToken"] + list(AntiDetectionManager.dynamic_params())
+)
+
+
+class WebProfile:
+    """
+    单个浏览器指纹的 Web API 请求配置：请求头与请求参数来自同一个指纹，保持一致
+    """
+
+    __slots__ = ("headers", "params", "base_query")
+
+    def __init__(self, base_headers: Mapping[str, str], base_params: Mapping[str, Any], fingerprint: Dict[str, Any]):
+        headers = dict(base_headers)
+        headers.update(AntiDetectionManager.fingerprint_headers(fingerprint))
+        params = dict(base_params)
+        params.update(AntiDetectionManager.fingerprint_params(fingerprint))
+        self.headers = MappingProxyType(headers)
+        self.params = MappingProxyType(params)
+        self.base_query = urlencode({k: v for k, v in params.items() if k not in DYNAMIC_PARAMS})
+
+    def build_params(self, aweme_id: str, ms_token: str) -> Tuple[Dict[str, Any], str]:
+        """
+        返回 (完整参数, 查询字符串)，只有动态参数需要每次编码
+        """
+        dynamic = AntiDetectionManager.dynamic_params()
+        dynamic["aweme_id"] = aweme_id
+        dynamic["msToken"] = ms_token
+        params = {**self.params, **dynamic}
+        return params, f"{self.base_query}&{urlencode(dynamic)}"
+
+    def build_headers(self, cookie: str) -> Dict[str, str]:
+        headers = dict(self.headers)
+        headers["Cookie"] = cookie
+        headers.update(AntiDetectionManager.dynamic_headers())
+        return headers
+
+
+class DouyinRequestProfiles:
+    """
+    由 config.yaml 构建的不可变请求配置快照
+    """
+
+    def __init__(self, config: dict, mtime: Optional[float] = None):
+        douyin_config = config["TokenManager"]["douyin"]
+        headers = douyin_config["headers"]
+        proxies = douyin_config.get("proxies") or {}
+        self.mtime = mtime
+        self.cookie = headers.get("Cookie") or ""
+        # Cookie 有效性只在加载配置时检查一次
+        self.cookie_fresh = CookieManager.validate_cookie_freshness(self.cookie)
+        self.headers = MappingProxyType({
+            "Accept-Language": headers["Accept-Language"],
+            "User-Agent": headers["User-Agent"],
+            "Referer": headers["Referer"],
+        })
+        self.proxies = MappingProxyType({
+            "http://": proxies.get("http"),
+            "https://": proxies.get("https"),
+        })
+        # 请求参数默认值只取一次，不经过 BaseRequestModel.__init__（会取 msToken）
+        base_params = {
+            name: field.default
+            for name, field in BaseRequestModel.model_fields.items()
+            if name != "msToken"
+        }
+        base_headers = dict(self.headers)
+        self.web = tuple(
+            WebProfile(base_headers, base_params, fingerprint)
+            for fingerprint in AntiDetectionManager.BROWSER_FINGERPRINTS
+        )
+
+    def pick_web(self) -> WebProfile:
+        return random.choice(self.web)
+
+
+class DouyinProfileRegistry:
+    """
+    请求配置注册表
+
+    - 首次使用时构建，之后每次获取只是一次属性读取
+    - 至多每 check_interval 秒检查一次 config.yaml 的 mtime，文件更新后重新构建并整体替换快照，
+      正在使用旧快照的请求不受影响；新配置解析失败时继续使用旧快照
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._profiles: Optional[DouyinRequestProfiles] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _build(self, mtime: float) -> DouyinRequestProfiles:
+        with open(self.path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        return DouyinRequestProfiles(config, mtime)
+
+    def _reload_if_changed(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._profiles is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            mtime = os.path.getmtime(self.path)
+            if self._profiles is not None and self._profiles.mtime == mtime:
+                return
+            try:
+                profiles = self._build(mtime)
+            except Exception as e:
+                if self._profiles is None:
+                    raise
+                logger.error(f"重新加载抖音请求配置失败，继续使用旧配置: {e}")
+                return
+            self._profiles = profiles
+            self.reloads += 1
+            logger.info(f"已加载抖音请求配置: {self.path}")
+
+    def get(self) -> DouyinRequestProfiles:
+        if self._profiles is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self._reload_if_changed()
+        return self._profiles
+
+
+douyin_profiles = DouyinProfileRegistry()
@@ -0,0 +1,186 @@
+"""
+抖音作品数据获取策略调度
+Hedged scheduling of Douyin fetch strategies
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.crawlers.exceptions import APIResponseError
+from src.utils import get_analyze_logger
+
+logger = get_analyze_logger()
+
+Strategy = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class StrategyStats:
+    """单个策略最近若干次执行的成功率与耗时"""
+
+    def __init__(self, window: int = 50):
+        self.outcomes = deque(maxlen=window)  # (是否成功, 耗时秒)
+        self.total = 0
+        self.successes = 0
+        self.cancelled = 0
+
+    def record(self, success: bool, elapsed: float):
+        self.outcomes.append((success, elapsed))
+        self.total += 1
+        self.successes += int(success)
+
+    @property
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑：没有记录时为 0.5，少量失败不会让策略永远排在最后
+        recent = sum(1 for success, _ in self.outcomes if success)
+        return (recent + 1) / (len(self.outcomes) + 2)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """最近成功执行的平均耗时"""
+        elapsed = [t for success, t in self.outcomes if success]
+        return sum(elapsed) / len(elapsed) if elapsed else None
+
+    def to_dict(self) -> dict:
+        latency = self.latency
+        return {
+            "success_rate": round(self.success_rate, 3),
+            "latency": round(latency, 3) if latency is not None else None,
+            "recent": len(self.outcomes),
+            "total": self.total,
+            "successes": self.successes,
+            "cancelled": self.cancelled,
+        }
+
+
+class StrategyScheduler:
+    """
+    对冲执行的策略调度器
+
+    - 按最近的成功率（高优先）与成功耗时（低优先）给策略排序，没有记录的策略保持传入顺序
+    - 先执行排名第一的策略，hedge_delay 秒内没有得到有效结果时并行启动下一个策略
+    - 某个策略失败或返回无效数据时立即启动下一个，不再等待
+    - 任意策略返回有效数据后取消其余仍在执行的策略
+    """
+
+    def __init__(self, hedge_delay: float = 1.5, max_parallel: int = 2, window: int = 50):
+        self.hedge_delay = hedge_delay
+        self.max_parallel = max_parallel
+        self.window = window
+        self._stats: Dict[str, StrategyStats] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, hedge_delay: float = None, max_parallel: int = None, window: int = None):
+        if hedge_delay is not None:
+            self.hedge_delay = hedge_delay
+        if max_parallel is not None:
+            self.max_parallel = max(1, max_parallel)
+        if window is not None:
+            self.window = window
+
+    def _get_stats(self, name: str) -> StrategyStats:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = StrategyStats(self.window)
+            return stats
+
+    def rank(self, names: List[str]) -> List[str]:
+        """按历史表现排序，成功率相同时耗时短的优先"""
+
+        def key(item):
+            index, name = item
+            stats = self._get_stats(name)
+            latency = stats.latency
+            return (-stats.success_rate, latency if latency is not None else float("inf"), index)
+
+        return [name for _, name in sorted(enumerate(names), key=key)]
+
+    async def _run_one(self, name: str, factory: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool]):
+        start = time.perf_counter()
+        stats = self._get_stats(name)
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            stats.record(False, time.perf_counter() - start)
+            logger.error(f"❌ 策略 {name} 执行失败: {str(e)}")
+            return None
+        elapsed = time.perf_counter() - start
+        valid = bool(result) and is_valid(result)
+        stats.record(valid, elapsed)
+        if valid:
+            logger.info(f"✅ 策略 {name} 成功获取数据，耗时 {elapsed:.2f}s")
+            return result
+        logger.warning(f"❌ 策略 {name} 返回无效数据，耗时 {elapsed:.2f}s")
+        return None
+
+    async def run(self, strategies: List[Strategy], is_valid: Callable[[Any], bool]):
+        """
+        参数:
+            strategies: [(策略名称, 无参的协程函数)]，按默认优先级排列
+            is_valid: 判断结果是否有效
+
+        返回:
+            第一个有效结果
+
+        异常:
+            APIResponseError: 所有策略都失败
+        """
+        factories = dict(strategies)
+        queue = deque(self.rank([name for name, _ in strategies]))
+        logger.info(f"🔄 策略执行顺序: {list(queue)}")
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch():
+            name = queue.popleft()
+            task = asyncio.create_task(self._run_one(name, factories[name], is_valid))
+            running[task] = name
+
+        try:
+            launch()
+            while running:
+                can_hedge = queue and len(running) < self.max_parallel
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # 超过对冲延迟仍没有结果，并行启动下一个策略
+                    logger.info(f"⏱️ {self.hedge_delay}s 内没有结果，并行启动策略 {queue[0]}")
+                    launch()
+                    continue
+                for task in done:
+                    running.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        return result
+                # 失败的策略腾出位置，立即启动下一个
+                for _ in done:
+                    if queue and len(running) < self.max_parallel:
+                        launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        logger.error("🚫 所有策略都失败了")
+        raise APIResponseError("所有获取策略都失败")
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = list(self._stats.items())
+        return {
+            "hedge_delay": self.hedge_delay,
+            "max_parallel": self.max_parallel,
+            "strategies": {name: stats.to_dict() for name, stats in items},
+        }
+
+
+strategy_scheduler = StrategyScheduler()
@@ -0,0 +1,165 @@
+"""
+抖音 msToken / ttwid 后台令牌池
+Background pool of Douyin msToken / ttwid
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from src.crawlers.douyin.util import TokenManager
+from src.utils import get_analyze_logger
+
+logger = get_analyze_logger()
+
+
+class _TokenQueue:
+    """带过期时间的令牌队列，轮流取用"""
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[str]]):
+        self.name = name
+        self.fetch = fetch
+        self.tokens = deque()  # (令牌, 过期时间)
+        self.fetched = 0
+        self.failures = 0
+
+    def take(self) -> Optional[str]:
+        """O(1) 取出一个未过期的令牌并放回队尾，队列为空时返回 None"""
+        now = time.time()
+        while self.tokens:
+            token, expires_at = self.tokens[0]
+            if expires_at <= now:
+                self.tokens.popleft()
+                continue
+            self.tokens.rotate(-1)
+            return token
+        return None
+
+    def fresh_count(self, before: float) -> int:
+        """在 before 之后才过期的令牌数"""
+        return sum(1 for _, expires_at in self.tokens if expires_at > before)
+
+    def drop_expiring(self, before: float):
+        self.tokens = deque(item for item in self.tokens if item[1] > before)
+
+
+class TokenPool:
+    """
+    msToken / ttwid 令牌池
+
+    - 后台任务保持池中有 size 个有效令牌，令牌在过期前 refresh_ahead 秒被替换
+    - 请求时 O(1) 轮流取用，不在请求路径上发起网络请求
+    - 池为空时 msToken 退回本地生成的虚假值，ttwid 返回 None，并触发一次后台补充
+    """
+
+    def __init__(self, size: int = 4, ttl: int = 1800, refresh_interval: int = 60, refresh_ahead: int = 300):
+        self.size = size
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.refresh_ahead = refresh_ahead
+        self.queues = {
+            "msToken": _TokenQueue("msToken", TokenManager.fetch_msToken),
+            "ttwid": _TokenQueue("ttwid", TokenManager.fetch_ttwid),
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self.fallbacks = 0
+
+    def configure(self, size: int = None, ttl: int = None, refresh_interval: int = None, refresh_ahead: int = None):
+        if size is not None:
+            self.size = size
+        if ttl is not None:
+            self.ttl = ttl
+        if refresh_interval is not None:
+            self.refresh_interval = refresh_interval
+        if refresh_ahead is not None:
+            self.refresh_ahead = min(refresh_ahead, self.ttl)
+
+    async def _fill(self, queue: _TokenQueue):
+        refresh_before = time.time() + self.refresh_ahead
+        missing = self.size - queue.fresh_count(refresh_before)
+        if missing <= 0:
+            return
+        results = await asyncio.gather(*(queue.fetch() for _ in range(missing)), return_exceptions=True)
+        tokens = [token for token in results if not isinstance(token, BaseException)]
+        errors = [e for e in results if isinstance(e, BaseException)]
+        queue.fetched += len(tokens)
+        queue.failures += len(errors)
+        if errors:
+            logger.warning(f"获取 {queue.name} 失败 {len(errors)} 次：{errors[0]}")
+        if tokens:
+            # 新令牌到手后再替换即将过期的令牌，获取失败时旧令牌继续使用到过期
+            queue.drop_expiring(refresh_before)
+            expires_at = time.time() + self.ttl
+            queue.tokens.extend((token, expires_at) for token in tokens)
+
+    async def refill(self):
+        """把所有令牌补充到 size 个"""
+        await asyncio.gather(*(self._fill(queue) for queue in self.queues.values()))
+
+    def _schedule_refill(self):
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refill_task = loop.create_task(self.refill())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.error(f"刷新抖音令牌池失败：{e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """启动后台刷新任务，在应用启动时调用"""
+        if self.size <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"抖音令牌池: size={self.size}, ttl={self.ttl}s, refresh_interval={self.refresh_interval}s")
+
+    async def stop(self):
+        """停止后台刷新任务，在应用关闭时调用"""
+        tasks = [task for task in (self._task, self._refill_task) if task is not None]
+        self._task = self._refill_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def ms_token(self) -> str:
+        token = self.queues["msToken"].take()
+        if token is None:
+            self.fallbacks += 1
+            self._schedule_refill()
+            return TokenManager.gen_false_msToken()
+        return token
+
+    def ttwid(self) -> Optional[str]:
+        token = self.queues["ttwid"].take()
+        if token is None:
+            self._schedule_refill()
+        return token
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "size": self.size,
+            "ttl": self.ttl,
+            "running": self._task is not None and not self._task.done(),
+            "fallbacks": self.fallbacks,
+            **{
+                name: {
+                    "available": queue.fresh_count(now),
+                    "fetched": queue.fetched,
+                    "failures": queue.failures,
+                }
+                for name, queue in self.queues.items()
+            },
+        }
+
+
+token_pool = TokenPool()
@@ -5,6 +5,8 @@ import yaml
 import json
 from src.crawlers.exceptions import APIResponseError, APIConnectionError
 from src.utils import get_analyze_logger
+from src.utils.http_client import http_clients
+from src.utils.short_link import short_links
 from src.utils.index import get_timestamp
 
 logger = get_analyze_logger()
@@ -93,6 +95,55 @@ class TokenManager:
                 logger.info("将使用本地生成的虚假msToken参数，以继续请求。")
                 return cls.gen_false_msToken()
 
+    @classmethod
+    async def fetch_msToken(cls) -> str:
+        """
+        异步获取真实的msToken，供后台令牌池使用
+        (Fetch a real msToken asynchronously, used by the background token pool)
+
+        Raises:
+            APIResponseError: 响应中没有有效的msToken
+        """
+        payload = json.dumps(
+            {
+                "magic": cls.token_conf["magic"],
+                "version": cls.token_conf["version"],
+                "dataType": cls.token_conf["dataType"],
+                "strData": cls.token_conf["strData"],
+                "tspFromClient": get_timestamp(),
+            }
+        )
+        headers = {
+            "User-Agent": cls.token_conf["User-Agent"],
+            "Content-Type": "application/json",
+        }
+        client = http_clients.get(cls.proxies, profile="douyin_token")
+        response = await client.post(cls.token_conf["url"], content=payload, headers=headers)
+        response.raise_for_status()
+
+        msToken = str(response.cookies.get("msToken"))
+        if len(msToken) not in [120, 128]:
+            raise APIResponseError("响应内容：{0}， Douyin msToken API 的响应内容不符合要求。".format(msToken))
+        return msToken
+
+    @classmethod
+    async def fetch_ttwid(cls) -> str:
+        """
+        异步获取ttwid，供后台令牌池使用
+        (Fetch a ttwid asynchronously, used by the background token pool)
+
+        Raises:
+            APIResponseError: 响应中没有ttwid
+        """
+        client = http_clients.get(cls.proxies, profile="douyin_token")
+        response = await client.post(cls.ttwid_conf["url"], content=cls.ttwid_conf["data"])
+        response.raise_for_status()
+
+        ttwid = response.cookies.get("ttwid")
+        if not ttwid:
+            raise APIResponseError("Douyin ttwid API 的响应中没有 ttwid")
+        return ttwid
+
     @classmethod
     def gen_false_msToken(cls) -> str:
         """
@@ -126,39 +177,38 @@ class AwemeIdFetcher:
         if not isinstance(url, str):
             raise TypeError("参数必须是字符串类型")
 
-        # 重定向到完整链接
-        transport = httpx.AsyncHTTPTransport(retries=5)
-        async with httpx.AsyncClient(
-                transport=transport, proxies=None, timeout=10
-        ) as client:
-            try:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-
-                response_url = str(response.url)
-
-                # 按顺序尝试匹配视频ID
-                for pattern in [
-                    cls._DOUYIN_VIDEO_URL_PATTERN,
-                    cls._DOUYIN_VIDEO_URL_PATTERN_NEW,
-                    cls._DOUYIN_NOTE_URL_PATTERN,
-                    cls._DOUYIN_DISCOVER_URL_PATTERN
-                ]:
-                    match = pattern.search(response_url)
-                    if match:
-                        return match.group(1)
-
-                raise APIResponseError("未在响应的地址中找到 aweme_id，检查链接是否为作品页")
+        # 已是作品长链接（或短链已解析过）时直接提取，不发起网络请求
+        aweme_id = short_links.peek_id("douyin", url)
+        if aweme_id:
+            return aweme_id
 
-            except httpx.RequestError as exc:
-                raise APIConnectionError(
-                    f"请求端点失败，请检查当前网络环境。链接：{url}，代理：{TokenManager.proxies}，异常类名：{cls.__name__}，异常详细信息：{exc}"
-                )
-
-            except httpx.HTTPStatusError as e:
-                raise APIResponseError(
-                    f"链接：{e.response.url}，状态码 {e.response.status_code}：{e.response.text}"
-                )
+        # 重定向到完整链接，只读取响应头，解析结果按短链缓存
+        try:
+            link = await short_links.resolve(url, "douyin")
+            response_url = link.final_url
+
+            # 按顺序尝试匹配视频ID
+            for pattern in [
+                cls._DOUYIN_VIDEO_URL_PATTERN,
+                cls._DOUYIN_VIDEO_URL_PATTERN_NEW,
+                cls._DOUYIN_NOTE_URL_PATTERN,
+                cls._DOUYIN_DISCOVER_URL_PATTERN
+            ]:
+                match = pattern.search(response_url)
+                if match:
+                    return match.group(1)
+
+            raise APIResponseError("未在响应的地址中找到 aweme_id，检查链接是否为作品页")
+
+        except httpx.RequestError as exc:
+            raise APIConnectionError(
+                f"请求端点失败，请检查当前网络环境。链接：{url}，代理：{TokenManager.proxies}，异常类名：{cls.__name__}，异常详细信息：{exc}"
+            )
+
+        except httpx.HTTPStatusError as e:
+            raise APIResponseError(
+                f"链接：{e.response.url}，状态码 {e.response.status_code}：{e.response.text}"
+            )
 
 
 class BogusManager:
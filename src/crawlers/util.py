@@ -52,12 +52,10 @@ class BaseRequestModel(BaseModel):
     msToken: str = ""
 
     def __init__(self, **data):
-        # 在初始化时动态获取 msToken
+        # 在初始化时从后台令牌池取 msToken，不在请求路径上发起网络请求
         if 'msToken' not in data or not data['msToken']:
-            from src.crawlers.douyin.util import TokenManager
-            msToken = TokenManager.gen_real_msToken()
-            print(f"msToken: {msToken}")
-            data['msToken'] = msToken
+            from src.crawlers.douyin.token_pool import token_pool
+            data['msToken'] = token_pool.ms_token()
         super().__init__(**data)
 
 class PostDetail(BaseRequestModel):
@@ -1,10 +1,15 @@
-from typing import Optional
-from fastapi import APIRouter, HTTPException
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Response as HttpResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from src.app.kuaishou.index import Kuaishou
 from src.app.douyin.index import Douyin
 from src.app.weibo.index import Weibo
 from src.utils import config, get_analyze_logger,get_utils_logger
+from src.utils.analyze_cache import analyze_cache
+from src.utils.short_link import short_links
+from src.utils.single_flight import analyze_flights
+from src.utils.response import Response
 from src.app.xiaohongshu.index import Xiaohongshu
 from src.routes.youtube import router as youtube_router
 
@@ -29,9 +34,110 @@ router = APIRouter(
 # 包含YouTube路由
 router.include_router(youtube_router)
 
+# 平台 -> 解析类
+PARSERS = {
+    "xiaohongshu": Xiaohongshu,
+    "douyin": Douyin,
+    "kuaishou": Kuaishou,
+    "weibo": Weibo,
+}
+
+
+def _set_cache_headers(http_response: HttpResponse, status: str, level: Optional[str] = None):
+    http_response.headers["X-Cache"] = status
+    if level:
+        http_response.headers["X-Cache-Level"] = level
+
+
+def _set_coalesced_header(http_response: HttpResponse, shared: bool):
+    if shared:
+        http_response.headers["X-Coalesced"] = "1"
+
+
+async def _analyze(parser) -> dict:
+    await parser.initialize()
+    # 生成器等转换为可序列化的结构，才能写入二级缓存、在合并的请求之间共享
+    return jsonable_encoder(parser.to_dict())
+
+
+async def _analyze_and_cache(
+        parser, app_type: str, image_type: str, url_key: str, flight_key: str
+) -> Tuple[dict, str, Optional[str]]:
+    """
+    解析并写入缓存，返回 (结果, X-Cache, X-Cache-Level)；flight_key 为外层合并请求使用的键
+    """
+    if app_type == "douyin":
+        await parser.resolve_id()
+        content_key = analyze_cache.content_key(app_type, parser.content_id, image_type)
+        result, level = await analyze_cache.get(content_key)
+        if result is not None:
+            await analyze_cache.set(url_key, content_key, analyze_cache.ttl_for(app_type, None))
+            return result, "HIT", level
+        if content_key != flight_key:
+            # 不同的分享链接可能指向同一个作品，按 aweme_id 再合并一次
+            result, _ = await analyze_flights.do(
+                content_key, lambda: _analyze_and_store(parser, app_type, image_type, url_key)
+            )
+            return result, "MISS", None
+
+    return await _analyze_and_store(parser, app_type, image_type, url_key), "MISS", None
+
+
+async def _analyze_and_store(parser, app_type: str, image_type: str, url_key: str) -> dict:
+    result = await _analyze(parser)
+    if result.get("code") == Response.SUCCESS_CODE and parser.content_id:
+        ttl = analyze_cache.ttl_for(app_type, result)
+        content_key = analyze_cache.content_key(app_type, parser.content_id, image_type)
+        await analyze_cache.set(content_key, result, ttl)
+        await analyze_cache.set(url_key, content_key, ttl)
+    return result
+
+
+async def analyze_cached(app_type: str, url: str, image_type: str, http_response: HttpResponse):
+    """
+    解析链接，结果按 (平台, 内容 ID, 图片类型) 缓存
+
+    - 先由链接离线得到内容 ID（长链接按正则提取、短链查解析缓存），或按链接查找之前解析出的内容 ID，
+      命中时不发起任何网络请求
+    - 抖音先由分享链接解析出 aweme_id 再查缓存，命中时省去作品数据请求
+    - 未命中时，相同内容 ID（未知时为相同链接）的并发请求只解析一次，共享同一个结果
+    - 缓存状态通过 X-Cache（HIT / MISS / BYPASS）与 X-Cache-Level 响应头返回，
+      复用了其它并发请求的结果时另加 X-Coalesced: 1
+    """
+    parser = PARSERS[app_type](url, image_type)
+    url_key = analyze_cache.url_key(app_type, parser.url or url, image_type)
+    if not analyze_cache.enabled or not parser.url:
+        result, shared = await analyze_flights.do(url_key, lambda: _analyze(parser))
+        _set_cache_headers(http_response, "BYPASS")
+        _set_coalesced_header(http_response, shared)
+        return result
+
+    # 长链接直接提取内容 ID，短链使用缓存的解析结果，都不发起网络请求
+    content_id = short_links.peek_id(app_type, parser.url)
+    if content_id:
+        result, level = await analyze_cache.get(analyze_cache.content_key(app_type, content_id, image_type))
+        if result is not None:
+            _set_cache_headers(http_response, "HIT", level)
+            return result
+
+    content_key, _ = await analyze_cache.get(url_key, track=False)
+    if content_key:
+        result, level = await analyze_cache.get(content_key)
+        if result is not None:
+            _set_cache_headers(http_response, "HIT", level)
+            return result
+
+    flight_key = analyze_cache.content_key(app_type, content_id, image_type) if content_id else url_key
+    (result, status, level), shared = await analyze_flights.do(
+        flight_key, lambda: _analyze_and_cache(parser, app_type, image_type, url_key, flight_key)
+    )
+    _set_cache_headers(http_response, status, level)
+    _set_coalesced_header(http_response, shared)
+    return result
+
 # 无前缀的POST端点
 @router.post("")
-async def process_analyze(params: AnalyzeParams):
+async def process_analyze(params: AnalyzeParams, http_response: HttpResponse):
     utils_logger.info(f"处理URL (POST): {params.url}")
     try:
         url = params.url
@@ -46,41 +152,20 @@ async def process_analyze(params: AnalyzeParams):
         elif any(keyword in url for keyword in config.APP_TYPE_KEYWORD["weibo"]):
             app_type = "weibo"
         else:
-            from src.utils.response import Response
             return Response.error("不支持的URL")
         
         
         # 根据app_type选择对应的模块
-        if app_type == 'xiaohongshu':
-            from src.app.xiaohongshu.index import Xiaohongshu
-            xiaohongshu = Xiaohongshu(url, params.type)
-            return xiaohongshu.to_dict()
-        elif app_type == 'douyin':
-            from src.app.douyin.index import Douyin
-            douyin = Douyin(url, params.type)
-            await douyin.initialize()
-            return douyin.to_dict()
-        elif app_type == 'kuaishou':
-            from src.app.kuaishou.index import Kuaishou
-            kuaishou = Kuaishou(url, params.type)
-            return kuaishou.to_dict()
-        elif app_type == 'weibo':
-            from src.app.weibo.index import Weibo
-            weibo = Weibo(url, params.type)
-            return weibo.to_dict()
-        else:
-            from src.utils.response import Response
-            return Response.error("请联系客服！")
+        return await analyze_cached(app_type, url, params.type, http_response)
     
     except Exception as e:
         logger.error(f"处理聚合数据出错: {url}", exc_info=True)
         logger.error(f"处理聚合数据出错: {str(e)}", exc_info=True)
-        from src.utils.response import Response
         raise HTTPException(status_code=500, detail=Response.error(str(e)))
 
 # 小红书
 @router.post("/xiaohongshu")
-async def process_xiaohongshu(params: AnalyzeParams):
+async def process_xiaohongshu(params: AnalyzeParams, http_response: HttpResponse):
     """
     处理小红书 URL 并返回数据
     
@@ -91,22 +176,21 @@ async def process_xiaohongshu(params: AnalyzeParams):
     """
     logger.info(f"处理小红书URL (POST): {params.url}")
     try:
-        xiaohongshu = Xiaohongshu(params.url, params.type)
-        
-        if params.format.lower() == "html":
-            # 返回 HTML 内容
-            from src.utils.response import Response
-            return Response.success(xiaohongshu.html, "获取成功")
-        else:
+        if params.format.lower() != "html":
             # 返回结构化数据
-            return xiaohongshu.to_dict()
+            return await analyze_cached("xiaohongshu", params.url, params.type, http_response)
+
+        xiaohongshu = Xiaohongshu(params.url, params.type)
+        await xiaohongshu.initialize()
+        # 返回 HTML 内容
+        return Response.success(xiaohongshu.html, "获取成功")
     except Exception as e:
         logger.error(f"处理小红书URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 # 抖音
 @router.post("/douyin")
-async def process_douyin(params: AnalyzeParams):
+async def process_douyin(params: AnalyzeParams, http_response: HttpResponse):
     """
     处理抖音 URL 并返回数据
     
@@ -117,23 +201,21 @@ async def process_douyin(params: AnalyzeParams):
     """
     logger.info(f"处理抖音URL (POST): {params.url}")
     try:
+        if params.format.lower() != "html":
+            # 返回结构化数据
+            return await analyze_cached("douyin", params.url, params.type, http_response)
+
         douyin = Douyin(params.url, params.type)
         await douyin.initialize()
-
-        if params.format.lower() == "html":
-            # 返回 HTML 内容
-            from src.utils.response import Response
-            return Response.success("HTML格式暂不支持", "获取成功")
-        else:
-            # 返回结构化数据
-            return douyin.to_dict()
+        # 返回 HTML 内容
+        return Response.success("HTML格式暂不支持", "获取成功")
     except Exception as e:
         logger.error(f"处理抖音URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 # 快手
 @router.post("/kuaishou")
-async def process_kuaishou(params: AnalyzeParams):
+async def process_kuaishou(params: AnalyzeParams, http_response: HttpResponse):
     """
     处理快手 URL 并返回数据
     
@@ -144,22 +226,21 @@ async def process_kuaishou(params: AnalyzeParams):
     """
     logger.info(f"处理快手URL (POST): {params.url}")
     try:
-        kuaishou = Kuaishou(params.url, params.type)
-        
-        if params.format.lower() == "html":
-            # 返回 HTML 内容
-            from src.utils.response import Response
-            return Response.success(kuaishou.html, "获取成功")
-        else:
+        if params.format.lower() != "html":
             # 返回结构化数据
-            return kuaishou.to_dict()
+            return await analyze_cached("kuaishou", params.url, params.type, http_response)
+
+        kuaishou = Kuaishou(params.url, params.type)
+        await kuaishou.initialize()
+        # 返回 HTML 内容
+        return Response.success(kuaishou.html, "获取成功")
     except Exception as e:
         logger.error(f"处理快手URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 # 微博
 @router.post("/weibo")
-async def process_weibo(params: AnalyzeParams):
+async def process_weibo(params: AnalyzeParams, http_response: HttpResponse):
     """
     处理微博 URL 并返回数据
     
@@ -170,15 +251,14 @@ async def process_weibo(params: AnalyzeParams):
     """
     logger.info(f"处理微博URL (POST): {params.url}")
     try:
-        weibo = Weibo(params.url)
-        
-        if params.format.lower() == "html":
-            # 返回 HTML 内容
-            from src.utils.response import Response
-            return Response.success(weibo.html, "获取成功")
-        else:
+        if params.format.lower() != "html":
             # 返回结构化数据
-            return weibo.to_dict()
+            return await analyze_cached("weibo", params.url, params.type, http_response)
+
+        weibo = Weibo(params.url, params.type)
+        await weibo.initialize()
+        # 返回 HTML 内容
+        return Response.success(weibo.html, "获取成功")
     except Exception as e:
         logger.error(f"处理抖音URL出错: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, UploadFile, Form, File, Body
+from fastapi import APIRouter, UploadFile, Form, File, Body, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.params import Body
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from hivision import IDCreator
+from pydantic import BaseModel, ValidationError
+from typing import Optional, Dict, Any, Tuple, Type
+import uuid
 from hivision.error import FaceError
-from hivision.creator.layout_calculator import (
-    generate_layout_array,
-    generate_layout_image,
-)
-from hivision.creator.choose_handler import choose_handler
+from hivision.creator.layout_calculator import LAYOUT_SHEETS, generate_layout_sheets
+from hivision.creator.choose_handler import get_creator
+from hivision.plugin.template.template_calculator import template_registry, composite_template
 from hivision.utils import (
     add_background,
-    resize_image_to_kb,
+    encode_image_to_kb,
     bytes_2_base64,
     base64_2_numpy,
+    bytes_2_numpy,
     hex_to_rgb,
     add_watermark,
     save_image_dpi_to_bytes,
 )
 import numpy as np
 import cv2
-from src.utils import get_app_logger
+from src.utils import get_app_logger, config
+from src.utils.worker_pool import create_pool, PoolSaturatedError
 
 # 获取日志记录器
 logger = get_app_logger()
@@ -32,7 +34,14 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-creator = IDCreator()
+# 证件照工作池：解码、推理、编码等 CPU 密集操作都在池中执行
+idphoto_pool = create_pool(
+    "idphoto",
+    kind=config.IDPHOTO_POOL_KIND,
+    max_workers=config.IDPHOTO_POOL_WORKERS,
+    max_queue=config.IDPHOTO_POOL_MAX_QUEUE,
+    retry_after=config.IDPHOTO_POOL_RETRY_AFTER,
+)
 
 # 定义请求模型
 class IdPhotoCreateRequest(BaseModel):
@@ -71,6 +80,8 @@ class LayoutRequest(BaseModel):
     width: int = 295
     kb: Optional[int] = None
     dpi: int = 300
+    # 相纸尺寸，多个用逗号分隔，可选 6inch / 5inch / a4
+    sheets: str = "6inch"
 
 class WatermarkRequest(BaseModel):
     input_image_base64: str
@@ -100,6 +111,12 @@ class CropRequest(BaseModel):
     top_distance_max: float = 0.12
     top_distance_min: float = 0.10
 
+class TemplateRequest(BaseModel):
+    input_image_base64: str
+    template_name: str = "template_1"
+    kb: Optional[int] = None
+    dpi: int = 300
+
 # 统一响应结构函数
 def success_response(data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -121,85 +138,193 @@ def error_response(message: str, code: int = 400) -> Dict[str, Any]:
         "msg": message
     }
 
-# 证件照智能制作接口
-@router.post("/create")
-async def idphoto_inference(request: IdPhotoCreateRequest):  
-    logger.info("证件照制作请求")
-    # 使用base64解码
-    img = base64_2_numpy(request.input_image_base64)
+async def run_in_pool(fn, request, image_bytes: Optional[bytes] = None, encode_base64: bool = True):
+    """
+    在证件照工作池中执行处理函数，排队已满时返回 503
+
+    参数:
+        fn: 处理函数，签名为 fn(request, img) -> {结果名称: 图像字节}，
+            需要附带编码信息时返回 ({结果名称: 图像字节}, 附加信息)
+        request: 请求参数
+        image_bytes: 二进制接口上传的原始图像，为空时从 request.input_image_base64 解码
+        encode_base64: 为 True 时返回 base64 的 JSON 数据，否则返回 ({结果名称: 图像字节}, 附加信息)
+    """
+    try:
+        return await idphoto_pool.run(_run_job, fn, request, image_bytes, encode_base64)
+    except PoolSaturatedError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail=error_response(str(e), 503),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+# ------------------- 二进制接口的输入输出 -------------------
+
+# multipart 表单中图像文件的字段名
+IMAGE_FIELD = "input_image"
+
+
+async def read_image_input(request: Request, model: Type[BaseModel]) -> Tuple[bytes, BaseModel]:
+    """
+    读取二进制接口的输入，支持两种请求体：
+    - multipart/form-data：图像放在 input_image 字段，其余参数为表单字段
+    - image/* 或 application/octet-stream：请求体即图像，参数放在 query string
+
+    返回:
+        (图像字节, 请求参数模型)
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get(IMAGE_FIELD)
+        # request.form() 返回的是 starlette 的 UploadFile，这里只需排除普通表单字段
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail=error_response(f"缺少图像文件字段 {IMAGE_FIELD}"))
+        image_bytes = await upload.read()
+        params = {k: v for k, v in form.items() if k != IMAGE_FIELD and isinstance(v, str)}
+    elif content_type.startswith("image/") or content_type.startswith("application/octet-stream"):
+        image_bytes = await request.body()
+        params = dict(request.query_params)
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail=error_response("请使用 multipart/form-data 或 image/* 请求体", 415),
+        )
+
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail=error_response("图像内容为空"))
+
+    # 复用 JSON 接口的请求模型做参数校验，图像通过 image_bytes 单独传递，忽略客户端传入的 base64 字段
+    params.pop("input_image_base64", None)
+    try:
+        params = model(input_image_base64="", **params)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return image_bytes, params
+
 
+def _media_type(image_bytes: bytes) -> str:
+    return "image/png" if image_bytes.startswith(b"\x89PNG") else "image/jpeg"
+
+
+def _encode_headers(meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    encode = (meta or {}).get("encode")
+    # 多张相纸的排版照各自有编码信息，不放在响应头里
+    if not encode or "quality" not in encode:
+        return {}
+    return {
+        "X-Encode-Quality": str(encode["quality"]),
+        "X-Encode-Attempts": str(encode["attempts"]),
+        "X-Encode-Scale": str(encode["scale"]),
+    }
+
+
+def image_response(images: Dict[str, bytes], meta: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    二进制接口的输出：单张图像直接返回 PNG/JPEG，多张图像（标准照 + 高清照）返回 multipart/mixed
+    按 KB 压缩过的结果通过 X-Encode-Quality / X-Encode-Attempts / X-Encode-Scale 响应头返回编码信息
+    """
+    headers = _encode_headers(meta)
+    if len(images) == 1:
+        image_bytes = next(iter(images.values()))
+        return Response(content=image_bytes, media_type=_media_type(image_bytes), headers=headers)
+
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, image_bytes in images.items():
+        chunks.append(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n'
+                f"Content-Type: {_media_type(image_bytes)}\r\n"
+                f"Content-Length: {len(image_bytes)}\r\n\r\n"
+            ).encode()
+        )
+        chunks.append(image_bytes)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return Response(
+        content=b"".join(chunks),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers=headers,
+    )
+
+
+# ------------------- 工作池中执行的处理函数 -------------------
+# 以下函数为模块级同步函数，保证进程池模式下可以被 pickle
+# 处理函数返回 {结果名称: 图像字节}，JSON 接口中结果名称 image_xxx 对应字段 image_base64_xxx
+# 按 KB 压缩的处理函数额外返回 {"encode": {"quality", "attempts", "scale", "size_kb"}}，JSON 接口中原样合并到结果里
+
+def _run_job(fn, request, image_bytes: Optional[bytes], encode_base64: bool):
+    if image_bytes is not None:
+        img = bytes_2_numpy(image_bytes)
+    else:
+        # 使用base64解码
+        img = base64_2_numpy(request.input_image_base64)
+    if img is None:
+        raise ValueError("无法解码输入图像")
+
+    result = fn(request, img)
+    images, meta = result if isinstance(result, tuple) else (result, {})
+    if not encode_base64:
+        return images, meta
+
+    result_data = {"status": True}
+    for name, value in images.items():
+        result_data[name.replace("image", "image_base64", 1)] = bytes_2_base64(value)
+    result_data.update(meta)
+    return result_data
+
+
+def _idphoto_create(request: IdPhotoCreateRequest, img: np.ndarray) -> Dict[str, bytes]:
     # ------------------- 选择抠图与人脸检测模型 -------------------
-    choose_handler(creator, request.human_matting_model, request.face_detect_model)
+    creator = get_creator(request.human_matting_model, request.face_detect_model)
 
     # 将字符串转为元组
     size = (int(request.height), int(request.width))
-    try:
-        result = creator(
-            img,
-            size=size,
-            head_measure_ratio=request.head_measure_ratio,
-            head_height_ratio=request.head_height_ratio,
-            head_top_range=(request.top_distance_max, request.top_distance_min),
-            face_alignment=request.face_align,
-            brightness_strength=request.brightness_strength,
-            contrast_strength=request.contrast_strength,
-            sharpen_strength=request.sharpen_strength,
-            saturation_strength=request.saturation_strength,
-        )
-    except FaceError:
-        logger.error("未检测到人脸或检测到多个人脸")
-        return error_response("未检测到人脸或检测到多个人脸")
+    result = creator(
+        img,
+        size=size,
+        head_measure_ratio=request.head_measure_ratio,
+        head_height_ratio=request.head_height_ratio,
+        head_top_range=(request.top_distance_max, request.top_distance_min),
+        face_alignment=request.face_align,
+        brightness_strength=request.brightness_strength,
+        contrast_strength=request.contrast_strength,
+        sharpen_strength=request.sharpen_strength,
+        saturation_strength=request.saturation_strength,
+    )
+
     # 如果检测到人脸数量等于1, 则返回标准证和高清照结果（png 4通道图像）
-    else:
-        result_image_standard_bytes = save_image_dpi_to_bytes(cv2.cvtColor(result.standard, cv2.COLOR_RGBA2BGRA), None, request.dpi)
-        
-        result_data = {
-            "status": True,
-            "image_base64_standard": bytes_2_base64(result_image_standard_bytes),
-        }
-
-        # 如果hd为True, 则增加高清照结果（png 4通道图像）
-        if request.hd:
-            result_image_hd_bytes = save_image_dpi_to_bytes(cv2.cvtColor(result.hd, cv2.COLOR_RGBA2BGRA), None, request.dpi)
-            result_data["image_base64_hd"] = bytes_2_base64(result_image_hd_bytes)
+    images = {
+        "image_standard": save_image_dpi_to_bytes(cv2.cvtColor(result.standard, cv2.COLOR_RGBA2BGRA), None, request.dpi),
+    }
 
-    return success_response(result_data)
+    # 如果hd为True, 则增加高清照结果（png 4通道图像）
+    if request.hd:
+        images["image_hd"] = save_image_dpi_to_bytes(cv2.cvtColor(result.hd, cv2.COLOR_RGBA2BGRA), None, request.dpi)
 
+    return images
 
-# 人像抠图接口
-@router.post("/human_matting")
-async def human_matting_inference(request: HumanMattingRequest):
-    logger.info("人像抠图请求")
-    img = base64_2_numpy(request.input_image_base64)
 
+def _human_matting(request: HumanMattingRequest, img: np.ndarray) -> Dict[str, bytes]:
     # ------------------- 选择抠图与人脸检测模型 -------------------
-    choose_handler(creator, request.human_matting_model, None)
+    creator = get_creator(request.human_matting_model, None)
 
-    try:
-        result = creator(
-            img,
-            change_bg_only=True,
-        )
-    except FaceError:
-        logger.error("人像抠图失败")
-        return error_response("人像抠图失败")
-    else:
-        result_image_standard_bytes = save_image_dpi_to_bytes(cv2.cvtColor(result.standard, cv2.COLOR_RGBA2BGRA), None, request.dpi)
-        result_data = {
-            "status": True,
-            "image_base64": bytes_2_base64(result_image_standard_bytes),
-        }
-    return success_response(result_data)
+    result = creator(
+        img,
+        change_bg_only=True,
+    )
+    return {
+        "image": save_image_dpi_to_bytes(cv2.cvtColor(result.standard, cv2.COLOR_RGBA2BGRA), None, request.dpi),
+    }
 
 
-# 透明图像添加纯色背景接口
-@router.post("/add_background")
-async def photo_add_background(request: AddBackgroundRequest):
-    logger.info("添加背景请求")
+def _add_background(request: AddBackgroundRequest, img: np.ndarray) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
     render_choice = ["pure_color", "updown_gradient", "center_gradient"]
 
-    img = base64_2_numpy(request.input_image_base64)
-
     color = hex_to_rgb(request.color)
     color = (color[2], color[1], color[0])
 
@@ -207,82 +332,171 @@ async def photo_add_background(request: AddBackgroundRequest):
         img,
         bgr=color,
         mode=render_choice[request.render],
-    ).astype(np.uint8)
+    )
 
-    result_image = cv2.cvtColor(result_image, cv2.COLOR_RGB2BGR)
+    result_image = cv2.cvtColor(result_image, cv2.COLOR_RGB2BGR, dst=result_image)
     if request.kb:
-        result_image_bytes = resize_image_to_kb(result_image, None, int(request.kb), dpi=request.dpi)
-    else:
-        result_image_bytes = save_image_dpi_to_bytes(result_image, None, dpi=request.dpi)
+        result_image_bytes, encode_info = encode_image_to_kb(result_image, int(request.kb), dpi=request.dpi)
+        return {"image": result_image_bytes}, {"encode": encode_info}
 
-    result_data = {
-        "status": True,
-        "image_base64": bytes_2_base64(result_image_bytes),
-    }
+    return {"image": save_image_dpi_to_bytes(result_image, None, dpi=request.dpi)}, {}
 
-    return success_response(result_data)
 
-
-# 六寸排版照生成接口
-@router.post("/layout")
-async def generate_layout_photos(request: LayoutRequest):
-    logger.info("六寸排版请求")
-    img = base64_2_numpy(request.input_image_base64)
-
-    size = (int(request.height), int(request.width))
-
-    typography_arr, typography_rotate = generate_layout_array(
-        input_height=size[0], input_width=size[1]
-    )
-
-    result_layout_image = generate_layout_image(
-        img, typography_arr, typography_rotate, height=size[0], width=size[1]
-    ).astype(np.uint8)
-
-    result_layout_image = cv2.cvtColor(result_layout_image, cv2.COLOR_RGB2BGR)
-    if request.kb:
-        result_layout_image_bytes = resize_image_to_kb(
-            result_layout_image, None, int(request.kb), dpi=request.dpi
+def _layout_sheets(request: LayoutRequest) -> list:
+    sheets = [name.strip().lower() for name in request.sheets.split(",") if name.strip()]
+    unknown = [name for name in sheets if name not in LAYOUT_SHEETS]
+    if not sheets or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=error_response(f"不支持的相纸尺寸: {request.sheets}，可选: {', '.join(LAYOUT_SHEETS)}"),
         )
-    else:
-        result_layout_image_bytes = save_image_dpi_to_bytes(result_layout_image, None, dpi=request.dpi)
-        
-    result_layout_image_base64 = bytes_2_base64(result_layout_image_bytes)
+    return list(dict.fromkeys(sheets))
 
-    result_data = {
-        "status": True,
-        "image_base64": result_layout_image_base64,
-    }
 
-    return success_response(result_data)
+def _layout(request: LayoutRequest, img: np.ndarray) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+    sheets = _layout_sheets(request)
+    layouts = generate_layout_sheets(img, sheets, width=int(request.width), height=int(request.height))
 
+    # 只要一种相纸时沿用原来的 image 字段，多种相纸时为 image_<相纸名称>
+    images, encode = {}, {}
+    for name, result_layout_image in layouts.items():
+        key = "image" if len(sheets) == 1 else f"image_{name}"
+        result_layout_image = cv2.cvtColor(result_layout_image, cv2.COLOR_RGB2BGR, dst=result_layout_image)
+        if request.kb:
+            images[key], encode[name] = encode_image_to_kb(result_layout_image, int(request.kb), dpi=request.dpi)
+        else:
+            images[key] = save_image_dpi_to_bytes(result_layout_image, None, dpi=request.dpi)
 
-# 透明图像添加水印接口
-@router.post("/watermark")
-async def watermark(request: WatermarkRequest):
-    logger.info("添加水印请求")
-    img = base64_2_numpy(request.input_image_base64)
+    if not encode:
+        return images, {}
+    return images, {"encode": encode[sheets[0]] if len(sheets) == 1 else encode}
 
+
+def _watermark(request: WatermarkRequest, img: np.ndarray) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
     color_rgb = hex_to_rgb(request.color.lstrip("#"))
     img_with_watermark = add_watermark(
         img,
         text=request.text,
-        font_size=request.size,
+        size=request.size,
         opacity=request.opacity,
-        angle_in_degree=request.angle,
-        font_color=color_rgb,
+        angle=request.angle,
+        color=color_rgb,
         space=request.space,
     )
 
     if request.kb:
-        result_image_bytes = resize_image_to_kb(img_with_watermark, None, int(request.kb), dpi=request.dpi)
+        result_image_bytes, encode_info = encode_image_to_kb(img_with_watermark, int(request.kb), dpi=request.dpi)
+        return {"image": result_image_bytes}, {"encode": encode_info}
+
+    return {"image": save_image_dpi_to_bytes(img_with_watermark, None, dpi=request.dpi)}, {}
+
+
+def _resize(request: ResizeRequest, img: np.ndarray) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+    result_image_bytes, encode_info = encode_image_to_kb(img, int(request.kb), dpi=request.dpi)
+    return {"image": result_image_bytes}, {"encode": encode_info}
+
+
+def _check_template(request: TemplateRequest):
+    # 会读取模板配置文件，在线程池中调用
+    if request.template_name not in template_registry.names():
+        raise HTTPException(
+            status_code=400,
+            detail=error_response(
+                f"模板不存在: {request.template_name}，可选: {', '.join(template_registry.names())}"
+            ),
+        )
+
+
+def _template(request: TemplateRequest, img: np.ndarray) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+    # 模板按 RGB 合成，解码得到的是 BGR / BGRA / 灰度图
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+    elif img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGB)
     else:
-        result_image_bytes = save_image_dpi_to_bytes(img_with_watermark, None, dpi=request.dpi)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    result_image = composite_template(template_registry.get(request.template_name), img)
+    if request.kb:
+        result_image_bytes, encode_info = encode_image_to_kb(result_image, int(request.kb), dpi=request.dpi)
+        return {"image": result_image_bytes}, {"encode": encode_info}
+
+    return {"image": save_image_dpi_to_bytes(result_image, None, dpi=request.dpi)}, {}
+
+
+def _idphoto_crop(request: CropRequest, img: np.ndarray) -> Dict[str, bytes]:
+    # ------------------- 选择抠图与人脸检测模型 -------------------
+    creator = get_creator(None, request.face_detect_model)
+    # 将字符串转为元组
+    size = (int(request.height), int(request.width))
+    result = creator(
+        img,
+        size=size,
+        head_measure_ratio=request.head_measure_ratio,
+        head_height_ratio=request.head_height_ratio,
+        head_top_range=(request.top_distance_max, request.top_distance_min),
+        crop_only=True,
+    )
+
+    images = {"image_standard": save_image_dpi_to_bytes(result.standard, None, request.dpi)}
+
+    # 如果hd为True, 则增加高清照结果（png 4通道图像）
+    if request.hd:
+        images["image_hd"] = save_image_dpi_to_bytes(result.hd, None, request.dpi)
+
+    return images
 
-    result_data = {
-        "status": True,
-        "image_base64": bytes_2_base64(result_image_bytes),
-    }
+
+# 证件照智能制作接口
+@router.post("/create")
+async def idphoto_inference(request: IdPhotoCreateRequest):
+    logger.info("证件照制作请求")
+    try:
+        result_data = await run_in_pool(_idphoto_create, request)
+    except FaceError:
+        logger.error("未检测到人脸或检测到多个人脸")
+        return error_response("未检测到人脸或检测到多个人脸")
+
+    return success_response(result_data)
+
+
+# 人像抠图接口
+@router.post("/human_matting")
+async def human_matting_inference(request: HumanMattingRequest):
+    logger.info("人像抠图请求")
+    try:
+        result_data = await run_in_pool(_human_matting, request)
+    except FaceError:
+        logger.error("人像抠图失败")
+        return error_response("人像抠图失败")
+
+    return success_response(result_data)
+
+
+# 透明图像添加纯色背景接口
+@router.post("/add_background")
+async def photo_add_background(request: AddBackgroundRequest):
+    logger.info("添加背景请求")
+    result_data = await run_in_pool(_add_background, request)
+
+    return success_response(result_data)
+
+
+# 排版照生成接口（六寸 / 五寸 / A4）
+@router.post("/layout")
+async def generate_layout_photos(request: LayoutRequest):
+    logger.info("排版照请求")
+    _layout_sheets(request)
+    result_data = await run_in_pool(_layout, request)
+
+    return success_response(result_data)
+
+
+# 透明图像添加水印接口
+@router.post("/watermark")
+async def watermark(request: WatermarkRequest):
+    logger.info("添加水印请求")
+    result_data = await run_in_pool(_watermark, request)
 
     return success_response(result_data)
 
@@ -291,14 +505,8 @@ async def watermark(request: WatermarkRequest):
 @router.post("/resize")
 async def set_kb(request: ResizeRequest):
     logger.info("调整图片大小请求")
-    img = base64_2_numpy(request.input_image_base64)
+    result_data = await run_in_pool(_resize, request)
 
-    result_image_bytes = resize_image_to_kb(img, None, int(request.kb), dpi=request.dpi)
-    result_data = {
-        "status": True,
-        "image_base64": bytes_2_base64(result_image_bytes),
-    }
-    
     return success_response(result_data)
 
 
@@ -306,35 +514,126 @@ async def set_kb(request: ResizeRequest):
 @router.post("/crop")
 async def idphoto_crop_inference(request: CropRequest):
     logger.info("证件照裁剪请求")
-    img = base64_2_numpy(request.input_image_base64)
+    try:
+        result_data = await run_in_pool(_idphoto_crop, request)
+    except FaceError:
+        logger.error("未检测到人脸或检测到多个人脸")
+        return error_response("未检测到人脸或检测到多个人脸")
 
-    # ------------------- 选择抠图与人脸检测模型 -------------------
-    choose_handler(creator, None, request.face_detect_model)
-    # 将字符串转为元组
-    size = (int(request.height), int(request.width))
+    return success_response(result_data)
+
+
+# 模板照接口
+@router.post("/template")
+async def template_photo(request: TemplateRequest):
+    logger.info("模板照请求")
+    await run_in_threadpool(_check_template, request)
+    result_data = await run_in_pool(_template, request)
+
+    return success_response(result_data)
+
+
+# 模板列表接口
+@router.get("/templates")
+async def template_list():
+    # describe() 会读取并解码模板图像，不在事件循环中执行
+    templates = await run_in_threadpool(template_registry.describe)
+    return success_response({"templates": templates})
+
+
+# ------------------- 二进制接口 -------------------
+# 与上面的 JSON 接口参数一致，但图像以 multipart/form-data 或 image/* 请求体上传，
+# 结果直接返回 PNG/JPEG（标准照 + 高清照时返回 multipart/mixed），省去 base64 的编解码与体积膨胀
+
+# 证件照智能制作接口（二进制）
+@router.post("/binary/create")
+async def idphoto_inference_binary(request: Request):
+    logger.info("证件照制作请求（二进制）")
+    image_bytes, params = await read_image_input(request, IdPhotoCreateRequest)
     try:
-        result = creator(
-            img,
-            size=size,
-            head_measure_ratio=request.head_measure_ratio,
-            head_height_ratio=request.head_height_ratio,
-            head_top_range=(request.top_distance_max, request.top_distance_min),
-            crop_only=True,
-        )
+        images, meta = await run_in_pool(_idphoto_create, params, image_bytes, encode_base64=False)
     except FaceError:
         logger.error("未检测到人脸或检测到多个人脸")
         return error_response("未检测到人脸或检测到多个人脸")
 
-    else:
-        result_image_standard_bytes = save_image_dpi_to_bytes(result.standard, None, request.dpi)
-        result_data = {
-            "status": True,
-            "image_base64_standard": bytes_2_base64(result_image_standard_bytes),
-        }
-
-        # 如果hd为True, 则增加高清照结果（png 4通道图像）
-        if request.hd:
-            result_image_hd_bytes = save_image_dpi_to_bytes(result.hd, None, request.dpi)
-            result_data["image_base64_hd"] = bytes_2_base64(result_image_hd_bytes)
-
-    return success_response(result_data) 
\ No newline at end of file
+    return image_response(images, meta)
+
+
+# 人像抠图接口（二进制）
+@router.post("/binary/human_matting")
+async def human_matting_inference_binary(request: Request):
+    logger.info("人像抠图请求（二进制）")
+    image_bytes, params = await read_image_input(request, HumanMattingRequest)
+    try:
+        images, meta = await run_in_pool(_human_matting, params, image_bytes, encode_base64=False)
+    except FaceError:
+        logger.error("人像抠图失败")
+        return error_response("人像抠图失败")
+
+    return image_response(images, meta)
+
+
+# 透明图像添加纯色背景接口（二进制）
+@router.post("/binary/add_background")
+async def photo_add_background_binary(request: Request):
+    logger.info("添加背景请求（二进制）")
+    image_bytes, params = await read_image_input(request, AddBackgroundRequest)
+    images, meta = await run_in_pool(_add_background, params, image_bytes, encode_base64=False)
+
+    return image_response(images, meta)
+
+
+# 排版照生成接口（二进制）
+@router.post("/binary/layout")
+async def generate_layout_photos_binary(request: Request):
+    logger.info("排版照请求（二进制）")
+    image_bytes, params = await read_image_input(request, LayoutRequest)
+    _layout_sheets(params)
+    images, meta = await run_in_pool(_layout, params, image_bytes, encode_base64=False)
+
+    return image_response(images, meta)
+
+
+# 透明图像添加水印接口（二进制）
+@router.post("/binary/watermark")
+async def watermark_binary(request: Request):
+    logger.info("添加水印请求（二进制）")
+    image_bytes, params = await read_image_input(request, WatermarkRequest)
+    images, meta = await run_in_pool(_watermark, params, image_bytes, encode_base64=False)
+
+    return image_response(images, meta)
+
+
+# 调整图片大小接口（二进制）
+@router.post("/binary/resize")
+async def set_kb_binary(request: Request):
+    logger.info("调整图片大小请求（二进制）")
+    image_bytes, params = await read_image_input(request, ResizeRequest)
+    images, meta = await run_in_pool(_resize, params, image_bytes, encode_base64=False)
+
+    return image_response(images, meta)
+
+
+# 证件照裁剪接口（二进制）
+@router.post("/binary/crop")
+async def idphoto_crop_inference_binary(request: Request):
+    logger.info("证件照裁剪请求（二进制）")
+    image_bytes, params = await read_image_input(request, CropRequest)
+    try:
+        images, meta = await run_in_pool(_idphoto_crop, params, image_bytes, encode_base64=False)
+    except FaceError:
+        logger.error("未检测到人脸或检测到多个人脸")
+        return error_response("未检测到人脸或检测到多个人脸")
+
+    return image_response(images, meta)
+
+
+# 模板照接口（二进制）
+@router.post("/binary/template")
+async def template_photo_binary(request: Request):
+    logger.info("模板照请求（二进制）")
+    image_bytes, params = await read_image_input(request, TemplateRequest)
+    await run_in_threadpool(_check_template, params)
+    images, meta = await run_in_pool(_template, params, image_bytes, encode_base64=False)
+
+    return image_response(images, meta)
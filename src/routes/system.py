@@ -4,6 +4,17 @@ from pydantic import BaseModel
 import requests
 from src.app.test.index import Test
 from src.utils import get_global_logger, config
+from src.utils.worker_pool import pool_stats
+from src.utils.http_client import http_clients
+from src.utils.analyze_cache import analyze_cache
+from src.utils.short_link import short_links
+from src.utils.single_flight import analyze_flights
+from src.crawlers.douyin.strategy_scheduler import strategy_scheduler
+from src.crawlers.douyin.token_pool import token_pool
+from src.crawlers.circuit_breaker import host_guards
+from fastapi.concurrency import run_in_threadpool
+from hivision.creator.model_manager import model_manager
+from hivision.creator.matting_batcher import batcher_stats
 import httpx
 from fastapi.responses import StreamingResponse
 import io
@@ -37,36 +48,35 @@ async def process_get_file_stream(params: SystemParams):
     """
     logger.info(f"处理文件流请求 (POST): {params.url}")
     try:
-        async with httpx.AsyncClient() as client:
-            # 使用stream=True来支持大文件流式传输
-            response = await client.get(params.url, follow_redirects=True)
-            response.raise_for_status()  # 确保请求成功
-            
-            # 获取内容类型
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            
-            # 处理文件名
-            filename = params.filename
-            if not filename:
-                # 尝试从URL或响应头获取文件名
-                cd_header = response.headers.get("content-disposition", "")
-                if "filename=" in cd_header:
-                    filename = cd_header.split("filename=")[1].strip('"\'')
-                else:
-                    # 从URL路径获取文件名
-                    filename = params.url.split("/")[-1].split("?")[0] or "downloaded_file"
-            
-            # 设置响应头
-            headers = {
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-            
-            # 返回流式响应
-            return StreamingResponse(
-                io.BytesIO(response.content), 
-                media_type=content_type,
-                headers=headers
-            )
+        client = http_clients.get()
+        response = await client.get(params.url, follow_redirects=True)
+        response.raise_for_status()  # 确保请求成功
+
+        # 获取内容类型
+        content_type = response.headers.get("content-type", "application/octet-stream")
+
+        # 处理文件名
+        filename = params.filename
+        if not filename:
+            # 尝试从URL或响应头获取文件名
+            cd_header = response.headers.get("content-disposition", "")
+            if "filename=" in cd_header:
+                filename = cd_header.split("filename=")[1].strip('"\'')
+            else:
+                # 从URL路径获取文件名
+                filename = params.url.split("/")[-1].split("?")[0] or "downloaded_file"
+
+        # 设置响应头
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+
+        # 返回流式响应
+        return StreamingResponse(
+            io.BytesIO(response.content),
+            media_type=content_type,
+            headers=headers
+        )
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP错误: {str(e)}", exc_info=True)
         raise HTTPException(status_code=e.response.status_code, detail=f"远程服务器错误: {str(e)}")
@@ -142,3 +152,121 @@ def proxy_download(url: str = Query(..., description="目标资源 URL")):
         error_msg = f"Request failed: {str(e)}"
         logger.error(f"请求失败: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
+
+
+@router.get("/pools")
+async def get_pool_stats():
+    """
+    工作池运行状态：并发数、排队数、拒绝次数以及排队/执行耗时
+    """
+    return pool_stats()
+
+
+@router.get("/http_clients")
+async def get_http_client_stats():
+    """
+    共享 HTTP 客户端：按 (代理, 请求头配置) 复用的连接池
+    """
+    return http_clients.stats()
+
+
+@router.get("/analyze_cache")
+async def get_analyze_cache_stats():
+    """
+    解析结果缓存：命中率、条目数与各平台缓存时长
+    """
+    return analyze_cache.stats()
+
+
+@router.delete("/analyze_cache")
+async def clear_analyze_cache():
+    """
+    清空解析结果缓存（包括二级缓存）
+    """
+    await analyze_cache.clear()
+    return analyze_cache.stats()
+
+
+@router.get("/analyze_flights")
+async def get_analyze_flight_stats():
+    """
+    并发解析请求合并：正在执行的解析数、实际执行（leaders）与复用结果（followers）的请求数
+    """
+    return analyze_flights.stats()
+
+
+@router.get("/short_links")
+async def get_short_link_stats():
+    """
+    分享短链解析缓存：条目数与命中统计（offline 为长链接直接提取 ID 的次数）
+    """
+    return short_links.stats()
+
+
+@router.get("/douyin_strategies")
+async def get_douyin_strategy_stats():
+    """
+    抖音作品数据获取策略：最近的成功率、成功耗时与被对冲取消的次数
+    """
+    return strategy_scheduler.stats()
+
+
+@router.get("/douyin_tokens")
+async def get_douyin_token_stats():
+    """
+    抖音 msToken / ttwid 令牌池：可用数量、获取次数与退回虚假 msToken 的次数
+    """
+    return token_pool.stats()
+
+
+@router.get("/circuit_breakers")
+async def get_circuit_breaker_stats():
+    """
+    爬虫按主机的熔断与限流：熔断状态、剩余熔断时间、当前限流速率与被拒绝的请求数
+    """
+    return host_guards.stats()
+
+
+@router.delete("/circuit_breakers")
+async def reset_circuit_breakers():
+    """
+    重置所有主机的熔断与限流状态
+    """
+    host_guards.reset()
+    return host_guards.stats()
+
+
+@router.get("/models")
+async def get_model_status():
+    """
+    证件照模型状态：是否已加载、常驻/空闲卸载策略、加载耗时、命中次数与内存占用，
+    以及抠图微批的统计
+    """
+    return {
+        **model_manager.status(),
+        "matting_batchers": batcher_stats(),
+    }
+
+
+@router.post("/models/{name}/load")
+async def load_model(name: str, pin: bool = Query(False, description="是否设为常驻")):
+    """
+    预加载模型，避免首个请求承担冷启动耗时
+    """
+    if not model_manager.is_registered(name):
+        raise HTTPException(status_code=404, detail=f"模型不存在: {name}")
+    loaded = await run_in_threadpool(model_manager.warmup, [name], pin)
+    if not loaded:
+        raise HTTPException(status_code=404, detail=f"模型权重文件不存在: {name}")
+    return {"name": name, "loaded": True, "pinned": pin}
+
+
+@router.post("/models/{name}/unload")
+async def unload_model(name: str):
+    """
+    卸载模型并取消常驻，下次使用时重新加载
+    """
+    if not model_manager.is_registered(name):
+        raise HTTPException(status_code=404, detail=f"模型不存在: {name}")
+    model_manager.unload(name)
+    return {"name": name, "loaded": False}
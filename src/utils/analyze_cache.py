@@ -0,0 +1,377 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from .config import config
+from .logger import get_app_logger
+
+__all__ = [
+    "AnalyzeCache",
+    "analyze_cache",
+]
+
+logger = get_app_logger()
+
+# 签名 CDN 链接中表示过期时间（Unix 秒）的查询参数
+_EXPIRY_PARAMS = {"x-expires", "expires", "expire", "x-expire", "deadline"}
+# 抖音视频 CDN：/<签名>/<十六进制过期时间>/video/...
+_DOUYIN_VOD_EXPIRY_PATTERN = re.compile(r"/[0-9a-f]{32}/([0-9a-f]{8})/")
+_URL_PATTERN = re.compile(r"https?://[^\s\"'<>]+")
+
+
+def _parse_timestamp(value: str) -> Optional[int]:
+    # 只接受 10 位的 Unix 秒，避免把其他数字参数误当作过期时间
+    if value.isdigit() and len(value) == 10:
+        return int(value)
+    return None
+
+
+def url_expiry(url: str) -> Optional[int]:
+    """
+    签名 CDN 链接的过期时间（Unix 秒），无法识别时返回 None
+    """
+    expiry = None
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    for name, value in parse_qsl(parsed.query):
+        if name.lower() in _EXPIRY_PARAMS:
+            ts = _parse_timestamp(value)
+            if ts is not None:
+                expiry = ts if expiry is None else min(expiry, ts)
+    match = _DOUYIN_VOD_EXPIRY_PATTERN.search(parsed.path)
+    if match:
+        ts = _parse_timestamp(str(int(match.group(1), 16)))
+        if ts is not None:
+            expiry = ts if expiry is None else min(expiry, ts)
+    return expiry
+
+
+def _iter_strings(value: Any):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def earliest_expiry(result: Any) -> Optional[int]:
+    """
+    结果中所有签名链接里最早的过期时间
+    """
+    expiry = None
+    for text in _iter_strings(result):
+        if "://" not in text:
+            continue
+        for url in _URL_PATTERN.findall(text):
+            ts = url_expiry(url)
+            if ts is not None:
+                expiry = ts if expiry is None else min(expiry, ts)
+    return expiry
+
+
+class MemoryLRU:
+    """
+    进程内 LRU，条目带过期时间
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteBackend:
+    """
+    本地 SQLite 二级缓存，多个进程可共享同一个文件
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyze_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._writes = 0
+
+    def _get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM analyze_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _set(self, key: str, value: Any, expires_at: float):
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyze_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, data, expires_at),
+            )
+            # 定期清理过期条目
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM analyze_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def _clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analyze_cache")
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, expires_at: float):
+        await asyncio.to_thread(self._set, key, value, expires_at)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+    async def aclose(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisBackend:
+    """
+    Redis（或兼容协议的存储）二级缓存，需要安装 redis
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "analyze:"):
+        import redis.asyncio as redis
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        data = await self._client.get(self.prefix + key)
+        if data is None:
+            return None
+        item = json.loads(data)
+        return item["expires_at"], item["value"]
+
+    async def set(self, key: str, value: Any, expires_at: float):
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        data = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False)
+        await self._client.set(self.prefix + key, data, ex=ttl)
+
+    async def clear(self):
+        async for key in self._client.scan_iter(match=f"{self.prefix}*"):
+            await self._client.delete(key)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class AnalyzeCache:
+    """
+    解析结果缓存
+
+    - 一级：进程内 LRU；二级：可选的 SQLite / Redis，多个进程共享
+    - 结果按 (平台, 内容 ID, 图片类型) 缓存，同一作品的不同分享链接命中同一条目
+    - 另外记录 链接 -> 内容 ID 的映射，重复提交同一链接时不需要任何网络请求
+    - 缓存时长取平台 TTL 与结果中签名 CDN 链接过期时间（减去余量）的较小值
+    - 二级缓存出错时只记录日志，不影响解析
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        ttl: Optional[Dict[str, int]] = None,
+        expiry_margin: int = 120,
+    ):
+        self.enabled = enabled
+        self.memory = MemoryLRU(max_entries)
+        self.ttl = dict(ttl or {})
+        self.default_ttl = 1800
+        self.expiry_margin = expiry_margin
+        self.backend = None
+        self._stats = {"memory_hits": 0, "backend_hits": 0, "misses": 0, "sets": 0, "backend_errors": 0}
+
+    def configure(
+        self,
+        enabled: bool = None,
+        max_entries: int = None,
+        ttl: Dict[str, int] = None,
+        expiry_margin: int = None,
+    ):
+        if enabled is not None:
+            self.enabled = enabled
+        if max_entries is not None:
+            self.memory.max_entries = max_entries
+        if ttl is not None:
+            self.ttl = dict(ttl)
+        if expiry_margin is not None:
+            self.expiry_margin = expiry_margin
+
+    def start(self):
+        """按配置文件初始化，在应用启动时调用"""
+        self.configure(
+            enabled=config.ANALYZE_CACHE_ENABLED,
+            max_entries=config.ANALYZE_CACHE_MAX_ENTRIES,
+            ttl=config.ANALYZE_CACHE_TTL,
+            expiry_margin=config.ANALYZE_CACHE_EXPIRY_MARGIN,
+        )
+        if not self.enabled:
+            logger.info("解析结果缓存已关闭")
+            return
+        backend = config.ANALYZE_CACHE_BACKEND
+        try:
+            if backend == "sqlite":
+                self.backend = SQLiteBackend(config.ANALYZE_CACHE_URL)
+            elif backend == "redis":
+                self.backend = RedisBackend(config.ANALYZE_CACHE_URL)
+            elif backend not in ("", "memory"):
+                logger.warning(f"未知的解析结果缓存后端: {backend}，只使用进程内缓存")
+        except ImportError:
+            logger.warning("未安装 redis，解析结果缓存只使用进程内缓存")
+        except Exception as e:
+            logger.warning(f"初始化解析结果缓存后端失败: {e}，只使用进程内缓存")
+        logger.info(
+            f"解析结果缓存: max_entries={self.memory.max_entries}, "
+            f"backend={self.backend.name if self.backend else 'memory'}, ttl={self.ttl}"
+        )
+
+    @staticmethod
+    def content_key(platform: str, content_id: str, image_type: str) -> str:
+        return f"content:{platform}:{image_type}:{content_id}"
+
+    @staticmethod
+    def url_key(platform: str, url: str, image_type: str) -> str:
+        digest = hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+        return f"url:{platform}:{image_type}:{digest}"
+
+    def ttl_for(self, platform: str, result: Any) -> int:
+        """
+        结果可以缓存的秒数，0 表示不缓存
+        """
+        ttl = self.ttl.get(platform, self.default_ttl)
+        expiry = earliest_expiry(result)
+        if expiry is not None:
+            ttl = min(ttl, int(expiry - time.time() - self.expiry_margin))
+        return max(ttl, 0)
+
+    async def get(self, key: str, track: bool = True) -> Tuple[Any, Optional[str]]:
+        """
+        返回 (值, 命中层级)，命中层级为 "memory"、后端名称或 None（未命中）
+        track 为 False 时不计入命中统计，用于 链接 -> 内容 ID 的映射
+        """
+        if not self.enabled:
+            return None, None
+        item = self.memory.get(key)
+        if item is not None:
+            if track:
+                self._stats["memory_hits"] += 1
+            return item[1], "memory"
+        if self.backend is not None:
+            try:
+                item = await self.backend.get(key)
+            except Exception as e:
+                self._stats["backend_errors"] += 1
+                logger.warning(f"读取解析结果缓存失败: {e}")
+                item = None
+            if item is not None and item[0] > time.time():
+                # 回填一级缓存，过期时间与二级缓存一致
+                self.memory.set(key, item[1], item[0])
+                if track:
+                    self._stats["backend_hits"] += 1
+                return item[1], self.backend.name
+        if track:
+            self._stats["misses"] += 1
+        return None, None
+
+    async def set(self, key: str, value: Any, ttl: int):
+        if not self.enabled or ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        self._stats["sets"] += 1
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value, expires_at)
+            except Exception as e:
+                self._stats["backend_errors"] += 1
+                logger.warning(f"写入解析结果缓存失败: {e}")
+
+    async def clear(self):
+        self.memory.clear()
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.backend else "memory",
+            "memory_entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "ttl": self.ttl,
+            **self._stats,
+        }
+
+    async def aclose(self):
+        """关闭二级缓存后端，在应用关闭时调用"""
+        backend, self.backend = self.backend, None
+        if backend is not None:
+            try:
+                await backend.aclose()
+            except Exception as e:
+                logger.warning(f"关闭解析结果缓存后端失败: {e}")
+
+
+analyze_cache = AnalyzeCache()
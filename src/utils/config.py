@@ -40,6 +40,109 @@ class BaseConfig:
         "weibo": ['微博', 'weibo', 'wb']
     }
 
+    # 证件照模型配置
+    # 常驻模型的内存预算（MB），超出时按 LRU 淘汰，0 表示不限制
+    MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "4096"))
+    # 启动时预加载并常驻的模型，逗号分隔，如 "hivision_modnet,mtcnn,retinaface-resnet50"
+    MODEL_PRELOAD = [m.strip() for m in os.getenv("MODEL_PRELOAD", "").split(",") if m.strip()]
+    # 非常驻模型空闲多少秒后卸载，0 表示不因空闲卸载；MODEL_PRELOAD 中的模型始终常驻
+    MODEL_KEEP_ALIVE_SECONDS = int(os.getenv("MODEL_KEEP_ALIVE_SECONDS", "0"))
+    # 默认的 ONNX intra-/inter-op 线程数，0 表示使用 onnxruntime 默认值
+    ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+    ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+    # 按模型指定线程数由 MODEL_THREADS 环境变量设置（"模型名称=intra[:inter],..."），
+    # 在 hivision/creator/model_manager.py 的 ModelManager.from_env() 中解析
+    # MODNet 抠图微批：单次推理的最大图片数（<=1 关闭）与等待凑批的最长时间（毫秒）
+    MATTING_MAX_BATCH = int(os.getenv("MATTING_MAX_BATCH", "4"))
+    MATTING_BATCH_WAIT_MS = int(os.getenv("MATTING_BATCH_WAIT_MS", "5"))
+
+    # 证件照工作池配置，CPU 密集的图像处理在工作池中执行，不阻塞事件循环
+    # 工作池类型：thread（线程池）或 process（进程池）
+    IDPHOTO_POOL_KIND = os.getenv("IDPHOTO_POOL_KIND", "thread")
+    IDPHOTO_POOL_WORKERS = int(os.getenv("IDPHOTO_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # 允许排队的任务数，超出时返回 503
+    IDPHOTO_POOL_MAX_QUEUE = int(os.getenv("IDPHOTO_POOL_MAX_QUEUE", "16"))
+    # 返回 503 时 Retry-After 头的秒数
+    IDPHOTO_POOL_RETRY_AFTER = int(os.getenv("IDPHOTO_POOL_RETRY_AFTER", "2"))
+
+    # 共享 HTTP 客户端配置，所有爬虫按 (代理, 请求头配置) 复用连接池
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    # 保持空闲长连接的数量与时长（秒）
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    # 建立连接失败时的重试次数
+    HTTP_CLIENT_RETRIES = int(os.getenv("HTTP_CLIENT_RETRIES", "3"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    # 是否启用 HTTP/2（需要安装 h2）
+    HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "1") == "1"
+    # 未指定代理时是否使用 HTTP_PROXY / HTTPS_PROXY / ALL_PROXY / NO_PROXY 环境变量
+    HTTP_TRUST_ENV = os.getenv("HTTP_TRUST_ENV", "1") == "1"
+
+    # 解析结果缓存：进程内 LRU + 可选的二级缓存（memory / sqlite / redis）
+    ANALYZE_CACHE_ENABLED = os.getenv("ANALYZE_CACHE_ENABLED", "1") == "1"
+    ANALYZE_CACHE_MAX_ENTRIES = int(os.getenv("ANALYZE_CACHE_MAX_ENTRIES", "1024"))
+    ANALYZE_CACHE_BACKEND = os.getenv("ANALYZE_CACHE_BACKEND", "memory")
+    # sqlite 为文件路径，redis 为连接地址，如 redis://127.0.0.1:6379/0
+    ANALYZE_CACHE_URL = os.getenv(
+        "ANALYZE_CACHE_URL",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'cache', 'analyze.sqlite3'),
+    )
+    # 各平台结果的缓存时长（秒），结果中签名链接更早过期时以链接为准
+    ANALYZE_CACHE_TTL = {
+        "douyin": int(os.getenv("ANALYZE_CACHE_TTL_DOUYIN", "1800")),
+        "xiaohongshu": int(os.getenv("ANALYZE_CACHE_TTL_XIAOHONGSHU", "3600")),
+        "kuaishou": int(os.getenv("ANALYZE_CACHE_TTL_KUAISHOU", "1800")),
+        "weibo": int(os.getenv("ANALYZE_CACHE_TTL_WEIBO", "1800")),
+    }
+    # 签名链接过期前预留的余量（秒），保证返回给用户的链接还能使用
+    ANALYZE_CACHE_EXPIRY_MARGIN = int(os.getenv("ANALYZE_CACHE_EXPIRY_MARGIN", "120"))
+    # 相同内容的并发解析请求只请求一次上游，共享同一个结果
+    ANALYZE_SINGLE_FLIGHT_ENABLED = os.getenv("ANALYZE_SINGLE_FLIGHT_ENABLED", "1") == "1"
+
+    # 分享短链解析缓存：短链 -> 最终地址与内容 ID
+    SHORT_LINK_CACHE_MAX_ENTRIES = int(os.getenv("SHORT_LINK_CACHE_MAX_ENTRIES", "4096"))
+    SHORT_LINK_CACHE_TTL = int(os.getenv("SHORT_LINK_CACHE_TTL", "3600"))
+
+    # 抖音作品数据获取策略调度：超过对冲延迟（秒）没有结果时并行启动下一个策略
+    DOUYIN_HEDGE_DELAY = float(os.getenv("DOUYIN_HEDGE_DELAY", "1.5"))
+    # 同时执行的策略数上限
+    DOUYIN_STRATEGY_MAX_PARALLEL = int(os.getenv("DOUYIN_STRATEGY_MAX_PARALLEL", "2"))
+    # 统计成功率与耗时的最近执行次数
+    DOUYIN_STRATEGY_WINDOW = int(os.getenv("DOUYIN_STRATEGY_WINDOW", "50"))
+
+    # 抖音 msToken / ttwid 后台令牌池：池中保持的令牌数（0 表示关闭，msToken 使用本地生成的虚假值）
+    DOUYIN_TOKEN_POOL_SIZE = int(os.getenv("DOUYIN_TOKEN_POOL_SIZE", "4"))
+    # 令牌的使用时长（秒），过期前 DOUYIN_TOKEN_REFRESH_AHEAD 秒在后台替换
+    DOUYIN_TOKEN_TTL = int(os.getenv("DOUYIN_TOKEN_TTL", "1800"))
+    DOUYIN_TOKEN_REFRESH_AHEAD = int(os.getenv("DOUYIN_TOKEN_REFRESH_AHEAD", "300"))
+    # 后台检查令牌池的间隔（秒）
+    DOUYIN_TOKEN_REFRESH_INTERVAL = int(os.getenv("DOUYIN_TOKEN_REFRESH_INTERVAL", "60"))
+    # 检查 src/crawlers/douyin/config.yaml 是否修改的最短间隔（秒），修改后自动重新构建请求配置
+    DOUYIN_PROFILE_CHECK_INTERVAL = float(os.getenv("DOUYIN_PROFILE_CHECK_INTERVAL", "2"))
+
+    # 爬虫按主机的熔断：连续失败（429 / 5xx / 超时 / 空响应）达到阈值后熔断，熔断期间直接失败
+    CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "1") == "1"
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    # 首次熔断的时长（秒），连续熔断时翻倍，最长 CIRCUIT_BREAKER_MAX_OPEN_SECONDS
+    CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "10"))
+    CIRCUIT_BREAKER_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_MAX_OPEN_SECONDS", "300"))
+    # 熔断到期后放行的探测请求数
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_PROBES", "1"))
+    # 每个主机每秒的请求数（0 表示不限流）与允许的突发请求数
+    HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "10"))
+    HOST_RATE_BURST = float(os.getenv("HOST_RATE_BURST", "20"))
+    # 按主机指定每秒请求数，如 "www.douyin.com=5,www.xiaohongshu.com=3"
+    HOST_RATE_LIMITS = {
+        host.strip(): float(rate)
+        for host, _, rate in (
+            item.partition("=") for item in os.getenv("HOST_RATE_LIMITS", "").split(",") if "=" in item
+        )
+    }
+    # 限流排队的最长时间（秒），超过时直接失败
+    HOST_RATE_MAX_WAIT = float(os.getenv("HOST_RATE_MAX_WAIT", "2"))
+    # 空响应重试的退避基数（秒），每次重试翻倍并加随机抖动
+    CRAWLER_RETRY_BACKOFF = float(os.getenv("CRAWLER_RETRY_BACKOFF", "0.5"))
+
 # 开发环境配置
 class DevelopmentConfig(BaseConfig):
     """开发环境配置"""
@@ -0,0 +1,263 @@
+import asyncio
+import contextvars
+import importlib.util
+import urllib.request
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .config import config
+from .logger import get_app_logger
+
+__all__ = [
+    "HttpClientRegistry",
+    "http_clients",
+]
+
+logger = get_app_logger()
+
+# 安装了 h2 时才能启用 HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+ClientKey = Tuple[Tuple[Tuple[str, str], ...], str]
+
+
+def _normalize_proxies(proxies: Optional[dict]) -> Tuple[Tuple[str, str], ...]:
+    """
+    统一代理配置的写法：{"http": url} 与 {"http://": url} 等价，值为空的代理忽略
+    """
+    if not isinstance(proxies, dict):
+        return ()
+    items = {}
+    for pattern, url in proxies.items():
+        if not url:
+            continue
+        if "://" not in pattern:
+            pattern = f"{pattern}://"
+        items[pattern] = url
+    return tuple(sorted(items.items()))
+
+
+def _environment_proxies() -> Dict[str, Optional[str]]:
+    """
+    按 HTTP_PROXY / HTTPS_PROXY / ALL_PROXY / NO_PROXY 环境变量生成代理挂载，规则与 httpx 的 trust_env 一致
+    传入 transport 后 httpx 不再读取这些环境变量，因此由注册表自行处理；值为 None 的挂载表示直连
+    """
+    env = urllib.request.getproxies()
+    mounts: Dict[str, Optional[str]] = {}
+    for scheme in ("http", "https", "all"):
+        url = env.get(scheme)
+        if url:
+            mounts[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+    for host in (env.get("no") or "").split(","):
+        host = host.strip()
+        if not host:
+            continue
+        if host == "*":
+            return {}
+        if "://" in host:
+            mounts[host] = None
+        elif host.count(":") > 1:
+            # IPv6 地址
+            mounts[f"all://[{host.strip('[]')}]"] = None
+        else:
+            host = host.lstrip(".")
+            mounts[f"all://{host}"] = None
+            mounts[f"all://*.{host}"] = None
+    return mounts
+
+
+# 当前请求（含其重定向链）的 Cookie，只在 SharedAsyncClient.send 期间存在
+_request_cookies: contextvars.ContextVar[Optional[httpx.Cookies]] = contextvars.ContextVar(
+    "request_cookies", default=None
+)
+
+
+class SharedAsyncClient(httpx.AsyncClient):
+    """
+    共享的 httpx.AsyncClient，Cookie 只在单次请求内有效
+
+    每次 send 使用新的 Cookie 容器：同一个重定向链中上游设置的 Cookie（如短链 302 时下发、
+    落地页校验的 Cookie）会带到后续的跳转请求中，请求结束后即丢弃，不会在并发的请求之间共享
+    """
+
+    @property
+    def cookies(self) -> httpx.Cookies:
+        cookies = _request_cookies.get()
+        # 不在请求中时返回空容器，写入的内容直接丢弃
+        return cookies if cookies is not None else httpx.Cookies()
+
+    @cookies.setter
+    def cookies(self, cookies):
+        raise AttributeError("共享 HTTP 客户端不保存 Cookie，请通过请求头传入")
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        token = _request_cookies.set(httpx.Cookies())
+        try:
+            return await super().send(request, **kwargs)
+        finally:
+            _request_cookies.reset(token)
+
+
+class HttpClientRegistry:
+    """
+    应用级共享的 httpx.AsyncClient 注册表
+
+    - 按 (代理, 请求头配置名) 复用客户端，同一组合的请求共享连接池，TCP / TLS 连接可以跨请求复用
+    - 请求头随每次请求传入，请求头配置名只用于区分不同用途的连接池
+    - 共享客户端的 Cookie 只在单次请求（含重定向）内有效，避免不同用户的请求之间串 Cookie，
+      需要的 Cookie 通过请求头传入
+    - 在 FastAPI 启动时 start()，关闭时 aclose()；未启动时首次使用也会按默认配置创建
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        retries: int = 3,
+        timeout: float = 10,
+        http2: bool = True,
+        trust_env: bool = True,
+    ):
+        self._clients: Dict[ClientKey, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在关闭的旧客户端任务，保留引用避免任务被回收
+        self._closing = set()
+        self.configure(max_connections, max_keepalive_connections, keepalive_expiry, retries, timeout, http2, trust_env)
+
+    def configure(
+        self,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = None,
+        retries: int = None,
+        timeout: float = None,
+        http2: bool = None,
+        trust_env: bool = None,
+    ):
+        """调整连接池参数，只对之后新建的客户端生效"""
+        if max_connections is not None:
+            self.max_connections = max_connections
+        if max_keepalive_connections is not None:
+            self.max_keepalive_connections = max_keepalive_connections
+        if keepalive_expiry is not None:
+            self.keepalive_expiry = keepalive_expiry
+        if retries is not None:
+            self.retries = retries
+        if timeout is not None:
+            self.timeout = timeout
+        if http2 is not None:
+            self.http2 = http2 and HTTP2_AVAILABLE
+            if http2 and not HTTP2_AVAILABLE:
+                logger.warning("未安装 h2，HTTP 客户端使用 HTTP/1.1")
+        if trust_env is not None:
+            self.trust_env = trust_env
+
+    def start(self):
+        """按配置文件初始化，在应用启动时调用"""
+        self.configure(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            retries=config.HTTP_CLIENT_RETRIES,
+            timeout=config.HTTP_TIMEOUT,
+            http2=config.HTTP_CLIENT_HTTP2,
+            trust_env=config.HTTP_TRUST_ENV,
+        )
+        logger.info(
+            f"HTTP 客户端连接池: max_connections={self.max_connections}, "
+            f"max_keepalive={self.max_keepalive_connections}, keepalive_expiry={self.keepalive_expiry}s, "
+            f"http2={self.http2}, trust_env={self.trust_env}"
+        )
+
+    def _transport(self, proxy: Optional[str] = None) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(
+            proxy=httpx.Proxy(proxy) if proxy else None,
+            retries=self.retries,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+    def get(self, proxies: Optional[dict] = None, profile: str = "default") -> httpx.AsyncClient:
+        """
+        获取共享客户端
+
+        参数:
+            proxies: 代理配置，如 {"http://": url, "https://": url}
+            profile: 请求头配置名，如 "douyin_web"、"douyin_mobile"
+
+        返回:
+            httpx.AsyncClient，调用方不要关闭
+        """
+        # 客户端的连接绑定在创建它的事件循环上，事件循环变化（如脚本中多次 asyncio.run）时重新创建
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and loop is not self._loop:
+            old_loop, self._loop = self._loop, loop
+            self._discard_clients(old_loop, loop)
+
+        key = (_normalize_proxies(proxies), profile)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            # 未指定代理时按环境变量使用代理，与 httpx 默认的 trust_env 行为一致
+            mounts = _environment_proxies() if self.trust_env and not key[0] else dict(key[0])
+            client = SharedAsyncClient(
+                transport=self._transport(),
+                mounts={pattern: self._transport(url) if url else None for pattern, url in mounts.items()},
+                timeout=httpx.Timeout(self.timeout),
+            )
+            self._clients[key] = client
+            logger.info(f"创建共享 HTTP 客户端: profile={profile}, proxies={dict(key[0])}")
+        return client
+
+    def _discard_clients(self, old_loop: Optional[asyncio.AbstractEventLoop], loop: asyncio.AbstractEventLoop):
+        """
+        丢弃绑定在旧事件循环上的客户端并关闭其连接池
+        旧事件循环仍在运行（其他线程）时在旧循环上关闭；已停止时在当前循环上关闭，尽量释放连接
+        """
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+                asyncio.run_coroutine_threadsafe(self._close_client(client), old_loop)
+            else:
+                task = loop.create_task(self._close_client(client))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_client(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # 旧事件循环已关闭时部分连接无法正常关闭，其套接字在连接对象回收时释放
+            logger.debug(f"关闭旧事件循环上的 HTTP 客户端失败: {e}")
+
+    def stats(self) -> list:
+        return [
+            {
+                "profile": profile,
+                "proxies": dict(proxies),
+                "http2": self.http2,
+                "closed": client.is_closed,
+            }
+            for (proxies, profile), client in self._clients.items()
+        ]
+
+    async def aclose(self):
+        """关闭所有共享客户端，在应用关闭时调用"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败: {e}")
+
+
+http_clients = HttpClientRegistry()
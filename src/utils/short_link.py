@@ -0,0 +1,202 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from .config import config
+from .http_client import http_clients
+from .logger import get_utils_logger
+
+__all__ = [
+    "ShortLink",
+    "ShortLinkCache",
+    "extract_content_id",
+    "is_short_link",
+    "short_links",
+]
+
+logger = get_utils_logger()
+
+# 分享短链的域名，需要跟随重定向才能得到作品地址
+SHORT_LINK_HOSTS = {
+    "v.douyin.com",
+    "xhslink.com",
+    "v.kuaishou.com",
+    "t.cn",
+}
+
+# 各平台长链接中的内容 ID，按顺序匹配
+CONTENT_ID_PATTERNS: Dict[str, List[re.Pattern]] = {
+    "douyin": [
+        re.compile(r"video/(\d+)"),
+        re.compile(r"[?&]vid=(\d+)"),
+        re.compile(r"note/(\d+)"),
+        re.compile(r"modal_id=(\d+)"),
+    ],
+    "xiaohongshu": [
+        re.compile(r"/explore/([0-9a-f]{24})"),
+        re.compile(r"/discovery/item/([0-9a-f]{24})"),
+    ],
+    "kuaishou": [
+        re.compile(r"/short-video/([0-9A-Za-z]+)"),
+        re.compile(r"/fw/photo/([0-9A-Za-z]+)"),
+        re.compile(r"[?&]photoId=([0-9A-Za-z]+)"),
+    ],
+    "weibo": [
+        re.compile(r"m\.weibo\.cn/(?:status|detail)/(\d+)"),
+    ],
+}
+
+
+def _host(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def is_short_link(url: str) -> bool:
+    return _host(url) in SHORT_LINK_HOSTS
+
+
+def extract_content_id(platform: str, url: Optional[str]) -> Optional[str]:
+    """
+    从长链接中直接提取内容 ID，不发起网络请求；短链或无法识别时返回 None
+    """
+    if not url or is_short_link(url):
+        return None
+    for pattern in CONTENT_ID_PATTERNS.get(platform, []):
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+class ShortLink(NamedTuple):
+    final_url: str
+    content_id: Optional[str]
+    expires_at: float
+
+
+class ShortLinkCache:
+    """
+    短链解析缓存
+
+    - 记录 短链 -> (最终地址, 内容 ID)，同一短链的重定向结果在一段时间内是稳定的
+    - 条目数有上限，按 LRU 淘汰，过期后重新解析
+    - 输入已经是长链接时按正则直接提取内容 ID，不发起网络请求
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items: "OrderedDict[str, ShortLink]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "offline": 0, "resolved": 0}
+
+    def configure(self, max_entries: int = None, ttl: int = None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if ttl is not None:
+            self.ttl = ttl
+
+    def start(self):
+        """按配置文件初始化，在应用启动时调用"""
+        self.configure(
+            max_entries=config.SHORT_LINK_CACHE_MAX_ENTRIES,
+            ttl=config.SHORT_LINK_CACHE_TTL,
+        )
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return url.strip()
+
+    def get(self, url: str) -> Optional[ShortLink]:
+        key = self._key(url)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item.expires_at <= time.time():
+                del self._items[key]
+                item = None
+            if item is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return item
+
+    def set(self, url: str, final_url, platform: str = None) -> ShortLink:
+        """
+        记录一次解析结果，最终地址与原地址相同（不是短链）时不记录
+        """
+        final_url = str(final_url)
+        item = ShortLink(final_url, extract_content_id(platform, final_url) if platform else None, time.time() + self.ttl)
+        key = self._key(url)
+        if self.ttl <= 0 or key == final_url:
+            return item
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return item
+
+    def invalidate(self, url: str):
+        with self._lock:
+            self._items.pop(self._key(url), None)
+
+    def final_url(self, url: str) -> str:
+        """已缓存的最终地址，未缓存时返回原地址"""
+        item = self.get(url) if is_short_link(url) else None
+        return item.final_url if item else url
+
+    def peek_id(self, platform: str, url: Optional[str]) -> Optional[str]:
+        """
+        不发起网络请求获取内容 ID：长链接直接提取，短链使用缓存的解析结果
+        """
+        if not url:
+            return None
+        content_id = extract_content_id(platform, url)
+        if content_id:
+            self._stats["offline"] += 1
+            return content_id
+        if is_short_link(url):
+            item = self.get(url)
+            if item is not None:
+                return item.content_id
+        return None
+
+    async def resolve(self, url: str, platform: str = None, headers: dict = None, profile: str = "default") -> ShortLink:
+        """
+        跟随重定向得到最终地址，只读取响应头，不下载页面内容
+        """
+        item = self.get(url) if is_short_link(url) else None
+        if item is not None:
+            return item
+        client = http_clients.get(profile=profile)
+        async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            if response.is_error:
+                # 读取错误页面，便于调用方记录响应内容
+                await response.aread()
+            response.raise_for_status()
+            final_url = str(response.url)
+        self._stats["resolved"] += 1
+        logger.info(f"短链解析: {url} -> {final_url}")
+        return self.set(url, final_url, platform)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **self._stats,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+short_links = ShortLinkCache()
@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .config import config
+from .logger import get_utils_logger
+
+__all__ = [
+    "SingleFlight",
+    "analyze_flights",
+]
+
+logger = get_utils_logger()
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用
+
+    - 同一个键同时只执行一次，执行期间到达的调用等待同一个结果（或同一个异常）
+    - 调用在独立的任务中执行，发起调用的请求被取消（如客户端断开）时不影响其它等待者，
+      所有等待者都取消时任务仍会执行完，结果照常写入缓存
+    - 执行结束后立即移除，之后的调用重新执行；结果的复用交给缓存
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._stats = {"leaders": 0, "followers": 0, "errors": 0}
+
+    def start(self):
+        """按配置文件初始化，在应用启动时调用"""
+        self.enabled = config.ANALYZE_SINGLE_FLIGHT_ENABLED
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        参数:
+            key: 合并的键
+            fn: 无参的协程函数，只由第一个调用者执行
+
+        返回:
+            (结果, 是否复用了其它调用的结果)
+        """
+        if not self.enabled:
+            return await fn(), False
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self._stats["followers"] += 1
+            logger.info(f"合并并发请求: {key}")
+        else:
+            self._stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            **self._stats,
+        }
+
+
+analyze_flights = SingleFlight()
@@ -0,0 +1,213 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from .logger import get_app_logger
+
+__all__ = [
+    "PoolSaturatedError",
+    "WorkerPool",
+    "create_pool",
+    "get_pool",
+    "pool_stats",
+    "shutdown_pools",
+]
+
+logger = get_app_logger()
+
+
+class PoolSaturatedError(Exception):
+    """工作池排队已满时抛出，调用方应返回 503 并带上 Retry-After"""
+
+    def __init__(self, pool_name: str, retry_after: int):
+        super().__init__(f"工作池 {pool_name} 繁忙，请 {retry_after} 秒后重试")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class _TimingStats:
+    """耗时统计：累计值 + 最近样本（用于计算 p95）"""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._samples.append(value)
+
+    def to_dict(self) -> dict:
+        samples = sorted(self._samples)
+        p95 = samples[math.ceil(len(samples) * 0.95) - 1] if samples else 0.0
+        return {
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+def _timed_call(fn: Callable, submitted_at: float, args, kwargs):
+    # time.monotonic 在同一台机器的进程之间可比较，进程池中也能得到排队时间
+    started_at = time.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        return False, e, started_at - submitted_at, time.monotonic() - started_at
+    return True, result, started_at - submitted_at, time.monotonic() - started_at
+
+
+class WorkerPool:
+    """
+    有界工作池，把 CPU 密集的同步任务从事件循环中移出
+
+    - kind="thread"：线程池，适合 ONNX / OpenCV 这类会释放 GIL 的任务
+    - kind="process"：进程池，任务函数与参数必须可以被 pickle
+    - 运行中 + 排队中的任务数超过 max_workers + max_queue 时直接拒绝
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 16,
+        retry_after: int = 2,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"不支持的工作池类型: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait = _TimingStats()
+        self.run_time = _TimingStats()
+
+    @property
+    def executor(self) -> Executor:
+        # 延迟创建，避免仅导入模块时就启动线程或子进程
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"{self.name}-worker",
+                    )
+            return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        在工作池中执行同步函数并等待结果
+
+        参数:
+            fn: 同步函数
+            args, kwargs: 函数参数
+
+        返回:
+            函数返回值，函数抛出的异常会原样抛出
+
+        异常:
+            PoolSaturatedError: 排队已满
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError(self.name, self.retry_after)
+            self._pending += 1
+            self.submitted += 1
+
+        try:
+            future = self.executor.submit(
+                partial(_timed_call, fn, time.monotonic(), args, kwargs)
+            )
+        except BaseException:
+            self._release(None)
+            raise
+        # 在任务真正结束时才释放名额，请求被取消时正在执行的任务仍然计入
+        future.add_done_callback(self._release)
+        ok, value, _, _ = await asyncio.wrap_future(future)
+        if not ok:
+            raise value
+        return value
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future is None or future.cancelled() or future.exception() is not None:
+                return
+            ok, _, wait, run = future.result()
+            self.queue_wait.add(wait)
+            self.run_time.add(run)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = min(self._pending, self.max_workers)
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queued": self._pending - running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait": self.queue_wait.to_dict(),
+                "run_time": self.run_time.to_dict(),
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pools: Dict[str, WorkerPool] = {}
+
+
+def create_pool(name: str, **kwargs) -> WorkerPool:
+    """创建并登记工作池，同名工作池已存在时直接返回"""
+    if name not in _pools:
+        _pools[name] = WorkerPool(name, **kwargs)
+        logger.info(f"创建工作池 {name}: {kwargs}")
+    return _pools[name]
+
+
+def get_pool(name: str) -> WorkerPool:
+    return _pools[name]
+
+
+def pool_stats() -> dict:
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+
+def shutdown_pools(wait: bool = True):
+    for pool in _pools.values():
+        pool.shutdown(wait=wait)